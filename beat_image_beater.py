@@ -1,12 +1,19 @@
 """
 4拍子に合わせて異なる画像を表示するオブジェクト
 """
-import pygame
 from drawable import Drawable
+from surface_cache import load_image, blit_flags
+from tween import after, cancel_tweens
 
 
 class BeatImageBeater(Drawable):
     """4拍子の各拍に合わせて異なる画像を表示するオブジェクト"""
+    __slots__ = ('scale', 'heavy_processing', 'default_image', 'beat_images', 'current_image',
+                 'beat_beats', 'current_beat_index', 'rect')
+    
+    # updateは何も変更しない（重い処理のシミュレーションのみ）
+    independent = True
+    
     def __init__(self, x, y, default_image_path, beat_images_paths, scale=1.0, heavy_processing=False, priority=0):
         """
         Args:
@@ -22,24 +29,13 @@ class BeatImageBeater(Drawable):
         self.heavy_processing = heavy_processing
         
         # 通常時の画像を読み込み
-        self.default_image = pygame.image.load(default_image_path)
-        self.default_image = pygame.transform.scale(
-            self.default_image,
-            (int(self.default_image.get_width() * scale),
-             int(self.default_image.get_height() * scale))
-        )
+        self.default_image = load_image(default_image_path, scale)
         
         # 各拍用の画像を読み込み（4拍分）
         self.beat_images = []
         for i, image_path in enumerate(beat_images_paths[:4]):  # 最大4つまで
             if image_path:
-                image = pygame.image.load(image_path)
-                image = pygame.transform.scale(
-                    image,
-                    (int(image.get_width() * scale),
-                     int(image.get_height() * scale))
-                )
-                self.beat_images.append(image)
+                self.beat_images.append(load_image(image_path, scale))
             else:
                 # 画像パスがNoneの場合はデフォルト画像を使用
                 self.beat_images.append(self.default_image)
@@ -50,26 +46,15 @@ class BeatImageBeater(Drawable):
         
         # 現在の状態
         self.current_image = self.default_image
-        self.beat_frame = 0  # ビート画像表示の残りフレーム数
-        self.beat_duration = 10  # 10フレーム間ビート画像を表示
+        self.beat_beats = 2 / 3  # ビート画像を表示するビート数
         self.current_beat_index = 0  # 現在のビート番号（0-3）
         
         self.rect = self.current_image.get_rect(center=(x, y))
     
-    def update(self):
-        """フレームごとの更新処理"""
-        # 重い処理のシミュレーション（デバッグ用）
-        if self.heavy_processing:
-            import time
-            time.sleep(0.01)  # 10msの遅延をシミュレート
-        
-        if self.beat_frame > 0:
-            # ビート画像表示中
-            self.beat_frame -= 1
-            if self.beat_frame == 0:
-                # ビート画像表示終了、デフォルト画像に戻る
-                self.current_image = self.default_image
-                self.rect = self.current_image.get_rect(center=(self.x, self.y))
+    def show_default_image(self):
+        """ビート画像の表示を終えてデフォルト画像に戻る"""
+        self.current_image = self.default_image
+        self.rect = self.current_image.get_rect(center=(self.x, self.y))
     
     def on_beat(self, beat, measure):
         """ビートのタイミングでビート画像表示開始
@@ -81,14 +66,30 @@ class BeatImageBeater(Drawable):
         # 小節内のビート番号（0-3）に応じて画像を選択
         self.current_beat_index = measure % 4
         self.current_image = self.beat_images[self.current_beat_index]
-        self.beat_frame = self.beat_duration
+        # beat_beats後にデフォルト画像に戻す
+        after(self, self.show_default_image, beats=self.beat_beats)
         
         # 画像の位置を更新
         self.rect = self.current_image.get_rect(center=(self.x, self.y))
     
+    def restore_state(self, beat, phase, ticks_per_beat):
+        """前のビートの画像はbeat_beats（1ビート未満）で消えているためデフォルト画像に戻す
+        
+        このビートの画像は復元後に呼ばれるon_beatで表示する。
+        """
+        cancel_tweens(self)
+        self.show_default_image()
+    
+    def update(self):
+        """フレームごとの更新処理（画像の切り替えはトゥイーンで行うため、重い処理のシミュレーションのみ）"""
+        # 重い処理のシミュレーション（デバッグ用）
+        if self.heavy_processing:
+            import time
+            time.sleep(0.01)  # 10msの遅延をシミュレート
+    
     def draw(self, screen):
         """画像を描画"""
-        screen.blit(self.current_image, self.rect)
+        screen.blit(self.current_image, self.rect, special_flags=blit_flags(self.current_image))
     
     def set_beat_image(self, beat_index, image_path):
         """特定の拍の画像を変更
@@ -98,10 +99,4 @@ class BeatImageBeater(Drawable):
             image_path: 新しい画像のパス
         """
         if 0 <= beat_index < 4 and image_path:
-            image = pygame.image.load(image_path)
-            image = pygame.transform.scale(
-                image,
-                (int(image.get_width() * self.scale),
-                 int(image.get_height() * self.scale))
-            )
-            self.beat_images[beat_index] = image
+            self.beat_images[beat_index] = load_image(image_path, self.scale)
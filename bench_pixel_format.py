@@ -0,0 +1,110 @@
+"""
+ピクセルフォーマットの正規化のベンチマーク
+
+images/の画像と合成した半透明・2値アルファの画像を、
+読み込んだままの状態・キャッシュ（frombuffer）・正規化後・乗算済みアルファでblitして1回あたりの時間を比較する。
+
+使い方:
+    python bench_pixel_format.py [blit回数]
+"""
+import os
+import sys
+import tempfile
+import time
+
+import pygame
+
+from surface_cache import SurfaceCache
+
+
+def make_synthetic_images(directory):
+    """半透明（ソフトな円）と2値アルファ（くり抜いた円）のテスト画像を作成"""
+    size = 160
+    soft = pygame.Surface((size, size), pygame.SRCALPHA)
+    for radius in range(size // 2, 0, -1):
+        alpha = int(255 * (1 - radius / (size / 2)))
+        pygame.draw.circle(soft, (255, 200, 80, alpha), (size // 2, size // 2), radius)
+    binary = pygame.Surface((size, size), pygame.SRCALPHA)
+    pygame.draw.circle(binary, (80, 200, 255, 255), (size // 2, size // 2), size // 2)
+    pygame.draw.circle(binary, (0, 0, 0, 0), (size // 2, size // 2), size // 4)
+
+    paths = []
+    for name, surface in (("synthetic_soft", soft), ("synthetic_binary", binary)):
+        path = os.path.join(directory, name + ".png")
+        pygame.image.save(surface, path)
+        paths.append(path)
+    return paths
+
+
+def bench_blit(screen, image, count, flags=0):
+    """画面のあちこちにblitして1回あたりの時間（マイクロ秒）を返す"""
+    width, height = screen.get_size()
+    positions = [((i * 37) % (width - image.get_width()), (i * 53) % (height - image.get_height()))
+                 for i in range(count)]
+    screen.fill((0, 0, 50))
+    start = time.perf_counter()
+    for position in positions:
+        screen.blit(image, position, special_flags=flags)
+    return (time.perf_counter() - start) / count * 1_000_000
+
+
+def describe(surface):
+    """Surfaceのフォーマットの概要"""
+    parts = [f"{surface.get_bitsize()}bit"]
+    if surface.get_flags() & pygame.SRCALPHA:
+        parts.append("alpha")
+    if surface.get_colorkey() is not None:
+        parts.append("colorkey")
+    if surface.get_flags() & pygame.RLEACCEL:
+        parts.append("RLE")
+    return "+".join(parts)
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    pygame.init()
+    screen = pygame.display.set_mode((800, 600))
+    print(f"Display: {describe(screen)} ({pygame.display.get_driver()}), {count} blits per measurement\n")
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        paths = [os.path.join("images", name) for name in sorted(os.listdir("images")) if name.endswith(".png")]
+        paths += make_synthetic_images(work_dir)
+
+        cache_dir = os.path.join(work_dir, "cache")
+        variants = [
+            ("raw load", None),
+            ("cache (frombuffer)", SurfaceCache(cache_dir, normalize=False)),
+            ("normalized", SurfaceCache(cache_dir, normalize=True)),
+            ("normalized+premul", SurfaceCache(cache_dir, normalize=True, premultiplied=True)),
+        ]
+        # ディスクキャッシュを作成しておく
+        for path in paths:
+            SurfaceCache(cache_dir, normalize=False).load(path)
+
+        header = f"{'image':<22}" + "".join(f"{name:>22}" for name, _ in variants)
+        print(header)
+        print("-" * len(header))
+        totals = [0.0] * len(variants)
+        for path in paths:
+            cells = []
+            for index, (name, cache) in enumerate(variants):
+                if cache is None:
+                    image = pygame.image.load(path)
+                    flags = 0
+                else:
+                    image = cache.load(path)
+                    flags = cache.blit_flags(image)
+                micros = bench_blit(screen, image, count, flags)
+                totals[index] += micros
+                cells.append(f"{micros:8.2f}us {describe(image):>11}")
+            print(f"{os.path.basename(path):<22}" + "".join(f"{cell:>22}" for cell in cells))
+        print("-" * len(header))
+        print(f"{'total':<22}" + "".join(f"{total:>20.2f}us" for total in totals))
+        baseline = totals[0]
+        print(f"{'speedup vs raw':<22}" + "".join(f"{baseline / total:>21.2f}x" for total in totals))
+
+    pygame.quit()
+
+
+if __name__ == "__main__":
+    main()
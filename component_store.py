@@ -0,0 +1,166 @@
+"""
+コンポーネントストア - シーン内のエンティティの属性を列ごとの連続した配列で保持する
+"""
+import numpy as np
+import pygame
+from drawable import Drawable
+
+
+class ComponentStore:
+    """エンティティの位置・スケール・色・優先順位を列指向（struct-of-arrays）で保持するクラス
+
+    列は先頭count件が常に詰まった状態に保たれるため、システムは
+    store.x[:store.count] のようなスライスで全エンティティを一括処理できる。
+    エンティティの削除は末尾との入れ替えで行い、外部にはエンティティIDを返す。
+    """
+    def __init__(self, capacity=64):
+        self.count = 0
+        self.capacity = capacity
+
+        # 列名 -> (dtype, 1行あたりの形状, 既定値)
+        self._schema = {}
+        self.columns = {}
+        self.add_column("x", np.float32)
+        self.add_column("y", np.float32)
+        self.add_column("scale", np.float32, default=1.0)
+        self.add_column("color", np.uint8, shape=(3,), default=255)
+        self.add_column("priority", np.int32)
+
+        # エンティティID <-> 行番号
+        self._row_of_id = {}
+        self._id_of_row = np.zeros(capacity, dtype=np.int64)
+        self._next_id = 0
+
+    def add_column(self, name, dtype, shape=(), default=0):
+        """列を追加（例: 速度 vx, vy）"""
+        self._schema[name] = (dtype, shape, default)
+        column = np.full((self.capacity,) + shape, default, dtype=dtype)
+        if name in self.columns:
+            column[:self.count] = self.columns[name][:self.count]
+        self.columns[name] = column
+
+    def __getattr__(self, name):
+        # 列は store.x のように属性として参照できる
+        columns = self.__dict__.get("columns")
+        if columns is not None and name in columns:
+            return columns[name]
+        raise AttributeError(name)
+
+    def __len__(self):
+        return self.count
+
+    def add(self, **values):
+        """エンティティを追加
+
+        Args:
+            **values: 列名と値（指定しない列は既定値）
+
+        Returns:
+            int: エンティティID
+        """
+        if self.count == self.capacity:
+            self._grow()
+        row = self.count
+        for name, column in self.columns.items():
+            column[row] = values.get(name, self._schema[name][2])
+        entity = self._next_id
+        self._next_id += 1
+        self._row_of_id[entity] = row
+        self._id_of_row[row] = entity
+        self.count += 1
+        return entity
+
+    def remove(self, entity):
+        """エンティティを削除（末尾の行で穴を埋める）"""
+        row = self._row_of_id.pop(entity)
+        last = self.count - 1
+        if row != last:
+            for column in self.columns.values():
+                column[row] = column[last]
+            moved = int(self._id_of_row[last])
+            self._id_of_row[row] = moved
+            self._row_of_id[moved] = row
+        self.count = last
+
+    def row(self, entity):
+        """エンティティの行番号を取得"""
+        return self._row_of_id[entity]
+
+    def view(self, name):
+        """有効な行だけの列ビューを取得（コピーしない）"""
+        return self.columns[name][:self.count]
+
+    def _grow(self):
+        """容量を2倍に拡張"""
+        self.capacity *= 2
+        for name, column in self.columns.items():
+            dtype, shape, default = self._schema[name]
+            grown = np.full((self.capacity,) + shape, default, dtype=dtype)
+            grown[:self.count] = column[:self.count]
+            self.columns[name] = grown
+        ids = np.zeros(self.capacity, dtype=np.int64)
+        ids[:self.count] = self._id_of_row[:self.count]
+        self._id_of_row = ids
+
+
+def velocity_system(store):
+    """速度列（vx, vy）を位置に加算するシステム"""
+    count = store.count
+    store.x[:count] += store.vx[:count]
+    store.y[:count] += store.vy[:count]
+
+
+def wrap_system(width, height):
+    """画面端で反対側に移動させるシステムを作成"""
+    def system(store):
+        count = store.count
+        np.mod(store.x[:count], width, out=store.x[:count])
+        np.mod(store.y[:count], height, out=store.y[:count])
+    return system
+
+
+class SpriteBatch(Drawable):
+    """ComponentStoreの全エンティティを1枚の画像で描画するDrawable
+
+    スケールは量子化してスケール済み画像をキャッシュし、priority順にblitsでまとめて描画する。
+    """
+    __slots__ = ('store', 'image', 'scale_step', '_scaled_images')
+
+    def __init__(self, store, image, priority=0, scale_step=0.05):
+        super().__init__(0, 0, priority)
+        self.store = store
+        self.image = image
+        self.scale_step = scale_step
+        self._scaled_images = {}  # 量子化したスケール -> (画像, 半幅, 半高)
+
+    def draw(self, screen):
+        count = self.store.count
+        if not count:
+            return
+        order = np.argsort(self.store.priority[:count], kind="stable")
+        if Drawable.particle_stride > 1:
+            order = order[::Drawable.particle_stride]
+        steps = np.rint(self.store.scale[:count][order] / self.scale_step).astype(np.int32)
+        xs = self.store.x[:count][order].astype(np.int32).tolist()
+        ys = self.store.y[:count][order].astype(np.int32).tolist()
+
+        sequence = []
+        for step, x, y in zip(steps.tolist(), xs, ys):
+            entry = self._scaled_images.get(step)
+            if entry is None:
+                entry = self._scale_image(step)
+            image, half_width, half_height = entry
+            sequence.append((image, (x - half_width, y - half_height)))
+        screen.blits(sequence, doreturn=False)
+
+    def _scale_image(self, step):
+        """量子化したスケールの画像を作成してキャッシュ"""
+        scale = max(step, 1) * self.scale_step
+        image = pygame.transform.scale(
+            self.image,
+            (max(1, int(self.image.get_width() * scale)),
+             max(1, int(self.image.get_height() * scale)))
+        )
+        entry = (image, image.get_width() // 2, image.get_height() // 2)
+        self._scaled_images[step] = entry
+        return entry
@@ -1,10 +1,13 @@
 import pygame
 import math
+from time_source import RealtimeClock
+from tween import tween
 
 class Countdown:
     """カウントダウン管理クラス（シーンから独立）"""
-    def __init__(self, width, height, countdown_beats=4):
+    def __init__(self, width, height, countdown_beats=4, time_source=None):
         self.countdown_beats = countdown_beats
+        self.time_source = time_source if time_source is not None else RealtimeClock()
         self.is_active = False
         self.is_completed = False
         self.start_time = None
@@ -18,8 +21,8 @@ class Countdown:
         
         # カウントダウン表示用
         self.current_count = countdown_beats
-        self.flash_frame = 0
-        self.flash_duration = 10  # 10フレームでフラッシュ効果
+        self.flash_intensity = 1.0  # 数字と円の大きさ・明るさの倍率（フラッシュ時は1.5から1.0にトゥイーン）
+        self.flash_beats = 2 / 3  # フラッシュ効果のビート数
         
         # 情報テキスト用
         self.text = "Get ready! Music starts after countdown"
@@ -30,7 +33,7 @@ class Countdown:
         """カウントダウン開始"""
         self.is_active = True
         self.is_completed = False
-        self.start_time = pygame.time.get_ticks()
+        self.start_time = self.time_source.get_ticks()
         self.beat_interval_ms = beat_interval_ms
         self.last_beat_processed = -1
         self.current_count = self.countdown_beats
@@ -42,7 +45,7 @@ class Countdown:
             return
         
         # 現在の経過時間からビート計算
-        current_time = pygame.time.get_ticks()
+        current_time = self.time_source.get_ticks()
         elapsed_ms = current_time - self.start_time
         current_beat = int(elapsed_ms / self.beat_interval_ms)
         
@@ -58,14 +61,11 @@ class Countdown:
             new_count = self.countdown_beats - current_beat
             if new_count != self.current_count and new_count > 0:
                 self.current_count = new_count
-                self.flash_frame = self.flash_duration  # フラッシュ効果を開始
+                # フラッシュ効果を開始
+                tween(self, 'flash_intensity', 1.5, 1.0, duration_ms=self.beat_interval_ms * self.flash_beats)
                 print(f"Countdown: {self.current_count}")
             self.last_beat_processed = current_beat
         
-        # フラッシュ効果の更新
-        if self.flash_frame > 0:
-            self.flash_frame -= 1
-        
         # 情報テキストの点滅効果
         self.fade_frame += 1
         self.alpha = int(200 + 55 * math.sin(self.fade_frame * 0.1))
@@ -76,10 +76,7 @@ class Countdown:
             return
         
         # カウントダウン数字の描画
-        # フラッシュ効果の計算
-        flash_intensity = 1.0
-        if self.flash_frame > 0:
-            flash_intensity = 1.0 + (self.flash_frame / self.flash_duration) * 0.5
+        flash_intensity = self.flash_intensity
         
         # 大きなフォントでカウントダウン数字を表示
         font_size = int(200 * flash_intensity)
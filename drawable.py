@@ -4,10 +4,41 @@
 
 class Drawable:
     """描画可能オブジェクトの基底クラス"""
+    __slots__ = ('x', 'y', 'priority', 'prev_x', 'prev_y', 'optional')
+    
+    # 描画時の補間係数（固定ステップ時に前回と今回の状態の間を補間する、1.0で今回の状態）
+    interpolation = 1.0
+    
+    # 描画品質の設定（QualityGovernorが負荷に応じて切り替える）
+    smooth_scaling = True  # Falseの場合はsmoothscaleの代わりにscaleを使う
+    draw_optional = True  # Falseの場合はoptionalなDrawableを描画しない
+    particle_stride = 1  # パーティクルをこの間隔で間引いて描画
+    
+    # updateが自分の状態しか変更しない（Movie.parallel_updaterが他のupdateと並列に呼んでよい）
+    independent = False
+    
     def __init__(self, x, y, priority=0):
         self.x = x
         self.y = y
         self.priority = priority  # 描画優先順位（小さい値ほど先に描画）
+        self.optional = False  # 演出上なくてもよい（負荷が高いときに描画を省略できる）
+        
+        # 前回のシミュレーションステップでの状態
+        self.prev_x = x
+        self.prev_y = y
+    
+    def save_state(self):
+        """シミュレーションステップの前に現在の状態を前回の状態として保存"""
+        self.prev_x = self.x
+        self.prev_y = self.y
+    
+    def get_interpolated_position(self):
+        """前回と今回の状態を補間した描画位置を取得"""
+        t = Drawable.interpolation
+        if t >= 1.0:
+            return self.x, self.y
+        return (self.prev_x + (self.x - self.prev_x) * t,
+                self.prev_y + (self.y - self.prev_y) * t)
     
     def update(self):
         """フレームごとに呼ばれる更新処理"""
@@ -22,6 +53,31 @@ class Drawable:
         """
         pass
     
+    def on_spectrum(self, bands):
+        """描画前に現在の再生位置の帯域エネルギーを受け取る処理（Movieのspectrum_bandsが有効な場合）
+        
+        Args:
+            bands: 帯域ごとのエネルギー（0.0〜1.0、低域から順）。読み取り専用の配列
+        """
+        pass
+    
+    def restore_state(self, beat, phase, ticks_per_beat):
+        """シーク時に指定位置での状態を復元
+        
+        フレームを再生せずに、時間の関数として状態を計算する。
+        復元後、このビートのon_beatが通常どおり呼ばれる。
+        
+        Args:
+            beat: シーン開始からのビート数
+            phase: ビート内の位相（0.0〜1.0）
+            ticks_per_beat: 1ビートあたりのupdate回数
+        """
+        pass
+    
     def draw(self, screen):
         """描画処理"""
         pass
+    
+    def close(self):
+        """シーンの解放時（トラックの再生終了・Movieの終了）に呼ばれ、スレッドなどのリソースを解放する処理"""
+        pass
@@ -0,0 +1,457 @@
+"""
+外部ビート時計 - DJ機器などから届くMIDIクロック・OSC・UDPのビートにムービーのビートを追従させる
+
+受信はasyncioのイベントループを別スレッドで動かして行い、描画ループとはロックで保護した
+BeatFilterの状態だけを共有する（描画ループ側は数マイクロ秒のロックで位置を読むだけでブロックしない）。
+"""
+import asyncio
+import math
+import struct
+import threading
+import time
+
+import pygame
+
+from time_source import TimeSource
+
+# MIDIクロックの1ビート（4分音符）あたりのパルス数
+MIDI_CLOCKS_PER_BEAT = 24
+# MIDIのソングポジションポインタの1単位（16分音符）あたりのパルス数
+MIDI_CLOCKS_PER_SONG_POSITION = 6
+
+
+def now_ms():
+    """受信時刻と再生位置の計算に使う単調時計（ミリ秒）"""
+    return time.perf_counter() * 1000.0
+
+
+class BeatFilter:
+    """届いたビートの時刻からテンポと位相を推定し、任意の時刻のビート位置を返すフィルタ
+
+    テンポはビート間隔の指数移動平均、位相は予測位置と届いたビートの差をphase_gainの割合だけ補正する。
+    差がresync_beatsを超えた場合（パケットの欠落や相手側のシーク）は届いたビートに合わせ直す。
+    MIDIクロックのように1ビート未満の間隔で届く場合は、ビートの進み量に応じて補正の割合を小さくする。
+    """
+
+    def __init__(self, bpm=120.0, tempo_smoothing=0.2, phase_gain=0.3, resync_beats=0.5, min_bpm=40.0,
+                 max_bpm=300.0):
+        """
+        Args:
+            bpm: 最初のビートが届くまでのテンポ
+            tempo_smoothing: 1ビートあたりのテンポの追従の割合（0.0〜1.0）
+            phase_gain: 1ビートあたりの位相の補正の割合（0.0〜1.0）
+            resync_beats: 予測とのずれがこれを超えたら補正せずに合わせ直す（ビート）
+            min_bpm, max_bpm: 受け付けるテンポの範囲
+        """
+        self.tempo_smoothing = tempo_smoothing
+        self.phase_gain = phase_gain
+        self.resync_beats = resync_beats
+        self.min_interval_ms = 60000.0 / max_bpm
+        self.max_interval_ms = 60000.0 / min_bpm
+        self.interval_ms = 60000.0 / bpm
+        self.playing = False
+        self.epoch = 0  # スタートやシークで位置が不連続になるたびに増える
+
+        # 位置の基準点（この時刻にこのビート位置だった）
+        self.anchor_ms = None
+        self.anchor_beat = 0.0
+        # テンポの推定に使う直前のビート
+        self._last_ms = None
+        self._last_beat = None
+
+        # 統計情報
+        self.events = 0
+        self.resyncs = 0
+
+    @property
+    def bpm(self):
+        return 60000.0 / self.interval_ms
+
+    def set_bpm(self, bpm):
+        """テンポを直接設定（相手がテンポを送ってくる場合）"""
+        self.interval_ms = min(max(60000.0 / bpm, self.min_interval_ms), self.max_interval_ms)
+
+    def position(self, t_ms):
+        """時刻t_msのビート位置（ビートが届いていない場合はNone）"""
+        if self.anchor_ms is None:
+            return None
+        if not self.playing:
+            return self.anchor_beat
+        return self.anchor_beat + (t_ms - self.anchor_ms) / self.interval_ms
+
+    def start(self, t_ms, beat=0.0):
+        """トランスポートの開始（ビート位置をbeatから数え直す）"""
+        self.locate(t_ms, beat)
+        self.playing = True
+
+    def stop(self, t_ms):
+        """トランスポートの停止（現在の位置で止める）"""
+        if self.playing and self.anchor_ms is not None:
+            self.anchor_beat = self.position(t_ms)
+            self.anchor_ms = t_ms
+        self.playing = False
+        self._last_ms = None
+
+    def resume(self, t_ms):
+        """トランスポートの再開（止めた位置から進める）"""
+        if self.anchor_ms is None:
+            self.start(t_ms)
+            return
+        self.anchor_ms = t_ms
+        self.playing = True
+        self._last_ms = None
+
+    def locate(self, t_ms, beat):
+        """ビート位置をbeatに移動（再生状態は変えない）"""
+        self.anchor_ms = t_ms
+        self.anchor_beat = float(beat)
+        self._last_ms = t_ms
+        self._last_beat = float(beat)
+        self.epoch += 1
+
+    def observe(self, t_ms, beat=None, bpm=None):
+        """ビートの到着を反映
+
+        Args:
+            t_ms: 受信時刻（now_ms()の時計）
+            beat: 届いたビート位置（Noneの場合は直前のビートの次）
+            bpm: 相手が送ってきたテンポ（Noneの場合はビート間隔から推定）
+        """
+        self.events += 1
+        if bpm:
+            self.set_bpm(bpm)
+        if beat is None:
+            beat = self._last_beat + 1.0 if self._last_beat is not None else 0.0
+        beat = float(beat)
+        if not self.playing:
+            # トランスポートを送らない相手は最初のビートで開始とする
+            self.start(t_ms, beat)
+            return
+
+        steps = 1.0
+        if self._last_ms is not None:
+            steps = beat - self._last_beat
+            elapsed = t_ms - self._last_ms
+            if steps > 0 and not bpm:
+                measured = elapsed / steps
+                # 倍・半分のテンポに見える間隔（欠落・重複）はテンポの推定に使わない
+                if self.interval_ms * 0.5 < measured < self.interval_ms * 2.0:
+                    weight = 1.0 - (1.0 - self.tempo_smoothing) ** min(steps, 1.0)
+                    interval = self.interval_ms + (measured - self.interval_ms) * weight
+                    self.interval_ms = min(max(interval, self.min_interval_ms), self.max_interval_ms)
+        self._last_ms = t_ms
+        self._last_beat = beat
+
+        predicted = self.position(t_ms)
+        error = beat - predicted
+        if abs(error) > self.resync_beats:
+            self.resyncs += 1
+            self.anchor_beat = beat
+        else:
+            gain = 1.0 - (1.0 - self.phase_gain) ** min(max(steps, 0.0), 1.0)
+            self.anchor_beat = predicted + error * gain
+        self.anchor_ms = t_ms
+
+
+def parse_osc(data):
+    """OSCのメッセージ（またはバンドル）を(アドレス, 引数のリスト)のリストに変換
+
+    引数はint32(i)・float32(f)・文字列(s)のみ対応し、それ以外の型を含むメッセージは無視する。
+    """
+    if data.startswith(b"#bundle\0"):
+        messages = []
+        offset = 16  # "#bundle\0" + タイムタグ
+        while offset + 4 <= len(data):
+            (size,) = struct.unpack_from(">i", data, offset)
+            offset += 4
+            messages.extend(parse_osc(data[offset:offset + size]))
+            offset += size
+        return messages
+
+    address, offset = _read_osc_string(data, 0)
+    if offset >= len(data):
+        return [(address, [])]
+    type_tags, offset = _read_osc_string(data, offset)
+    args = []
+    for tag in type_tags[1:]:
+        if tag == "i":
+            args.append(struct.unpack_from(">i", data, offset)[0])
+            offset += 4
+        elif tag == "f":
+            args.append(struct.unpack_from(">f", data, offset)[0])
+            offset += 4
+        elif tag == "s":
+            value, offset = _read_osc_string(data, offset)
+            args.append(value)
+        else:
+            return []
+    return [(address, args)]
+
+
+def _read_osc_string(data, offset):
+    """NUL終端で4バイト境界に揃えたOSCの文字列を読み込み"""
+    end = data.index(b"\0", offset)
+    return data[offset:end].decode("ascii"), (end + 4) & ~3
+
+
+def parse_text(data):
+    """テキスト形式のメッセージ（例: "beat 12 128.0"、"start"）を(アドレス, 引数のリスト)のリストに変換"""
+    messages = []
+    for line in data.decode("ascii", "replace").splitlines():
+        words = line.split()
+        if not words:
+            continue
+        try:
+            args = [float(word) for word in words[1:]]
+        except ValueError:
+            continue
+        messages.append(("/" + words[0].lower(), args))
+    return messages
+
+
+class ExternalBeatClock(TimeSource):
+    """外部から届くビートを再生位置として返す時間ソース
+
+    音楽は外部の機器が再生するため、music_play()などは音声を扱わない。
+    music_get_pos()は外部のビート位置をMovieのbpm（コンストラクタのbpm）のミリ秒に換算した値を返すため、
+    Movieのビート番号は外部のテンポで進む。
+
+    music_play()の時点で外部のビートが届いていれば、外部の現在のビートをムービーの開始ビートとして位相を揃える。
+    届いていない場合は最初のビートが届くまで再生位置を止めて待つ。外部側のスタートやシークで位置が
+    不連続になった場合は、ムービーのビート番号を巻き戻さずに次のビートから続ける。
+
+    受信はlisten_udp()/listen_midi()で指定し、start()でasyncioのイベントループを別スレッドで開始する。
+    """
+    uses_audio = False
+
+    def __init__(self, bpm=120, beat_filter=None):
+        """
+        Args:
+            bpm: Movieのbpm（再生位置のミリ秒への換算に使う）
+            beat_filter: 使用するBeatFilter（Noneの場合は既定の設定）
+        """
+        self.beat_interval_ms = 60000.0 / bpm
+        self.filter = beat_filter or BeatFilter(bpm)
+        self.lock = threading.Lock()
+        self.clock = pygame.time.Clock()
+
+        # ムービーのビート位置 = 外部のビート位置 + offset_beats
+        self.offset_beats = None
+        self.playing = False
+        self._pending_start_beats = 0.0
+        self._epoch = None
+        self._last_beats = 0.0
+
+        # 受信の設定と状態
+        self._udp_endpoints = []  # (host, port)
+        self._midi_ports = []  # MIDI入力ポート名（Noneは既定のポート）
+        self._loop = None
+        self._thread = None
+        self._stop_event = None
+        self.messages = 0
+        self.ignored_messages = 0
+
+    @property
+    def bpm(self):
+        """外部のテンポの推定値"""
+        with self.lock:
+            return self.filter.bpm
+
+    # === TimeSource ===
+
+    def get_ticks(self):
+        return pygame.time.get_ticks()
+
+    def tick(self, fps):
+        return self.clock.tick(fps)
+
+    def music_play(self, start_ms=0):
+        with self.lock:
+            self.playing = True
+            self.offset_beats = None
+            self._pending_start_beats = start_ms / self.beat_interval_ms
+            self._last_beats = self._pending_start_beats
+
+    def music_queue(self, music_file, length_ms=None):
+        pass
+
+    def music_stop(self):
+        self.playing = False
+
+    def music_get_busy(self):
+        return self.playing
+
+    def music_get_pos(self):
+        if not self.playing:
+            return -1
+        with self.lock:
+            position = self.filter.position(now_ms())
+            if position is not None:
+                if self.offset_beats is None:
+                    # 外部のビートの頭をムービーのビートの頭に揃える（ビート内の位相はそのまま）
+                    self.offset_beats = round(self._pending_start_beats) - math.floor(position)
+                    self._epoch = self.filter.epoch
+                elif self.filter.epoch != self._epoch:
+                    # 外部の位置が飛んだ場合は、ムービーのビートを巻き戻さずに次のビートから続ける
+                    self.offset_beats = math.ceil(self._last_beats) - math.floor(position)
+                    self._epoch = self.filter.epoch
+                # ビート位置は減らさない（位相の補正で戻った分は止まって待つ）
+                self._last_beats = max(self._last_beats, position + self.offset_beats)
+            return self._last_beats * self.beat_interval_ms
+
+    # === 受信 ===
+
+    def listen_udp(self, port=9000, host="127.0.0.1"):
+        """UDPでテキスト形式またはOSCのメッセージを受信する
+
+        受け付けるメッセージ（OSCはアドレス、テキストは先頭の単語）:
+            beat [番号] [bpm] / start [番号] / stop / continue / bpm <bpm>
+        """
+        self._udp_endpoints.append((host, port))
+
+    def listen_midi(self, port_name=None):
+        """MIDIクロック（0xF8）とトランスポート（スタート・ストップ・コンティニュー・ソングポジション）を受信する
+
+        mido（とpython-rtmidiなどのバックエンド）が必要。
+        クロックはスタートかコンティニューを受信してからビートとして数える。
+        """
+        self._midi_ports.append(port_name)
+
+    def start(self):
+        """受信スレッドを開始"""
+        if self._thread is not None:
+            return
+        ready = threading.Event()
+        self._thread = threading.Thread(target=self._run, args=(ready,), name="external-clock", daemon=True)
+        self._thread.start()
+        ready.wait()
+
+    def stop(self):
+        """受信スレッドを停止"""
+        if self._thread is None:
+            return
+        self._loop.call_soon_threadsafe(self._stop_event.set)
+        self._thread.join()
+        self._thread = None
+
+    def _run(self, ready):
+        loop = asyncio.new_event_loop()
+        self._loop = loop
+        try:
+            loop.run_until_complete(self._serve(ready))
+        finally:
+            loop.close()
+
+    async def _serve(self, ready):
+        loop = asyncio.get_running_loop()
+        self._stop_event = asyncio.Event()
+        clock = self
+        transports = []
+        midi_inputs = []
+
+        class BeatProtocol(asyncio.DatagramProtocol):
+            def datagram_received(self, data, addr):
+                clock.handle_datagram(data, now_ms())
+
+        try:
+            for host, port in self._udp_endpoints:
+                try:
+                    transport, _ = await loop.create_datagram_endpoint(BeatProtocol, local_addr=(host, port))
+                except OSError as e:
+                    print(f"External clock failed to listen on udp {host}:{port} ({e})")
+                    continue
+                transports.append(transport)
+                print(f"External clock listening on udp {host}:{transport.get_extra_info('sockname')[1]}")
+            for port_name in self._midi_ports:
+                midi_input = self._open_midi(port_name, loop)
+                if midi_input is not None:
+                    midi_inputs.append(midi_input)
+        finally:
+            ready.set()
+
+        await self._stop_event.wait()
+        for transport in transports:
+            transport.close()
+        for midi_input in midi_inputs:
+            midi_input.close()
+
+    def _open_midi(self, port_name, loop):
+        """MIDI入力ポートを開く（midoはMIDIを使う場合のみ読み込む）"""
+        try:
+            import mido
+        except ImportError:
+            print("External clock: MIDI input requires the 'mido' package (pip install mido python-rtmidi)")
+            return None
+        state = {"pulses": 0, "running": False}
+
+        def callback(message):
+            # 受信時刻はmidoのスレッドで記録し、処理はイベントループに渡す
+            loop.call_soon_threadsafe(self.handle_midi, message.type, getattr(message, "pos", 0), now_ms(), state)
+
+        try:
+            midi_input = mido.open_input(port_name, callback=callback)
+        except (OSError, IOError) as e:
+            print(f"External clock failed to open MIDI input {port_name or '(default)'} ({e})")
+            return None
+        print(f"External clock listening on MIDI input {midi_input.name}")
+        return midi_input
+
+    def handle_datagram(self, data, t_ms):
+        """UDPで届いたデータ（OSCまたはテキスト）を処理"""
+        try:
+            messages = parse_osc(data) if data.startswith((b"/", b"#bundle")) else parse_text(data)
+        except (ValueError, struct.error, UnicodeDecodeError):
+            messages = []
+        if not messages:
+            self.ignored_messages += 1
+        for address, args in messages:
+            self.handle_message(address, args, t_ms)
+
+    def handle_message(self, address, args, t_ms):
+        """ビート・トランスポートのメッセージをフィルタに反映"""
+        numbers = [arg for arg in args if isinstance(arg, (int, float))]
+        with self.lock:
+            beat_filter = self.filter
+            if address == "/beat":
+                beat = numbers[0] if numbers else None
+                bpm = numbers[1] if len(numbers) > 1 else None
+                beat_filter.observe(t_ms, beat, bpm)
+            elif address == "/start":
+                beat_filter.start(t_ms, numbers[0] if numbers else 0.0)
+            elif address == "/stop":
+                beat_filter.stop(t_ms)
+            elif address == "/continue":
+                beat_filter.resume(t_ms)
+            elif address == "/bpm" and numbers:
+                beat_filter.set_bpm(numbers[0])
+            else:
+                self.ignored_messages += 1
+                return
+        self.messages += 1
+
+    def handle_midi(self, message_type, song_position, t_ms, state):
+        """MIDIのクロック・トランスポートをフィルタに反映"""
+        with self.lock:
+            beat_filter = self.filter
+            if message_type == "clock":
+                if not state["running"]:
+                    return
+                state["pulses"] += 1
+                beat_filter.observe(t_ms, state["pulses"] / MIDI_CLOCKS_PER_BEAT)
+            elif message_type == "start":
+                # スタートの後の最初のクロックがビート0（observeで開始する）
+                state["pulses"] = -1
+                state["running"] = True
+                beat_filter.stop(t_ms)
+            elif message_type == "continue":
+                state["running"] = True
+                beat_filter.resume(t_ms)
+            elif message_type == "stop":
+                state["running"] = False
+                beat_filter.stop(t_ms)
+            elif message_type == "songpos":
+                state["pulses"] = song_position * MIDI_CLOCKS_PER_SONG_POSITION
+                beat_filter.locate(t_ms, state["pulses"] / MIDI_CLOCKS_PER_BEAT)
+            else:
+                return
+        self.messages += 1
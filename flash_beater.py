@@ -3,39 +3,29 @@
 """
 import pygame
 from drawable import Drawable
+from tween import tween, cancel_tweens
 
 
 class FlashBeater(Drawable):
     """ビートに合わせて色が変化する円形オブジェクト"""
+    __slots__ = ('radius', 'base_color', 'flash_color', 'current_color', 'flash_beats')
+    
     def __init__(self, x, y, radius=50, color=(255, 255, 255), flash_color=(255, 255, 0), priority=0):
         super().__init__(x, y, priority)
         self.radius = radius
         self.base_color = color
         self.flash_color = flash_color
         self.current_color = color
-        self.flash_frame = 0
-        self.flash_duration = 5  # 5フレームで元の色に戻る
-    
-    def update(self):
-        """フレームごとの更新処理"""
-        if self.flash_frame > 0:
-            # フラッシュ中の処理：5フレームで元の色に戻る
-            progress = 1.0 - (self.flash_frame / self.flash_duration)
-            
-            # 色を線形補間
-            r = int(self.base_color[0] + (self.flash_color[0] - self.base_color[0]) * progress)
-            g = int(self.base_color[1] + (self.flash_color[1] - self.base_color[1]) * progress)
-            b = int(self.base_color[2] + (self.flash_color[2] - self.base_color[2]) * progress)
-            
-            self.current_color = (r, g, b)
-            self.flash_frame -= 1
-        else:
-            self.current_color = self.base_color
+        self.flash_beats = 1 / 3  # 1/3ビートで元の色に戻る
     
     def on_beat(self, beat, measure):
-        """ビートのタイミングでフラッシュ開始"""
-        self.flash_frame = self.flash_duration
-        self.current_color = self.flash_color
+        """ビートのタイミングでフラッシュ開始（フラッシュ色から基本色にトゥイーン）"""
+        tween(self, 'current_color', self.flash_color, self.base_color, beats=self.flash_beats, as_int=True)
+    
+    def restore_state(self, beat, phase, ticks_per_beat):
+        """ビートの先頭では前のビートのフラッシュは終わっているため基本色に戻す"""
+        cancel_tweens(self)
+        self.current_color = self.base_color
     
     def draw(self, screen):
         """円を描画"""
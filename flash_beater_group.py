@@ -0,0 +1,134 @@
+"""
+ビートに合わせて色が変化する円形オブジェクトをまとめて扱うグループ
+"""
+import numpy as np
+import pygame
+import pygame.gfxdraw
+from drawable import Drawable
+
+
+class FlashBeaterGroup(Drawable):
+    """多数のFlashBeaterをNumPy配列でまとめて更新・描画するオブジェクト
+
+    各円の色・フラッシュの残りフレーム数を配列で保持して一括で補間し、
+    描画は量子化した色と半径をキーにした事前描画済みのアンチエイリアス円スプライトで行う。
+    """
+    __slots__ = ('flash_duration', 'color_step', 'positions', 'radii', 'base_colors',
+                 'flash_colors', 'current_colors', 'flash_frames', '_settled',
+                 '_sprite_cache', '_sprite_keys', '_blit_sequence')
+
+    # updateは自分の色の配列だけを変更する
+    independent = True
+
+    def __init__(self, priority=0, flash_duration=5, color_step=8):
+        """
+        Args:
+            priority: 描画優先順位
+            flash_duration: フラッシュが元の色に戻るまでのフレーム数
+            color_step: スプライトキャッシュのキーにする色の量子化幅
+        """
+        super().__init__(0, 0, priority)
+        self.flash_duration = flash_duration
+        self.color_step = color_step
+
+        # メンバーごとの状態（行がメンバーに対応）
+        self.positions = np.zeros((0, 2), dtype=np.int32)
+        self.radii = np.zeros(0, dtype=np.int32)
+        self.base_colors = np.zeros((0, 3), dtype=np.float32)
+        self.flash_colors = np.zeros((0, 3), dtype=np.float32)
+        self.current_colors = np.zeros((0, 3), dtype=np.int32)
+        self.flash_frames = np.zeros(0, dtype=np.int32)
+        self._settled = True  # 全メンバーが基本色に戻っているかどうか
+
+        # (量子化した色, 半径) -> 円スプライト
+        self._sprite_cache = {}
+        self._sprite_keys = None
+        self._blit_sequence = []
+
+    def add(self, x, y, radius=50, color=(255, 255, 255), flash_color=(255, 255, 0)):
+        """円を追加（FlashBeaterと同じ引数）
+
+        Returns:
+            int: 追加した円のインデックス
+        """
+        self.positions = np.vstack([self.positions, [(int(x), int(y))]]).astype(np.int32)
+        self.radii = np.append(self.radii, np.int32(radius))
+        self.base_colors = np.vstack([self.base_colors, [color]]).astype(np.float32)
+        self.flash_colors = np.vstack([self.flash_colors, [flash_color]]).astype(np.float32)
+        self.current_colors = np.vstack([self.current_colors, [color]]).astype(np.int32)
+        self.flash_frames = np.append(self.flash_frames, np.int32(0))
+        self._sprite_keys = None
+        return len(self.radii) - 1
+
+    def __len__(self):
+        return len(self.radii)
+
+    def update(self):
+        """フレームごとの更新処理（全メンバーを一括で補間）"""
+        if self._settled:
+            return
+        flashing = self.flash_frames > 0
+        if not flashing.any():
+            self.current_colors[:] = self.base_colors
+            self._settled = True
+            return
+
+        # FlashBeaterと同じく、ビートのフラッシュ色から基本色へ線形に戻す
+        # （FlashBeaterはトゥイーンでビート単位、こちらは配列で一括に進めるためフレーム単位）
+        self.flash_frames[flashing] -= 1
+        remaining = self.flash_frames / self.flash_duration
+        colors = self.base_colors + (self.flash_colors - self.base_colors) * remaining[:, None]
+        self.current_colors[:] = np.where(flashing[:, None], colors, self.base_colors)
+
+    def on_beat(self, beat, measure):
+        """ビートのタイミングで全メンバーのフラッシュ開始"""
+        self.flash_frames[:] = self.flash_duration
+        self.current_colors[:] = self.flash_colors
+        self._settled = False
+
+    def restore_state(self, beat, phase, ticks_per_beat):
+        """ビートの先頭では前のビートのフラッシュは終わっているため基本色に戻す"""
+        self.flash_frames[:] = 0
+        self.current_colors[:] = self.base_colors
+        self._settled = True
+
+    def draw(self, screen):
+        """円スプライトをまとめて描画"""
+        if not len(self.radii):
+            return
+
+        # 量子化した色と半径を1つの整数キーにまとめ、前回と同じならblit列を使い回す
+        # （色24ビット＋半径16ビットはint32に収まらないためint64で計算）
+        step = self.color_step
+        quantized = np.minimum((self.current_colors + step // 2) // step * step, 255).astype(np.int64)
+        radii = self.radii.astype(np.int64)
+        keys = ((quantized[:, 0] * 256 + quantized[:, 1]) * 256 + quantized[:, 2]) * 65536 + radii
+        if self._sprite_keys is None or not np.array_equal(keys, self._sprite_keys):
+            self._sprite_keys = keys
+            topleft = (self.positions - self.radii[:, None]).tolist()
+            self._blit_sequence = [
+                (self._get_sprite(key), tuple(pos))
+                for key, pos in zip(keys.tolist(), topleft)
+            ]
+        sequence = self._blit_sequence
+        if Drawable.particle_stride > 1:
+            sequence = sequence[::Drawable.particle_stride]
+        screen.blits(sequence, doreturn=False)
+
+    def _get_sprite(self, key):
+        """キーに対応する円スプライトを取得（なければ作成）"""
+        sprite = self._sprite_cache.get(key)
+        if sprite is None:
+            radius = key % 65536
+            rgb = key // 65536
+            color = (rgb >> 16 & 0xff, rgb >> 8 & 0xff, rgb & 0xff)
+            size = radius * 2 + 1
+            sprite = pygame.Surface((size, size), pygame.SRCALPHA)
+            pygame.gfxdraw.filled_circle(sprite, radius, radius, radius, color)
+            pygame.gfxdraw.aacircle(sprite, radius, radius, radius, color)
+            if pygame.display.get_surface() is not None:
+                sprite = sprite.convert_alpha()
+            # 透明部分をランレングス圧縮してblitを高速化
+            sprite.set_alpha(255, pygame.RLEACCEL)
+            self._sprite_cache[key] = sprite
+        return sprite
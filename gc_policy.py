@@ -0,0 +1,93 @@
+"""
+再生中のGC方針 - 循環参照のガベージコレクションをシーンの切り替えとカウントダウンの間にまとめて行う
+"""
+import gc
+import time
+
+
+class PlaybackGCPolicy:
+    """再生中の自動GCを止め、目立たないタイミングでだけ回収するクラス
+
+    再生開始時（シーンの準備が終わった後）に回収してからgc.freeze()で既存のオブジェクトを回収の対象外にし、
+    自動GCを無効にする。回収はシーンの切り替え・曲の切り替え・シーク・カウントダウン開始の後の
+    フレームの終わり（表示の後）に行う。無効にしている間も第0世代のオブジェクト数がyoung_limitを
+    超えた場合は、メモリが増え続けないように第0世代だけを回収する。
+
+    GCの停止時間は自動GCも含めて全てgc.callbacksで計測し、プロファイラのgc_pauseに記録する。
+    """
+
+    def __init__(self, freeze=True, young_limit=20000):
+        """
+        Args:
+            freeze: 再生開始時にgc.freeze()するかどうか
+            young_limit: 自動GCの無効中に第0世代だけを回収する、第0世代のオブジェクト数
+        """
+        self.freeze = freeze
+        self.young_limit = young_limit
+        self.profiler = None
+        self.active = False
+        self._collect_pending = False
+        self._pause_start = None
+
+        # 統計情報
+        self.collections = 0
+        self.total_pause_ms = 0.0
+        self.max_pause_ms = 0.0
+
+    def attach(self, movie):
+        """Movieに設定し、GCの停止時間の計測を開始"""
+        movie.gc_policy = self
+        self.profiler = movie.profiler
+        if self._on_gc not in gc.callbacks:
+            gc.callbacks.append(self._on_gc)
+
+    def begin(self, movie):
+        """再生ループの開始時に呼ばれ、回収してから自動GCを無効にする"""
+        gc.collect()
+        if self.freeze:
+            gc.freeze()
+        gc.disable()
+        self.active = True
+        print(f"Automatic GC disabled during playback ({gc.get_freeze_count()} objects frozen)")
+
+    def request_collect(self):
+        """このフレームの終わりに回収する（シーンの切り替えなどで呼ばれる）"""
+        self._collect_pending = True
+
+    def end_frame(self, movie):
+        """フレームの終わり（表示の後）に呼ばれ、必要なら回収"""
+        if not self.active:
+            return
+        if self._collect_pending:
+            self._collect_pending = False
+            gc.collect()
+        elif gc.get_count()[0] > self.young_limit:
+            gc.collect(0)
+
+    def close(self):
+        """自動GCを元に戻し、計測を終了"""
+        if self.active:
+            gc.enable()
+            if self.freeze:
+                gc.unfreeze()
+            self.active = False
+        if self._on_gc in gc.callbacks:
+            gc.callbacks.remove(self._on_gc)
+        if self.collections:
+            print(f"GC: {self.collections} collections, total {self.total_pause_ms:.1f} ms, "
+                  f"max {self.max_pause_ms:.2f} ms")
+
+    def _on_gc(self, phase, info):
+        """GCの開始・終了時に呼ばれ、停止時間を記録"""
+        if phase == "start":
+            self._pause_start = time.perf_counter()
+            return
+        if self._pause_start is None:
+            return
+        pause_ms = (time.perf_counter() - self._pause_start) * 1000.0
+        self._pause_start = None
+        self.collections += 1
+        self.total_pause_ms += pause_ms
+        self.max_pause_ms = max(self.max_pause_ms, pause_ms)
+        if self.profiler is not None:
+            self.profiler.record("gc_pause", pause_ms)
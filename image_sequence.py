@@ -0,0 +1,195 @@
+"""
+連番画像をビートに合わせて再生するオブジェクト（ディスクからストリーミング）
+"""
+import threading
+
+from drawable import Drawable
+from surface_cache import decode_image, blit_flags
+
+
+class ImageSequence(Drawable):
+    """連番画像をビートに合わせて再生するオブジェクト
+
+    全フレームを読み込む代わりに、バックグラウンドのスレッドが再生位置から先のring_sizeフレームだけを
+    デコードしてリングに保持する。シーケンスの長さに関係なく、メモリ使用量はring_sizeフレーム分で一定。
+
+    デコードが追いつかない場合、再生位置を過ぎたフレームはデコードせずに飛ばし（ドロップ）、
+    表示は次のフレームが届くまで直前のフレームのまま（ホールド）にする。
+    読み込めないフレーム（ファイルがない・壊れている）は最初の1回だけエラーを表示し、ドロップとして扱う。
+    """
+    __slots__ = ('frame_paths', 'scale', 'frames_per_beat', 'loop', 'ring_size',
+                 'current_image', 'rect', 'current_frame', 'shown_frame', 'dropped_frames', 'held_frames',
+                 '_origin', '_restored_beat', '_restored_phase', '_beat_position', '_last_beat', '_ticks_since_beat',
+                 '_ticks_per_beat', '_frames', '_failed', '_condition', '_thread', '_closed')
+
+    # updateは自分の再生位置だけを変更する（デコードスレッドとはConditionで同期）
+    independent = True
+
+    def __init__(self, x, y, frame_paths, frames_per_beat=4.0, scale=1.0, loop=True, ring_size=16, priority=0):
+        """
+        Args:
+            x, y: 中心の位置
+            frame_paths: フレーム画像のパスのリスト（再生順）
+            frames_per_beat: 1ビートあたりに進めるフレーム数
+            scale: 画像のスケール
+            loop: 最後のフレームの後に先頭に戻るかどうか（Falseの場合は最後のフレームで止まる）
+            ring_size: デコード済みで保持するフレーム数
+            priority: 描画優先順位
+        """
+        super().__init__(x, y, priority)
+        if not frame_paths:
+            raise ValueError("At least one frame path must be provided")
+        self.frame_paths = list(frame_paths)
+        self.scale = scale
+        self.frames_per_beat = frames_per_beat
+        self.loop = loop
+        self.ring_size = max(1, min(ring_size, len(self.frame_paths)))
+
+        # 再生位置（ビート時計から計算）
+        self.current_frame = 0
+        self._origin = None  # シーン内ビート0の絶対ビート番号
+        self._restored_beat = 0  # シーク後の最初のon_beatのシーン内ビート
+        self._restored_phase = 0.0  # シーク先のビート内の位相
+        self._beat_position = None  # シーン内ビート
+        self._last_beat = None
+        self._ticks_since_beat = 0
+        self._ticks_per_beat = 0  # 直前のビート間のupdate回数（ビート内の位相の計算用）
+
+        # フレーム番号 -> デコード済みのSurface（デコードスレッドと共有）
+        self._frames = {}
+        self._failed = set()  # デコードに失敗したフレーム番号（再試行しない）
+        self._condition = threading.Condition()
+        self._closed = False
+
+        # 統計情報
+        self.shown_frame = None
+        self.dropped_frames = 0  # 表示されずに飛ばしたフレーム数
+        self.held_frames = 0  # 次のフレームが間に合わず前のフレームを表示し続けた回数
+
+        # 最初のフレームは同期的に読み込んで表示できるようにする
+        self.current_image = decode_image(self.frame_paths[0], scale)
+        self._frames[0] = self.current_image
+        self.rect = self.current_image.get_rect(center=(x, y))
+
+        # 生成直後から先頭のリング分を先読みする
+        self._thread = threading.Thread(target=self._decode_loop, name="image-sequence", daemon=True)
+        self._thread.start()
+
+    def __len__(self):
+        return len(self.frame_paths)
+
+    def _wanted_frames(self, start):
+        """再生位置から先に保持するフレーム番号のリスト"""
+        count = len(self.frame_paths)
+        if self.loop:
+            return [(start + i) % count for i in range(self.ring_size)]
+        return list(range(start, min(start + self.ring_size, count)))
+
+    def _decode_loop(self):
+        """再生位置から先のフレームをリングが埋まるまでデコード"""
+        condition = self._condition
+        with condition:
+            while not self._closed:
+                wanted = self._wanted_frames(self.current_frame)
+                # 再生位置を過ぎたフレームを捨てる
+                for index in [index for index in self._frames if index not in wanted]:
+                    del self._frames[index]
+                missing = next((index for index in wanted
+                                if index not in self._frames and index not in self._failed), None)
+                if missing is None:
+                    condition.wait()
+                    continue
+
+                condition.release()
+                image = None
+                try:
+                    image = decode_image(self.frame_paths[missing], self.scale)
+                except Exception as e:
+                    # 1フレームの失敗でスレッドを止めない（止まると以降のフレームが表示されない）
+                    if not self._failed:
+                        print(f"ImageSequence: failed to decode {self.frame_paths[missing]} ({e}), "
+                              f"skipping undecodable frames")
+                finally:
+                    condition.acquire()
+                if image is None:
+                    self._failed.add(missing)
+                    continue
+                # デコード中に再生位置が先に進んでいたら捨てる
+                if missing in self._wanted_frames(self.current_frame):
+                    self._frames[missing] = image
+
+    def close(self):
+        """デコードスレッドを停止してフレームを解放（シーン・トラックの解放時に呼ばれる）"""
+        with self._condition:
+            self._closed = True
+            self._frames.clear()
+            self._condition.notify()
+        self._thread.join()
+
+    def _seek_frame(self, frame):
+        """再生位置を設定し、デコードスレッドに通知"""
+        count = len(self.frame_paths)
+        frame = frame % count if self.loop else min(frame, count - 1)
+        if frame != self.current_frame:
+            with self._condition:
+                self.current_frame = frame
+                self._condition.notify()
+
+    def update(self):
+        """ビート内の位相から再生位置を進める"""
+        if self._beat_position is None:
+            return
+        self._ticks_since_beat += 1
+        phase = 0.0
+        if self._ticks_per_beat:
+            phase = min(self._ticks_since_beat / self._ticks_per_beat, 0.999)
+        self._seek_frame(int((self._beat_position + phase) * self.frames_per_beat))
+
+    def on_beat(self, beat, measure):
+        """ビートのタイミングで再生位置をビートの先頭に合わせる"""
+        phase = 0.0
+        if self._origin is None:
+            self._origin = beat - self._restored_beat
+            # シーク直後はビートの途中から再生する
+            phase = self._restored_phase
+            self._restored_phase = 0.0
+        if self._last_beat is not None and beat == self._last_beat + 1:
+            self._ticks_per_beat = self._ticks_since_beat
+        self._last_beat = beat
+        self._ticks_since_beat = round(phase * self._ticks_per_beat)
+        self._beat_position = beat - self._origin
+        self._seek_frame(int((self._beat_position + phase) * self.frames_per_beat))
+
+    def restore_state(self, beat, phase, ticks_per_beat):
+        """シーク先のビートから再生位置を計算（次のon_beatで絶対ビートとの対応を取り直す）"""
+        self._origin = None
+        self._restored_beat = beat
+        self._restored_phase = phase
+        self._beat_position = None
+        self._last_beat = None
+        self._ticks_since_beat = 0
+        self._ticks_per_beat = ticks_per_beat
+        self._seek_frame(int((beat + phase) * self.frames_per_beat))
+
+    def draw(self, screen):
+        """再生位置のフレームを描画（デコードが間に合っていない場合は前のフレーム）"""
+        frame = self.current_frame
+        image = self._frames.get(frame)
+        if image is not None:
+            if self.shown_frame is not None and frame > self.shown_frame + 1:
+                self.dropped_frames += frame - self.shown_frame - 1
+            self.shown_frame = frame
+            if image is not self.current_image:
+                self.current_image = image
+                self.rect = image.get_rect(center=(self.x, self.y))
+        elif frame in self._failed:
+            # 読み込めないフレームは前のフレームを表示したままドロップとして数える
+            if frame != self.shown_frame:
+                if self.shown_frame is not None and frame > self.shown_frame:
+                    self.dropped_frames += frame - self.shown_frame
+                else:
+                    self.dropped_frames += 1
+                self.shown_frame = frame
+        elif frame != self.shown_frame:
+            self.held_frames += 1
+        screen.blit(self.current_image, self.rect, special_flags=blit_flags(self.current_image))
@@ -0,0 +1,232 @@
+"""
+サーフェスのメモリ使用量の集計 - シーン・Drawable・元画像ごとのレポートと予算の監視
+"""
+import os
+import tracemalloc
+
+import pygame
+
+from object_pool import get_default_surface_pool
+from surface_cache import get_default_cache
+
+# Drawableの属性をたどる深さ（リスト・辞書・タプルの入れ子）
+MAX_DEPTH = 3
+
+
+def surface_bytes(surface):
+    """Surfaceのピクセルデータのバイト数（サブサーフェスの場合は親のSurface全体）"""
+    surface = root_surface(surface)
+    return surface.get_pitch() * surface.get_height()
+
+
+def root_surface(surface):
+    """サブサーフェスの場合はピクセルを所有している親のSurfaceを取得"""
+    parent = surface.get_parent()
+    while parent is not None:
+        surface = parent
+        parent = surface.get_parent()
+    return surface
+
+
+def find_surfaces(obj, depth=0):
+    """オブジェクトの属性から参照されているSurfaceを列挙
+
+    Yields:
+        (属性名, Surface)
+    """
+    if depth > MAX_DEPTH:
+        return
+    if isinstance(obj, pygame.Surface):
+        yield "", obj
+        return
+    if isinstance(obj, (list, tuple, set, frozenset)):
+        for value in obj:
+            for name, surface in find_surfaces(value, depth + 1):
+                yield name, surface
+        return
+    if isinstance(obj, dict):
+        for value in obj.values():
+            for name, surface in find_surfaces(value, depth + 1):
+                yield name, surface
+        return
+    if depth > 0:
+        # 入れ子の中のオブジェクトまではたどらない（シーンや他のDrawableへの参照を避ける）
+        return
+
+    names = []
+    for cls in type(obj).__mro__:
+        names.extend(getattr(cls, "__slots__", ()))
+    names.extend(getattr(obj, "__dict__", {}))
+    for name in dict.fromkeys(names):
+        value = getattr(obj, name, None)
+        for _, surface in find_surfaces(value, depth + 1):
+            yield name, surface
+
+
+class SurfaceMemoryReport:
+    """Movie全体のサーフェスのメモリ使用量
+
+    複数のDrawableから共有されているSurface（SurfaceCacheの画像など）は最初に見つかった所有者で1回だけ数える。
+    """
+
+    def __init__(self):
+        self.total_bytes = 0
+        self.scene_bytes = {}  # シーン名 -> バイト数
+        self.drawable_bytes = []  # (シーン名, Drawable名, バイト数, Surface数)
+        self.source_bytes = {}  # 元画像のパス（キャッシュ外は"(generated)"） -> バイト数
+        self.other_bytes = {}  # 切り替え効果のバッファなどシーン外のSurface -> バイト数
+        self.surface_count = 0
+        self.shared_count = 0  # 2回目以降に見つかったため数えなかった参照の数
+
+    @classmethod
+    def collect(cls, movie, cache=None):
+        """Movieのシーンツリーをたどって集計"""
+        report = cls()
+        cache = cache if cache is not None else get_default_cache()
+        sources = {}
+        for (path, scale), surface in cache.items():
+            label = os.path.relpath(path) if scale == 1.0 else f"{os.path.relpath(path)} (x{scale:g})"
+            sources[id(root_surface(surface))] = label
+        seen = set()
+
+        def count(surface):
+            surface = root_surface(surface)
+            if id(surface) in seen:
+                report.shared_count += 1
+                return 0
+            seen.add(id(surface))
+            size = surface_bytes(surface)
+            source = sources.get(id(surface), "(generated)")
+            report.source_bytes[source] = report.source_bytes.get(source, 0) + size
+            report.surface_count += 1
+            report.total_bytes += size
+            return size
+
+        for index, scene in enumerate(movie.scenes):
+            scene_name = f"{index + 1}:{scene.name}"
+            scene_total = 0
+            for drawable_index, drawable in enumerate(scene.drawables):
+                size = 0
+                surfaces = 0
+                for _, surface in find_surfaces(drawable):
+                    added = count(surface)
+                    size += added
+                    surfaces += 1 if added else 0
+                report.drawable_bytes.append(
+                    (scene_name, f"{type(drawable).__name__}#{drawable_index}", size, surfaces)
+                )
+                scene_total += size
+            # レイヤーキャッシュはシーン自身が所有する
+            for surface in scene._layer_caches:
+                if surface is not None:
+                    size = count(surface)
+                    scene_total += size
+                    if size:
+                        report.drawable_bytes.append((scene_name, "(layer cache)", size, 1))
+            report.scene_bytes[scene_name] = scene_total
+
+        if movie.screen is not movie.display:
+            report.other_bytes["render canvas"] = count(movie.screen)
+        buffers = movie.transition_buffers
+        if buffers is not None:
+            report.other_bytes["transition buffers"] = sum(
+                count(surface) for surface in (buffers.outgoing, buffers.incoming, buffers.scratch)
+            )
+        pooled = sum(count(surface) for surface in get_default_surface_pool().free_surfaces())
+        if pooled:
+            report.other_bytes["surface pool"] = pooled
+        return report
+
+    def format(self, top=10):
+        """レポートを文字列に整形"""
+        lines = [f"Surface memory: {_mb(self.total_bytes)} in {self.surface_count} surfaces "
+                 f"({self.shared_count} shared references counted once)"]
+        lines.append("  Per scene:")
+        for name, size in self.scene_bytes.items():
+            lines.append(f"    {name:<30} {_mb(size):>10}")
+        for name, size in self.other_bytes.items():
+            lines.append(f"    {name:<30} {_mb(size):>10}")
+        lines.append(f"  Top {top} drawables:")
+        for scene_name, name, size, surfaces in sorted(self.drawable_bytes, key=lambda row: -row[2])[:top]:
+            lines.append(f"    {scene_name + ' / ' + name:<40} {_mb(size):>10} ({surfaces} surfaces)")
+        lines.append(f"  Top {top} source images:")
+        for source, size in sorted(self.source_bytes.items(), key=lambda item: -item[1])[:top]:
+            lines.append(f"    {source:<40} {_mb(size):>10}")
+        return "\n".join(lines)
+
+    def print(self, top=10):
+        print(self.format(top))
+
+
+class MemoryMonitor:
+    """シーンの切り替えごとにサーフェスのメモリ使用量を確認し、予算を超えたら警告するクラス
+
+    trace_allocations=Trueの場合はtracemallocのスナップショットも取り、前回の切り替えからの差分を表示する。
+    tracemallocが追跡するのはPython側の確保（リストやNumPy配列など）で、
+    SDLが確保するSurfaceのピクセルデータは含まれない（そちらはSurfaceMemoryReportで数える）。
+    """
+
+    def __init__(self, budget_mb=None, scene_budget_mb=None, trace_allocations=False, top=10):
+        """
+        Args:
+            budget_mb: Movie全体のサーフェスのメモリ予算（MB、Noneで無制限）
+            scene_budget_mb: シーンごとのメモリ予算（MB、Noneで無制限）
+            trace_allocations: tracemallocのスナップショットを取るかどうか
+            top: 表示する件数
+        """
+        self.budget_bytes = budget_mb * 1024 * 1024 if budget_mb is not None else None
+        self.scene_budget_bytes = scene_budget_mb * 1024 * 1024 if scene_budget_mb is not None else None
+        self.trace_allocations = trace_allocations
+        self.top = top
+        self.last_report = None
+        self._last_snapshot = None
+        if trace_allocations and not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+    def check(self, movie, label=""):
+        """メモリ使用量を集計し、予算を超えていれば警告
+
+        Returns:
+            SurfaceMemoryReport: 集計結果
+        """
+        report = SurfaceMemoryReport.collect(movie)
+        self.last_report = report
+
+        if self.budget_bytes is not None and report.total_bytes > self.budget_bytes:
+            print(f"WARNING: Surface memory {_mb(report.total_bytes)} exceeds budget "
+                  f"{_mb(self.budget_bytes)} {label}")
+            report.print(self.top)
+        if self.scene_budget_bytes is not None:
+            for name, size in report.scene_bytes.items():
+                if size > self.scene_budget_bytes:
+                    print(f"WARNING: Scene '{name}' uses {_mb(size)} of surfaces "
+                          f"(budget {_mb(self.scene_budget_bytes)})")
+
+        if self.trace_allocations:
+            self._compare_snapshot(label)
+        return report
+
+    def on_scene_change(self, movie, old_scene, new_scene):
+        """シーンの切り替え時にMovieから呼ばれる"""
+        old_name = old_scene.name if old_scene is not None else "-"
+        new_name = new_scene.name if new_scene is not None else "-"
+        self.check(movie, f"(at '{old_name}' -> '{new_name}')")
+
+    def _compare_snapshot(self, label):
+        """前回のスナップショットからの確保量の差分を表示"""
+        snapshot = tracemalloc.take_snapshot().filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+        ))
+        if self._last_snapshot is not None:
+            stats = snapshot.compare_to(self._last_snapshot, "lineno")
+            growth = sum(stat.size_diff for stat in stats)
+            print(f"Python allocations since last check: {growth / 1024:+.1f} KiB {label}")
+            for stat in stats[:self.top]:
+                if stat.size_diff:
+                    print(f"  {stat}")
+        self._last_snapshot = snapshot
+
+
+def _mb(size):
+    return f"{size / (1024 * 1024):.2f} MB"
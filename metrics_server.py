@@ -0,0 +1,151 @@
+"""
+メトリクスサーバー - 再生中のFPS・フレーム時間・ビートの遅れ・現在のシーンをlocalhostのHTTPで公開する
+"""
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+from profiler import describe
+
+# describe()が返すパーセンタイル
+QUANTILES = (50, 90, 99)
+
+
+class MetricsServer:
+    """Prometheusのテキスト形式（/metrics）とJSON（/metrics.json）でメトリクスを返すHTTPサーバー
+
+    描画ループはフレームごとにpublish()でスカラー値だけのスナップショット（不変のdict）に差し替え、
+    フレーム時間などの値の列はサーバースレッドがリクエストのたびにプロファイラからコピーして集計する。
+    ロックを取らないため描画と競合しない。summaryの_countと_sumは記録開始からの累計。
+    """
+
+    def __init__(self, host="127.0.0.1", port=9108, profiler=None):
+        """
+        Args:
+            host, port: 待ち受けるアドレスとポート（0で空いているポート）
+            profiler: フレーム時間と区間ごとの時間を読み出すFrameProfiler
+        """
+        self.host = host
+        self.port = port
+        self.profiler = profiler
+        self.snapshot = {}
+        self._server = None
+        self._thread = None
+
+    def start(self):
+        """バックグラウンドスレッドでサーバーを開始"""
+        metrics = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path == "/metrics":
+                    body = metrics.render_prometheus().encode("utf-8")
+                    content_type = "text/plain; version=0.0.4; charset=utf-8"
+                elif self.path == "/metrics.json":
+                    body = json.dumps(metrics.render_json()).encode("utf-8")
+                    content_type = "application/json"
+                else:
+                    self.send_error(404)
+                    return
+                self.send_response(200)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                # アクセスログでコンソールを埋めない
+                pass
+
+        try:
+            self._server = HTTPServer((self.host, self.port), Handler)
+        except OSError as e:
+            print(f"Metrics server failed to start on {self.host}:{self.port} ({e})")
+            return False
+        self.port = self._server.server_address[1]
+        self._thread = threading.Thread(target=self._server.serve_forever, name="metrics-server", daemon=True)
+        self._thread.start()
+        print(f"Metrics available at http://{self.host}:{self.port}/metrics (JSON: /metrics.json)")
+        return True
+
+    def stop(self):
+        """サーバーを停止"""
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def publish(self, snapshot):
+        """スナップショットを差し替え（参照の代入のみ）"""
+        self.snapshot = snapshot
+
+    def render_json(self):
+        """スナップショットをJSON用のdictに集計"""
+        result = dict(self.snapshot)
+        frame_times, sections, totals = self.profiler.copy_windows() if self.profiler else ((), {}, {})
+        result["frame_time_ms"] = _describe_with_totals(frame_times, totals.get(None))
+        result["sections_ms"] = {
+            name: _describe_with_totals(samples, totals.get(name)) for name, samples in sections.items()
+        }
+        return result
+
+    def render_prometheus(self):
+        """スナップショットをPrometheusのテキスト形式に変換"""
+        data = self.render_json()
+        lines = []
+
+        def metric(name, kind, help_text, samples):
+            lines.append(f"# HELP beani_{name} {help_text}")
+            lines.append(f"# TYPE beani_{name} {kind}")
+            for labels, value in samples:
+                lines.append(f"beani_{name}{_format_labels(labels)} {value}")
+
+        def summary(name, help_text, series):
+            lines.append(f"# HELP beani_{name} {help_text}")
+            lines.append(f"# TYPE beani_{name} summary")
+            for labels, stats in series:
+                for point in QUANTILES:
+                    if f"p{point}" in stats:
+                        lines.append(f"beani_{name}{_format_labels(dict(labels, quantile=point / 100))} "
+                                     f"{stats[f'p{point}']}")
+                lines.append(f"beani_{name}_sum{_format_labels(labels)} {stats.get('total_sum', 0.0)}")
+                lines.append(f"beani_{name}_count{_format_labels(labels)} {stats.get('total_count', 0)}")
+
+        metric("fps", "gauge", "Measured frames per second", [({}, data.get("fps", 0))])
+        metric("frames_total", "counter", "Rendered frames", [({}, data.get("frames", 0))])
+        summary("frame_time_ms", "Frame time (quantiles over the recent window, sum and count since start)", [({}, data["frame_time_ms"])])
+        sections = dict(data["sections_ms"])
+        lateness = sections.pop("beat_lateness", None)
+        if sections:
+            summary("section_time_ms", "Time spent per frame section",
+                    [({"section": name}, stats) for name, stats in sections.items()])
+        if lateness is not None:
+            summary("beat_lateness_ms", "Delay between a beat boundary and its on_beat dispatch",
+                    [({}, lateness)])
+        metric("current_beat", "gauge", "Current beat of the playing track", [({}, data.get("beat", -1))])
+        metric("scene_index", "gauge", "Index of the current scene (-1 before start)",
+               [({}, data.get("scene_index", -1))])
+        metric("scene_info", "gauge", "Name of the current scene", [({"name": data.get("scene", "")}, 1)])
+        if "track_index" in data:
+            metric("track_index", "gauge", "Index of the current playlist track", [({}, data["track_index"])])
+        if "quality_level" in data:
+            metric("quality_level", "gauge", "Render quality level (0 = full quality)", [({}, data["quality_level"])])
+        return "\n".join(lines) + "\n"
+
+
+def _describe_with_totals(samples, total):
+    """直近の値の統計に記録開始からの件数（total_count）と合計（total_sum）を加える"""
+    stats = describe(samples)
+    count, total_sum = total if total is not None else (0, 0.0)
+    stats["total_count"] = count
+    stats["total_sum"] = total_sum
+    return stats
+
+
+def _format_labels(labels):
+    """ラベルを {key="value",...} の形式に変換（ラベルがない場合は空文字列）"""
+    if not labels:
+        return ""
+    escaped = (str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+               for value in labels.values())
+    return "{" + ",".join(f'{key}="{value}"' for key, value in zip(labels, escaped)) + "}"
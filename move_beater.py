@@ -1,12 +1,20 @@
 """
 複数画像を切り替えながら等速移動するオブジェクト
 """
-import pygame
 from drawable import Drawable
+from surface_cache import load_image, blit_flags
 
 
 class MoveBeater(Drawable):
     """複数画像をビートに合わせて切り替えながら等速移動するオブジェクト"""
+    __slots__ = ('velocity_x', 'velocity_y', 'scale', 'heavy_processing', 'wrap_screen',
+                 'screen_width', 'screen_height', 'initial_x', 'initial_y',
+                 'initial_velocity_x', 'initial_velocity_y', 'images',
+                 'current_image_index', 'current_image', 'rect', 'last_beat')
+    
+    # updateは自分の位置と矩形だけを変更する
+    independent = True
+    
     def __init__(self, x, y, image_paths, velocity_x=0, velocity_y=0, scale=1.0, 
                  heavy_processing=False, priority=0, wrap_screen=True, screen_width=800, screen_height=600):
         """
@@ -30,21 +38,22 @@ class MoveBeater(Drawable):
         self.screen_height = screen_height
         
         # 位置を浮動小数点で管理（正確な移動のため）
-        self.float_x = float(x)
-        self.float_y = float(y)
+        self.x = float(x)
+        self.y = float(y)
+        self.prev_x = self.x
+        self.prev_y = self.y
+        
+        # シーク時の状態復元用に初期状態を保持
+        self.initial_x = self.x
+        self.initial_y = self.y
+        self.initial_velocity_x = velocity_x
+        self.initial_velocity_y = velocity_y
         
         # 画像リストを読み込み
         self.images = []
         for image_path in image_paths:
             if image_path:
-                image = pygame.image.load(image_path)
-                if scale != 1.0:
-                    image = pygame.transform.scale(
-                        image,
-                        (int(image.get_width() * scale),
-                         int(image.get_height() * scale))
-                    )
-                self.images.append(image)
+                self.images.append(load_image(image_path, scale))
         
         # 画像がない場合のエラー回避
         if not self.images:
@@ -55,7 +64,7 @@ class MoveBeater(Drawable):
         self.current_image = self.images[self.current_image_index]
         
         # 矩形を初期化
-        self.rect = self.current_image.get_rect(center=(int(self.float_x), int(self.float_y)))
+        self.rect = self.current_image.get_rect(center=(int(self.x), int(self.y)))
         
         # ビート切り替えの管理
         self.last_beat = -1  # 前回処理したビート番号
@@ -70,8 +79,8 @@ class MoveBeater(Drawable):
             time.sleep(0.01)  # 10msの遅延をシミュレート
         
         # 位置を更新
-        self.float_x += self.velocity_x
-        self.float_y += self.velocity_y
+        self.x += self.velocity_x
+        self.y += self.velocity_y
         
         # 画面端での処理
         if self.wrap_screen:
@@ -79,10 +88,8 @@ class MoveBeater(Drawable):
         else:
             self._bounce_off_screen()
         
-        # 整数座標に変換して矩形を更新
-        self.x = int(self.float_x)
-        self.y = int(self.float_y)
-        self.rect = self.current_image.get_rect(center=(self.x, self.y))
+        # 矩形の位置を更新（画像サイズは変わらないので新しい矩形は作らない）
+        self.rect.center = (int(self.x), int(self.y))
     
     def _wrap_around_screen(self):
         """画面端で反対側に移動"""
@@ -90,15 +97,15 @@ class MoveBeater(Drawable):
         image_height = self.current_image.get_height()
         
         # 画像が完全に画面外に出たら反対側から登場
-        if self.float_x > self.screen_width + image_width // 2:
-            self.float_x = -image_width // 2
-        elif self.float_x < -image_width // 2:
-            self.float_x = self.screen_width + image_width // 2
+        if self.x > self.screen_width + image_width // 2:
+            self.x = -image_width // 2
+        elif self.x < -image_width // 2:
+            self.x = self.screen_width + image_width // 2
             
-        if self.float_y > self.screen_height + image_height // 2:
-            self.float_y = -image_height // 2
-        elif self.float_y < -image_height // 2:
-            self.float_y = self.screen_height + image_height // 2
+        if self.y > self.screen_height + image_height // 2:
+            self.y = -image_height // 2
+        elif self.y < -image_height // 2:
+            self.y = self.screen_height + image_height // 2
     
     def _bounce_off_screen(self):
         """画面端で跳ね返り"""
@@ -106,19 +113,19 @@ class MoveBeater(Drawable):
         image_height = self.current_image.get_height()
         
         # 左右の端で跳ね返り
-        if self.float_x <= image_width // 2:
-            self.float_x = image_width // 2
+        if self.x <= image_width // 2:
+            self.x = image_width // 2
             self.velocity_x = abs(self.velocity_x)  # 右向きに変更
-        elif self.float_x >= self.screen_width - image_width // 2:
-            self.float_x = self.screen_width - image_width // 2
+        elif self.x >= self.screen_width - image_width // 2:
+            self.x = self.screen_width - image_width // 2
             self.velocity_x = -abs(self.velocity_x)  # 左向きに変更
         
         # 上下の端で跳ね返り
-        if self.float_y <= image_height // 2:
-            self.float_y = image_height // 2
+        if self.y <= image_height // 2:
+            self.y = image_height // 2
             self.velocity_y = abs(self.velocity_y)  # 下向きに変更
-        elif self.float_y >= self.screen_height - image_height // 2:
-            self.float_y = self.screen_height - image_height // 2
+        elif self.y >= self.screen_height - image_height // 2:
+            self.y = self.screen_height - image_height // 2
             self.velocity_y = -abs(self.velocity_y)  # 上向きに変更
     
     def on_beat(self, beat, measure):
@@ -138,11 +145,76 @@ class MoveBeater(Drawable):
         self.current_image = self.images[self.current_image_index]
         
         # 矩形を更新（画像サイズが変わる可能性があるため）
-        self.rect = self.current_image.get_rect(center=(self.x, self.y))
+        self.rect = self.current_image.get_rect(center=(int(self.x), int(self.y)))
+    
+    def restore_state(self, beat, phase, ticks_per_beat):
+        """経過フレーム数から位置と画像を閉形式で計算"""
+        # ビートごとに1枚ずつ切り替わる
+        self.current_image_index = beat % len(self.images)
+        self.current_image = self.images[self.current_image_index]
+        self.last_beat = -1
+        
+        ticks = (beat + phase) * ticks_per_beat
+        image_width = self.current_image.get_width()
+        image_height = self.current_image.get_height()
+        if self.wrap_screen:
+            self.velocity_x = self.initial_velocity_x
+            self.velocity_y = self.initial_velocity_y
+            self.x = self._wrap_position(self.initial_x + self.velocity_x * ticks,
+                                               -(image_width // 2), self.screen_width + image_width // 2)
+            self.y = self._wrap_position(self.initial_y + self.velocity_y * ticks,
+                                               -(image_height // 2), self.screen_height + image_height // 2)
+        else:
+            self.x, self.velocity_x = self._bounce_position(
+                self.initial_x, self.initial_velocity_x, ticks,
+                image_width // 2, self.screen_width - image_width // 2)
+            self.y, self.velocity_y = self._bounce_position(
+                self.initial_y, self.initial_velocity_y, ticks,
+                image_height // 2, self.screen_height - image_height // 2)
+        
+        self.prev_x = self.x
+        self.prev_y = self.y
+        self.rect = self.current_image.get_rect(center=(int(self.x), int(self.y)))
+    
+    @staticmethod
+    def _wrap_position(position, low, high):
+        """折り返しモードでの位置を計算"""
+        span = high - low
+        if span <= 0:
+            return float(low)
+        return (position - low) % span + low
+    
+    @staticmethod
+    def _bounce_position(start, velocity, ticks, low, high):
+        """跳ね返りモードでの位置と速度を計算（三角波）
+        
+        Returns:
+            tuple: (位置, 速度)
+        """
+        span = high - low
+        if span <= 0 or velocity == 0:
+            return float(min(max(start, low), high)), velocity
+        # 速度の絶対値で進んだ距離を往復周期で畳み込む
+        start = min(max(start, low), high)
+        distance = (start - low if velocity > 0 else 2 * span - (start - low)) + abs(velocity) * ticks
+        distance %= 2 * span
+        if distance <= span:
+            return low + distance, abs(velocity)
+        return low + 2 * span - distance, -abs(velocity)
     
     def draw(self, screen):
         """画像を描画"""
-        screen.blit(self.current_image, self.rect)
+        flags = blit_flags(self.current_image)
+        t = Drawable.interpolation
+        if t < 1.0:
+            dx = self.x - self.prev_x
+            dy = self.y - self.prev_y
+            # 画面端で反対側に移動した直後は補間しない
+            if abs(dx) < self.rect.width and abs(dy) < self.rect.height:
+                center = (int(self.prev_x + dx * t), int(self.prev_y + dy * t))
+                screen.blit(self.current_image, self.current_image.get_rect(center=center), special_flags=flags)
+                return
+        screen.blit(self.current_image, self.rect, special_flags=flags)
     
     def set_velocity(self, velocity_x, velocity_y):
         """移動速度を変更"""
@@ -151,23 +223,16 @@ class MoveBeater(Drawable):
     
     def set_position(self, x, y):
         """位置を設定"""
-        self.float_x = float(x)
-        self.float_y = float(y)
-        self.x = int(self.float_x)
-        self.y = int(self.float_y)
-        self.rect = self.current_image.get_rect(center=(self.x, self.y))
+        self.x = float(x)
+        self.y = float(y)
+        self.prev_x = self.x
+        self.prev_y = self.y
+        self.rect = self.current_image.get_rect(center=(int(self.x), int(self.y)))
     
     def add_image(self, image_path):
         """実行時に画像を追加"""
         if image_path:
-            image = pygame.image.load(image_path)
-            if self.scale != 1.0:
-                image = pygame.transform.scale(
-                    image,
-                    (int(image.get_width() * self.scale),
-                     int(image.get_height() * self.scale))
-                )
-            self.images.append(image)
+            self.images.append(load_image(image_path, self.scale))
     
     def get_image_count(self):
         """画像数を取得"""
@@ -3,15 +3,57 @@
 """
 import pygame
 import os
+from bisect import bisect_right
 from scene import Scene
 from countdown import Countdown
+from drawable import Drawable
+from memory_report import SurfaceMemoryReport
+from metrics_server import MetricsServer
+from profiler import FrameProfiler
+from session_trace import SessionRecorder, take_pending_session
+from spectrum import SpectrumAnalyzer
+from time_source import RealtimeClock
+from transition import TransitionBuffers
+from tween import get_default_engine
+
+# 論理解像度のキャンバスを出力解像度に拡大する方法
+SCALE_SMOOTH = "smooth"  # キャンバスをsmoothscaleで出力Surfaceに拡大（品質ガバナーが下げるとscale）
+SCALE_SDL = "scaled"  # pygame.SCALEDでSDLに拡大を任せる（出力サイズはSDLが決める）
 
 
 class Movie:
     """ムービークラス"""
-    def __init__(self, width=800, height=600, fps=30, bpm=120, beats_per_measure=4):
+    def __init__(self, width=800, height=600, fps=30, bpm=120, beats_per_measure=4, sim_rate=None, max_sim_steps=5,
+                 time_source=None, spectrum_bands=None, display_flags=0, metrics_port=None,
+                 trace_file=None, output_size=None, scale_mode=SCALE_SMOOTH):
+        """
+        Args:
+            width, height: 画面サイズ（論理解像度。シーンの座標と画像のスケールはこの単位）
+            fps: 描画の上限フレームレート（0で上限なし）
+            bpm: 曲のBPM
+            beats_per_measure: 1小節あたりのビート数
+            sim_rate: 固定ステップでのシミュレーション周波数（Noneの場合は描画と同じ周期でupdate）
+            max_sim_steps: 1フレームで実行するシミュレーションステップの上限
+            time_source: 時間ソース（Noneの場合は実時間と音楽再生位置を使うRealtimeClock）
+            spectrum_bands: 音楽のスペクトルの帯域数（指定するとDrawable.on_spectrumに帯域エネルギーを通知）
+            display_flags: pygame.display.set_modeのフラグ（例: pygame.NOFRAME）
+            metrics_port: 指定するとlocalhostのこのポートでメトリクスを公開（0で空いているポート）
+            trace_file: 指定すると入力・時計の値・ビート・フレーム時間をこのファイルに記録
+            output_size: 指定すると論理解像度のキャンバスに描画し、この出力解像度に拡大して表示
+                （(0, 0)でデスクトップの解像度）
+            scale_mode: output_size指定時の拡大方法（SCALE_SMOOTHまたはSCALE_SDL）
+        """
+        if time_source is None:
+            time_source = RealtimeClock()
+        # セッションの記録・再生（session_trace.pyのコマンドから起動した場合も含む）
+        session = SessionRecorder(trace_file) if trace_file else take_pending_session()
+        if session is not None:
+            time_source = session.wrap_time_source(time_source)
+        self.time_source = time_source
+        
         pygame.init()
-        pygame.mixer.init()
+        if self.time_source.uses_audio:
+            pygame.mixer.init()
         
         self.width = width
         self.height = height
@@ -19,15 +61,38 @@ class Movie:
         self.bpm = bpm
         self.beats_per_measure = beats_per_measure
         
-        self.screen = pygame.display.set_mode((width, height))
+        # 描画先（self.screen）は常に論理解像度。出力解像度が異なる場合はpresent()で1回だけ拡大する
+        self.output_size = output_size
+        self.scale_mode = scale_mode
+        if output_size is None:
+            self.display = pygame.display.set_mode((width, height), display_flags)
+            self.screen = self.display
+        elif scale_mode == SCALE_SDL:
+            self.display = pygame.display.set_mode((width, height), display_flags | pygame.SCALED)
+            self.screen = self.display
+        else:
+            self.display = pygame.display.set_mode(output_size, display_flags)
+            self.output_size = self.display.get_size()
+            # 表示フォーマットに合わせたキャンバス（拡大の転送先は表示Surfaceそのもの）
+            self.screen = pygame.Surface((width, height)).convert(self.display)
+        if output_size is not None:
+            print(f"Logical resolution {width}x{height} presented at "
+                  f"{'SDL scaled' if scale_mode == SCALE_SDL else '%dx%d' % self.output_size}")
         pygame.display.set_caption("beani - Movie Player")
-        self.clock = pygame.time.Clock()
+        
+        # Drawableが開始したトゥイーンを毎フレームまとめて進める
+        self.tween_engine = get_default_engine()
         
         # BPM計算
         # 120BPMの場合、1分間に120ビート = 1ビートあたり0.5秒
-        self.beat_interval = 60.0 / bpm  # 秒
-        self.beat_interval_ms = self.beat_interval * 1000  # ミリ秒
-        self.frames_per_beat = int(fps * self.beat_interval)
+        self.sim_rate = sim_rate
+        self.set_tempo(bpm, beats_per_measure)
+        
+        # 固定ステップのシミュレーション管理
+        self.max_sim_steps = max_sim_steps
+        self.sim_step_ms = 1000.0 / sim_rate if sim_rate else None
+        self.sim_accumulator = 0.0
+        self.last_sim_time = None
         
         # 時間ベースのビート管理
         self.start_time = None
@@ -40,12 +105,46 @@ class Movie:
         self.frame_count = 0
         self.scenes = []
         self.current_scene = -1  # カウントダウン中は無効な値で初期化
+        self._scene_start_beats = None  # 各シーンの開始ビート（duration_beatsの累積和）
+        
+        # プレイリスト（曲ごとにテンポとシーンリストを持つ）
+        self.playlist = []
+        self.track_index = -1
+        self.tracks_started = 0  # 時間ソースの曲切り替え回数の確認済みの値
+        
+        # 事前計算したスペクトル（音楽ファイルの読み込み時に解析、またはキャッシュから読み込み）
+        self.spectrum_analyzer = SpectrumAnalyzer(n_bands=spectrum_bands) if spectrum_bands else None
+        self.spectrum = None
+        
+        # シーン切り替え効果
+        self.transition_buffers = None  # 最初の切り替え時に確保して再利用
+        self.active_transition = None
+        self.transition_outgoing = None  # 切り替え中の前のシーン
+        self.transition_start_ms = 0
         
         # パフォーマンス監視
         self.actual_fps = fps
         self.fps_samples = []
         self.last_fps_time = 0
         self.heavy_processing_mode = False  # 重い処理モードのフラグ
+        self.memory_monitor = None  # シーン切り替えごとのメモリ使用量の確認（MemoryMonitor）
+        self.quality_governor = None  # 負荷に応じた描画品質の切り替え（QualityGovernor）
+        self.draw_interval = 1  # 描画するフレームの間隔（2で1フレームおきに描画）
+        self.post_processor = None  # シーンの描画後に画面全体にかけるエフェクト（PostProcessor）
+        self.gc_policy = None  # 再生中のGCを止めてシーンの切り替えなどで回収する（PlaybackGCPolicy）
+        self.parallel_updater = None  # independentなDrawableのupdateを並列に実行する（ParallelUpdater）
+        self.profiler = FrameProfiler()  # フレーム時間と処理区間ごとの時間
+        
+        # メトリクスの公開（フレームごとにスナップショットを差し替える）
+        self.metrics_server = None
+        if metrics_port is not None:
+            self.metrics_server = MetricsServer(port=metrics_port, profiler=self.profiler)
+            if not self.metrics_server.start():
+                self.metrics_server = None
+        
+        self.session = session
+        if session is not None:
+            session.attach(self)
         
         # カウントダウンとムービー状態
         self.music_ready = False  # 音楽準備完了フラグ
@@ -53,27 +152,44 @@ class Movie:
         
         print(f"BPM: {bpm}, Beat interval: {self.beat_interval:.2f}s, Frames per beat: {self.frames_per_beat}")
         print("Time-based beat detection enabled for accurate synchronization")
+        if sim_rate:
+            print(f"Fixed-timestep simulation: {sim_rate}Hz update, render capped at {fps or 'unlimited'} fps")
         print("Press 'H' to toggle heavy processing simulation")
     
     def start_countdown(self, countdown_beats=4):
         """カウントダウンを開始"""
-        self.countdown = Countdown(self.width, self.height, countdown_beats)
+        self.countdown = Countdown(self.width, self.height, countdown_beats, self.time_source)
         self.countdown.start_countdown(self.beat_interval_ms)
-        self.start_time = pygame.time.get_ticks()
+        self.start_time = self.time_source.get_ticks()
         
         # カウントダウン中は通常のシーンを無効化
         self.current_scene = -1  # 無効な値に設定
+        if self.gc_policy is not None:
+            self.gc_policy.request_collect()
         print("Countdown started!")
     
+    def set_tempo(self, bpm, beats_per_measure=None):
+        """テンポを設定し、ビート間隔などを計算し直す"""
+        self.bpm = bpm
+        if beats_per_measure is not None:
+            self.beats_per_measure = beats_per_measure
+        self.beat_interval = 60.0 / bpm  # 秒
+        self.beat_interval_ms = self.beat_interval * 1000  # ミリ秒
+        self.frames_per_beat = int(self.fps * self.beat_interval)
+        # 1ビートあたりのupdate回数（固定ステップ時はシミュレーション周波数基準）
+        self.ticks_per_beat = (self.sim_rate or self.fps) * self.beat_interval
+        self.tween_engine.beat_interval_ms = self.beat_interval_ms
+    
     def start_music_and_scenes(self):
         """音楽を開始し、通常のシーン処理を開始"""
-        pygame.mixer.music.play()
+        self.time_source.music_play()
         self.music_ready = True
         
         # 音楽開始時刻を記録（音楽位置検出の基準点）
-        self.music_start_time = pygame.time.get_ticks()
+        self.music_start_time = self.time_source.get_ticks()
         self.start_time = self.music_start_time
         self.last_beat_count = -1
+        self.queue_next_track()
         
         # 全シーンの開始ビートをリセット
         for scene in self.scenes:
@@ -92,11 +208,105 @@ class Movie:
         self.start_countdown(countdown_beats)
         print("Movie started with countdown!")
     
-    def add_scene(self, scene, duration_beats=None):
-        """シーンを追加"""
+    def add_scene(self, scene, duration_beats=None, transition=None):
+        """シーンを追加
+        
+        Args:
+            scene: 追加するシーン
+            duration_beats: シーンの再生時間（ビート数）
+            transition: このシーンに切り替わるときの効果（Transition）
+        """
         if duration_beats is not None:
             scene.duration_beats = duration_beats
+        if transition is not None:
+            scene.transition = transition
         self.scenes.append(scene)
+        self._scene_start_beats = None
+    
+    def get_scene_start_beats(self):
+        """各シーンの開始ビートのリストを取得
+        
+        duration_beatsの累積和。duration_beatsが未設定のシーン以降は到達しないため含めない。
+        """
+        if self._scene_start_beats is None:
+            start_beats = []
+            beat = 0
+            for scene in self.scenes:
+                start_beats.append(beat)
+                if scene.duration_beats is None:
+                    break
+                beat += scene.duration_beats
+            self._scene_start_beats = start_beats
+        return self._scene_start_beats
+    
+    def find_scene_at_beat(self, beat):
+        """指定ビートで再生中のシーン番号を二分探索で取得
+        
+        Returns:
+            int: シーン番号（シーンがない場合は-1）
+        """
+        start_beats = self.get_scene_start_beats()
+        if not start_beats:
+            return -1
+        return max(0, bisect_right(start_beats, beat) - 1)
+    
+    def seek(self, beat):
+        """指定ビートの位置から再生を開始
+        
+        Args:
+            beat: 曲の先頭からのビート位置（小数部はビート内の位相）
+        
+        Returns:
+            bool: シークできた場合はTrue
+        """
+        scene_index = self.find_scene_at_beat(beat)
+        if scene_index < 0:
+            print("No scenes to seek")
+            return False
+        
+        beat_number = int(beat)
+        phase = beat - beat_number
+        offset_ms = beat * self.beat_interval_ms
+        
+        # カウントダウンを無効化
+        if self.countdown:
+            self.countdown.is_active = False
+            self.countdown.is_completed = True
+        
+        # 音楽を途中から再生
+        self.time_source.music_play(start_ms=offset_ms)
+        self.music_ready = True
+        self.music_start_time = self.time_source.get_ticks() - offset_ms
+        self.start_time = self.music_start_time
+        self.last_beat_count = beat_number - 1  # 次のフレームでこのビートのon_beatを呼ぶ
+        self.last_sim_time = None
+        self.sim_accumulator = 0.0
+        self.queue_next_track()
+        
+        self.active_transition = None
+        self.transition_outgoing = None
+        
+        # シーンの状態を閉形式で復元
+        for scene in self.scenes:
+            scene.start_beat = None
+        scene_start_beat = self.get_scene_start_beats()[scene_index]
+        self.current_scene = scene_index
+        scene = self.scenes[scene_index]
+        scene.start_beat = scene_start_beat
+        scene.restore_state(beat_number - scene_start_beat, phase, self.ticks_per_beat)
+        if self.gc_policy is not None:
+            self.gc_policy.request_collect()
+        
+        print(f"Seeked to beat {beat:.2f} in scene '{scene.name}' (scene {scene_index + 1}/{len(self.scenes)})")
+        return True
+    
+    def seek_scene(self, scene_index):
+        """指定シーンの先頭から再生を開始"""
+        start_beats = self.get_scene_start_beats()
+        if not 0 <= scene_index < len(start_beats):
+            print(f"Scene {scene_index + 1} is not reachable")
+            return False
+        return self.seek(start_beats[scene_index])
     
     def get_current_scene(self):
         """現在のシーンを取得"""
@@ -120,6 +330,17 @@ class Movie:
             
             old_scene_name = self.scenes[old_scene].name if old_scene < len(self.scenes) else "Unknown"
             new_scene_name = self.scenes[self.current_scene].name
+            
+            # 切り替え効果の開始
+            new_scene = self.scenes[self.current_scene]
+            if new_scene.transition is not None and 0 <= old_scene < len(self.scenes):
+                self.start_transition(self.scenes[old_scene], new_scene.transition)
+            if self.memory_monitor is not None:
+                self.memory_monitor.on_scene_change(
+                    self, self.scenes[old_scene] if old_scene >= 0 else None, new_scene
+                )
+            if self.gc_policy is not None:
+                self.gc_policy.request_collect()
             print(f"Switched from '{old_scene_name}' to '{new_scene_name}' (scene {self.current_scene + 1}/{len(self.scenes)}) at beat {current_beat}")
             return True
         else:
@@ -156,21 +377,116 @@ class Movie:
         
         return False
     
-    def load_music(self, music_file):
-        """音楽ファイルを読み込み"""
+    def close_scenes(self):
+        """全てのシーン（プレイリストの場合は読み込み済みの全ての曲のシーン）のリソースを解放"""
+        for scene in self.scenes:
+            scene.close()
+        for track in self.playlist:
+            track.release()
+    
+    def load_music(self, music_file, length_ms=None):
+        """音楽ファイルを読み込み
+        
+        Args:
+            music_file: 音楽ファイルのパス
+            length_ms: 曲の長さ（仮想時計で曲の終わりを判定するために使用）
+        """
         if os.path.exists(music_file):
-            pygame.mixer.music.load(music_file)
+            self.time_source.music_load(music_file, length_ms)
             print(f"Loaded music: {music_file}")
+            if self.spectrum_analyzer is not None and not (self.playlist and self.track_index >= 0):
+                self.spectrum = self.spectrum_analyzer.analyze(music_file)
         else:
             print(f"Music file not found: {music_file}")
     
+    def set_playlist(self, tracks):
+        """プレイリストを設定し、最初の曲を再生できる状態にする
+        
+        Args:
+            tracks: Trackのリスト。曲の終わりで次の曲に隙間なく切り替わる
+        """
+        self.playlist = list(tracks)
+        self.track_index = -1
+        if not self.playlist:
+            return
+        if not self.time_source.uses_audio:
+            # 仮想時計は曲の長さがないと曲の終わりを判定できず、次の曲に切り替わらない
+            missing = [track.name for track in self.playlist[:-1] if track.length_ms is None]
+            if missing:
+                print(f"WARNING: Tracks without length_ms never end on a virtual clock: {', '.join(missing)}")
+        track = self.playlist[0]
+        track.preload(self.spectrum_analyzer)
+        self.apply_track(0)
+        self.load_music(track.music_file, track.length_ms)
+        # 2曲目の読み込みは最初の曲の再生開始時（queue_next_track）に始める
+    
+    def apply_track(self, index):
+        """プレイリストの曲のテンポとシーンリストに切り替える"""
+        track = self.playlist[index]
+        scenes = track.wait_ready()
+        self.track_index = index
+        self.spectrum = track.spectrum
+        self.set_tempo(track.bpm, track.beats_per_measure)
+        self.scenes = []
+        for scene in scenes:
+            self.add_scene(scene)
+        self._scene_start_beats = None
+        print(f"Track {index + 1}/{len(self.playlist)}: {track.name} (BPM: {track.bpm}, {len(scenes)} scenes)")
+    
+    def queue_next_track(self):
+        """次の曲を再生キューに入れ、シーンの事前読み込みを開始"""
+        next_index = self.track_index + 1
+        if not 0 < next_index < len(self.playlist):
+            return
+        # 再生開始時点の切り替え回数を基準にする
+        self.tracks_started = self.time_source.music_tracks_started
+        next_track = self.playlist[next_index]
+        self.time_source.music_queue(next_track.music_file, next_track.length_ms)
+        next_track.preload(self.spectrum_analyzer)
+    
+    def check_track_change(self):
+        """キューに入れた次の曲が再生され始めていたら切り替える"""
+        if not self.playlist or not self.music_ready:
+            return
+        if self.time_source.music_get_busy():
+            # RealtimeClockは再生位置の巻き戻りで曲の切り替えを検出する
+            self.time_source.music_get_pos()
+        if self.time_source.music_tracks_started != self.tracks_started:
+            self.tracks_started = self.time_source.music_tracks_started
+            self.advance_track()
+    
+    def advance_track(self):
+        """次の曲に切り替え、ビート時計を曲の先頭に合わせ直す"""
+        previous = self.playlist[self.track_index]
+        old_scene = self.get_current_scene()
+        self.apply_track(self.track_index + 1)
+        
+        # 新しい曲の先頭をビート0とする（音楽位置は時間ソース側で0に戻っている）
+        self.music_start_time = self.time_source.get_ticks()
+        self.start_time = self.music_start_time
+        self.last_beat_count = -1
+        self.last_sim_time = None
+        self.sim_accumulator = 0.0
+        self.active_transition = None
+        self.transition_outgoing = None
+        
+        self.current_scene = 0
+        self.scenes[0].start_beat = 0
+        previous.release()
+        self.queue_next_track()
+        if self.memory_monitor is not None:
+            self.memory_monitor.on_scene_change(self, old_scene, self.scenes[0])
+        if self.gc_policy is not None:
+            self.gc_policy.request_collect()
+    
     def play_music(self):
         """音楽を即座に再生（カウントダウンなし）"""
-        pygame.mixer.music.play()
+        self.time_source.music_play()
         self.music_ready = True
-        self.music_start_time = pygame.time.get_ticks()
+        self.music_start_time = self.time_source.get_ticks()
         self.start_time = self.music_start_time
         self.last_beat_count = -1
+        self.queue_next_track()
         
         # カウントダウンを無効化
         if self.countdown:
@@ -188,32 +504,107 @@ class Movie:
         
         print(f"Music started immediately")
     
-    def get_current_beat(self):
-        """現在のビート番号を取得
+    def get_playback_ms(self, lag_ms=0):
+        """再生開始からの経過時間を取得（ミリ秒）
+        
+        Args:
+            lag_ms: 現在時刻から遡る時間（固定ステップ時の各ステップの時刻計算用）
         
         Returns:
-            int: 現在のビート番号、取得できない場合はNone
+            float: 経過時間、取得できない場合はNone
         """
-        current_beat = None
-        
         # 音楽が準備完了している場合は音楽位置を使用
-        if self.music_ready and pygame.mixer.music.get_busy():
-            music_pos = pygame.mixer.music.get_pos()
+        if self.music_ready and self.time_source.music_get_busy():
+            music_pos = self.time_source.music_get_pos()
             if music_pos != -1:  # 音楽が正常に再生中
-                elapsed_time_ms = music_pos
-                current_beat = int(elapsed_time_ms / self.beat_interval_ms)
+                return music_pos - lag_ms
         
         # フォールバック：実時間から計算
-        if current_beat is None and self.start_time is not None:
-            current_time = pygame.time.get_ticks()
-            elapsed_time_ms = current_time - self.start_time
-            current_beat = int(elapsed_time_ms / self.beat_interval_ms)
+        if self.start_time is not None:
+            current_time = self.time_source.get_ticks()
+            return current_time - self.start_time - lag_ms
+        
+        return None
+    
+    def get_current_beat(self, lag_ms=0):
+        """現在のビート番号を取得
+        
+        Args:
+            lag_ms: 現在時刻から遡る時間（固定ステップ時の各ステップの時刻計算用）
         
-        return current_beat
+        Returns:
+            int: 現在のビート番号、取得できない場合はNone
+        """
+        elapsed_time_ms = self.get_playback_ms(lag_ms)
+        if elapsed_time_ms is None:
+            return None
+        return int(elapsed_time_ms / self.beat_interval_ms)
+    
+    def get_beat_phase(self):
+        """現在のビート内の位相を取得（0.0〜1.0、取得できない場合は0.0）"""
+        elapsed_time_ms = self.get_playback_ms()
+        if elapsed_time_ms is None or elapsed_time_ms < 0:
+            return 0.0
+        beats = elapsed_time_ms / self.beat_interval_ms
+        return beats - int(beats)
+    
+    def start_transition(self, outgoing_scene, transition):
+        """シーン切り替え効果を開始"""
+        if self.transition_buffers is None:
+            self.transition_buffers = TransitionBuffers(self.screen.get_size())
+        
+        self.active_transition = transition
+        self.transition_outgoing = outgoing_scene
+        self.transition_start_ms = self.get_playback_ms() or 0
+        
+        if transition.freeze_outgoing:
+            # 前のシーンは切り替え開始時の1フレームだけ描画して使い回す
+            self.render_scene(outgoing_scene, self.transition_buffers.outgoing)
+    
+    def get_transition_progress(self):
+        """切り替え効果の進行度を取得（0.0〜1.0）"""
+        duration_ms = self.active_transition.duration_beats * self.beat_interval_ms
+        elapsed_ms = (self.get_playback_ms() or 0) - self.transition_start_ms
+        if duration_ms <= 0:
+            return 1.0
+        return min(1.0, max(0.0, elapsed_ms / duration_ms))
+    
+    def render_scene(self, scene, surface):
+        """シーンをオフスクリーンSurfaceに描画"""
+        surface.fill((0, 0, 50))  # 濃紺背景
+        scene.draw(surface)
+    
+    def update_scenes(self):
+        """現在のシーン（と切り替え中の前のシーン）を更新"""
+        scene = self.get_current_scene()
+        if scene:
+            if self.sim_rate:
+                scene.save_state()
+            scene.update(self.parallel_updater)
+        
+        outgoing = self.transition_outgoing
+        if outgoing is not None and not self.active_transition.freeze_outgoing:
+            if self.sim_rate:
+                outgoing.save_state()
+            outgoing.update(self.parallel_updater)
+    
+    def dispatch_spectrum(self):
+        """現在の再生位置の帯域エネルギーをシーンに通知"""
+        if self.spectrum is None or not self.music_ready:
+            return
+        playback_ms = self.get_playback_ms()
+        if playback_ms is None:
+            return
+        bands = self.spectrum.bands_at(playback_ms)
+        scene = self.get_current_scene()
+        if scene:
+            scene.on_spectrum(bands)
+        if self.transition_outgoing is not None:
+            self.transition_outgoing.on_spectrum(bands)
     
     def update_fps_monitor(self):
         """FPS監視を更新"""
-        current_time = pygame.time.get_ticks()
+        current_time = self.time_source.get_ticks()
         if self.last_fps_time > 0:
             frame_time = current_time - self.last_fps_time
             if frame_time > 0:
@@ -228,120 +619,274 @@ class Movie:
         
         self.last_fps_time = current_time
     
-    def run(self):
-        """メインループ"""
+    def handle_events(self):
+        """入力イベントを処理
+
+        Returns:
+            bool: ループを継続する場合はTrue
+        """
         running = True
-        
-        while running:
-            for event in pygame.event.get():
-                if event.type == pygame.QUIT:
-                    running = False
-                elif event.type == pygame.KEYDOWN:
-                    if event.key == pygame.K_SPACE:
-                        # スペースキーで音楽再生/停止
-                        if pygame.mixer.music.get_busy():
-                            pygame.mixer.music.stop()
-                            self.music_ready = False
-                        else:
-                            # カウントダウン付きで再生
-                            self.play_with_countdown()
-                    elif event.key == pygame.K_RETURN:
-                        # Enterキーで即座に音楽再生（カウントダウンなし）
-                        if not pygame.mixer.music.get_busy():
-                            self.play_music()
-                    elif event.key == pygame.K_h:
-                        # Hキーで重い処理モードの切り替え
-                        self.heavy_processing_mode = not self.heavy_processing_mode
-                        # 現在のシーンの重い処理モードを更新
-                        scene = self.get_current_scene()
-                        if scene:
-                            for drawable in scene.drawables:
-                                if hasattr(drawable, 'heavy_processing'):
-                                    drawable.heavy_processing = self.heavy_processing_mode
-                        print(f"Heavy processing mode: {'ON' if self.heavy_processing_mode else 'OFF'}")
-            
-            # FPS監視更新
-            self.update_fps_monitor()
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT:
+                running = False
+            elif event.type == pygame.KEYDOWN:
+                if self.session is not None:
+                    self.session.record_key(event.key)
+                if event.key == pygame.K_SPACE:
+                    # スペースキーで音楽再生/停止
+                    if self.time_source.music_get_busy():
+                        self.time_source.music_stop()
+                        self.music_ready = False
+                    else:
+                        # カウントダウン付きで再生
+                        self.play_with_countdown()
+                elif event.key == pygame.K_RETURN:
+                    # Enterキーで即座に音楽再生（カウントダウンなし）
+                    if not self.time_source.music_get_busy():
+                        self.play_music()
+                elif event.key == pygame.K_RIGHT:
+                    # 右キーで次のシーンの先頭へシーク
+                    self.seek_scene(max(self.current_scene, 0) + 1)
+                elif event.key == pygame.K_LEFT:
+                    # 左キーで前のシーンの先頭へシーク
+                    self.seek_scene(max(self.current_scene - 1, 0))
+                elif event.key == pygame.K_m:
+                    # Mキーでサーフェスのメモリ使用量を表示
+                    SurfaceMemoryReport.collect(self).print()
+                elif event.key == pygame.K_h:
+                    # Hキーで重い処理モードの切り替え
+                    self.heavy_processing_mode = not self.heavy_processing_mode
+                    # 現在のシーンの重い処理モードを更新
+                    scene = self.get_current_scene()
+                    if scene:
+                        for drawable in scene.drawables:
+                            if hasattr(drawable, 'heavy_processing'):
+                                drawable.heavy_processing = self.heavy_processing_mode
+                    print(f"Heavy processing mode: {'ON' if self.heavy_processing_mode else 'OFF'}")
+        return running
+    
+    def process_beat(self, current_beat):
+        """カウントダウンとビート通知の処理"""
+        # カウントダウン中の処理
+        if self.countdown and self.countdown.is_active:
+            self.countdown.update()
             
-            # ビート検出
-            current_beat = self.get_current_beat()
+            # カウントダウン完了チェック
+            if self.countdown.is_completed:
+                self.start_music_and_scenes()
+        
+        elif current_beat is not None and current_beat != self.last_beat_count:
+            # 基本的な処理条件
+            should_process = current_beat > self.last_beat_count
             
-            # カウントダウン中の処理
-            if self.countdown and self.countdown.is_active:
-                self.countdown.update()
+            if should_process:
+                # ビートの境界からon_beatを呼ぶまでの遅れを記録
+                playback_ms = self.get_playback_ms()
+                if playback_ms is not None:
+                    self.profiler.record("beat_lateness", playback_ms - current_beat * self.beat_interval_ms)
                 
-                # カウントダウン完了チェック
-                if self.countdown.is_completed:
-                    self.start_music_and_scenes()
-            
-            elif current_beat is not None and current_beat != self.last_beat_count:
-                # 基本的な処理条件
-                should_process = current_beat > self.last_beat_count
+                # シーンの切り替えをチェック
+                self.check_scene_transition(current_beat)
                 
-                if should_process:
-                    # シーンの切り替えをチェック
-                    self.check_scene_transition(current_beat)
-                    
-                    scene = self.get_current_scene()
-                    if scene:
-                        # 全てのシーンで統一された形式でon_beatを呼び出し
-                        beat_in_measure = current_beat % self.beats_per_measure
-                        scene.on_beat(current_beat, beat_in_measure)
-                    
-                    # デバッグ情報を常に表示（通常時）
-                    scene_num = self.current_scene + 1
-                    total_scenes = len(self.scenes)
-                    scene_name = scene.name if scene else "Unknown"
-                    
-                    # ビート情報を表示
+                scene = self.get_current_scene()
+                if scene:
+                    # 全てのシーンで統一された形式でon_beatを呼び出し
                     beat_in_measure = current_beat % self.beats_per_measure
-                    print(f"Beat {current_beat} (measure: {beat_in_measure}) Scene {scene_num}/{total_scenes} ({scene_name})")
-                    
-                    # FPS低下時の追加情報
-                    if self.actual_fps < self.fps * 0.8:  # 目標FPSの80%以下の場合
-                        print(f"  --> FPS Warning: {self.actual_fps:.1f}")
-                    
-                    self.last_beat_count = current_beat
+                    scene.on_beat(current_beat, beat_in_measure)
+                if self.session is not None:
+                    self.session.record_beat(current_beat, self.current_scene)
+                
+                # デバッグ情報を常に表示（通常時）
+                scene_num = self.current_scene + 1
+                total_scenes = len(self.scenes)
+                scene_name = scene.name if scene else "Unknown"
+                
+                # ビート情報を表示
+                beat_in_measure = current_beat % self.beats_per_measure
+                print(f"Beat {current_beat} (measure: {beat_in_measure}) Scene {scene_num}/{total_scenes} ({scene_name})")
+                
+                # FPS低下時の追加情報
+                if self.actual_fps < self.fps * 0.8:  # 目標FPSの80%以下の場合
+                    print(f"  --> FPS Warning: {self.actual_fps:.1f}")
+                
+                self.last_beat_count = current_beat
+    
+    def update_simulation(self):
+        """固定ステップでシミュレーションを進める
+
+        前回フレームからの経過時間をアキュムレータに貯め、sim_step_msごとに
+        ビート処理とupdateを実行する。
+
+        Returns:
+            float: 描画時の補間係数（0.0〜1.0）
+        """
+        current_time = self.time_source.get_ticks()
+        if self.last_sim_time is None:
+            self.last_sim_time = current_time - self.sim_step_ms
+        
+        # 極端に長いフレーム（ウィンドウ移動など）で追いつこうとしないように制限
+        elapsed = min(current_time - self.last_sim_time, self.sim_step_ms * self.max_sim_steps)
+        self.last_sim_time = current_time
+        self.sim_accumulator += elapsed
+        
+        while self.sim_accumulator >= self.sim_step_ms:
+            self.sim_accumulator -= self.sim_step_ms
+            
+            # このステップ時点のビートを計算（まだ処理していない残り時間分だけ遡る）
+            current_beat = self.get_current_beat(lag_ms=self.sim_accumulator)
+            self.process_beat(current_beat)
             
-            # 更新処理
+            self.update_scenes()
+        
+        return self.sim_accumulator / self.sim_step_ms
+    
+    def draw_frame(self, current_beat, interpolation=1.0):
+        """1フレーム分の描画処理"""
+        Drawable.interpolation = interpolation
+        self.screen.fill((0, 0, 50))  # 濃紺背景
+        
+        # カウントダウン表示
+        if self.countdown and self.countdown.is_active:
+            self.countdown.draw(self.screen)
+        else:
+            # 通常のシーンを描画
             scene = self.get_current_scene()
-            if scene:
-                scene.update()
+            if scene and self.active_transition is not None:
+                # 切り替え中：前後のシーンをオフスクリーンに描画して合成
+                progress = self.get_transition_progress()
+                buffers = self.transition_buffers
+                if not self.active_transition.freeze_outgoing:
+                    self.render_scene(self.transition_outgoing, buffers.outgoing)
+                self.render_scene(scene, buffers.incoming)
+                self.active_transition.render(self.screen, buffers, progress)
+                if progress >= 1.0:
+                    self.active_transition = None
+                    self.transition_outgoing = None
+            elif scene:
+                scene.draw(self.screen)
             
-            # 描画処理
-            self.screen.fill((0, 0, 50))  # 濃紺背景
+            if scene and self.post_processor is not None:
+                # シーン情報の表示の前に、シーンの描画結果にエフェクトをかける
+                self.post_processor.process(self.screen, self.get_beat_phase(), self.profiler)
             
-            # カウントダウン表示
-            if self.countdown and self.countdown.is_active:
-                self.countdown.draw(self.screen)
+            if scene:
+                # シーン情報を画面に表示
+                font = pygame.font.Font(None, 24)
+                scene_num = self.current_scene + 1
+                total_scenes = len(self.scenes)
+                scene_text = font.render(f"Scene {scene_num}/{total_scenes} - {scene.name}", True, (255, 255, 255))
+                self.screen.blit(scene_text, (10, 50))
+                
+                # シーンの残り時間表示
+                if scene.duration_beats is not None and scene.start_beat is not None:
+                    beats_in_scene = current_beat - scene.start_beat if current_beat else 0
+                    remaining_beats = max(0, scene.duration_beats - beats_in_scene)
+                    remaining_text = font.render(f"Remaining: {remaining_beats} beats", True, (255, 255, 255))
+                    self.screen.blit(remaining_text, (10, 75))
+        
+        # FPS情報を画面に表示（デバッグ用）
+        if hasattr(pygame, 'font') and self.actual_fps < self.fps * 0.9:
+            font = pygame.font.Font(None, 36)
+            fps_text = font.render(f"FPS: {self.actual_fps:.1f}", True, (255, 255, 0))
+            self.screen.blit(fps_text, (10, 10))
+    
+    def present(self):
+        """描画したフレームを表示（キャンバスに描画している場合は出力解像度に拡大）"""
+        if self.screen is not self.display:
+            if Drawable.smooth_scaling:
+                pygame.transform.smoothscale(self.screen, self.output_size, self.display)
             else:
-                # 通常のシーンを描画
-                scene = self.get_current_scene()
-                if scene:
-                    scene.draw(self.screen)
+                pygame.transform.scale(self.screen, self.output_size, self.display)
+        pygame.display.flip()
+    
+    def publish_metrics(self, current_beat):
+        """メトリクスサーバーのスナップショットを差し替え（値の列はサーバーが要求時にプロファイラからコピーする）"""
+        scene = self.get_current_scene()
+        snapshot = {
+            "fps": self.actual_fps,
+            "frames": self.frame_count,
+            "beat": current_beat if current_beat is not None else -1,
+            "bpm": self.bpm,
+            "scene_index": self.current_scene if scene else -1,
+            "scene": scene.name if scene else "",
+        }
+        if self.playlist:
+            snapshot["track_index"] = self.track_index
+        if self.quality_governor is not None:
+            snapshot["quality_level"] = self.quality_governor.level
+        self.metrics_server.publish(snapshot)
+    
+    def run(self):
+        """メインループ"""
+        running = True
+        self.last_sim_time = None
+        self.sim_accumulator = 0.0
+        
+        profiler = self.profiler
+        # 例外で抜けた場合もGCの設定・スレッドプール・シーンのスレッドを元に戻す
+        try:
+            if self.gc_policy is not None:
+                self.gc_policy.begin(self)
+            
+            while running:
+                profiler.begin_frame()
+                running = self.handle_events()
+                
+                # FPS監視更新
+                self.update_fps_monitor()
+                
+                # プレイリストの曲の切り替え
+                self.check_track_change()
+                
+                profiler.begin("update")
+                # トゥイーンを現在時刻まで進める（このフレームのon_beatで開始したものは開始値から）
+                self.tween_engine.step(self.time_source.get_ticks())
+                if self.sim_rate:
+                    # 固定ステップモード：シミュレーションと描画を分離
+                    interpolation = self.update_simulation()
+                    current_beat = self.get_current_beat()
+                else:
+                    # ビート検出
+                    current_beat = self.get_current_beat()
+                    self.process_beat(current_beat)
+                    interpolation = 1.0
                     
-                    # シーン情報を画面に表示
-                    font = pygame.font.Font(None, 24)
-                    scene_num = self.current_scene + 1
-                    total_scenes = len(self.scenes)
-                    scene_text = font.render(f"Scene {scene_num}/{total_scenes} - {scene.name}", True, (255, 255, 255))
-                    self.screen.blit(scene_text, (10, 50))
+                    # 更新処理
+                    self.update_scenes()
+                profiler.end("update")
+                
+                # 描画を間引いている場合は前のフレームの表示を残す
+                if self.frame_count % self.draw_interval == 0:
+                    # スペクトルの通知（描画フレームごとに配列の1行を参照するだけ）
+                    self.dispatch_spectrum()
                     
-                    # シーンの残り時間表示
-                    if scene.duration_beats is not None and scene.start_beat is not None:
-                        beats_in_scene = current_beat - scene.start_beat if current_beat else 0
-                        remaining_beats = max(0, scene.duration_beats - beats_in_scene)
-                        remaining_text = font.render(f"Remaining: {remaining_beats} beats", True, (255, 255, 255))
-                        self.screen.blit(remaining_text, (10, 75))
-            
-            # FPS情報を画面に表示（デバッグ用）
-            if hasattr(pygame, 'font') and self.actual_fps < self.fps * 0.9:
-                font = pygame.font.Font(None, 36)
-                fps_text = font.render(f"FPS: {self.actual_fps:.1f}", True, (255, 255, 0))
-                self.screen.blit(fps_text, (10, 10))
-            
-            pygame.display.flip()
-            self.clock.tick(self.fps)
-            self.frame_count += 1
-        
-        pygame.quit()
+                    # 描画処理
+                    profiler.begin("draw")
+                    self.draw_frame(current_beat, interpolation)
+                    profiler.end("draw")
+                    
+                    profiler.begin("flip")
+                    self.present()
+                    profiler.end("flip")
+                
+                if self.metrics_server is not None:
+                    self.publish_metrics(current_beat)
+                
+                self.time_source.tick(self.fps)
+                self.frame_count += 1
+                
+                if self.quality_governor is not None:
+                    self.quality_governor.update(self)
+                if self.gc_policy is not None:
+                    self.gc_policy.end_frame(self)
+        finally:
+            if self.gc_policy is not None:
+                self.gc_policy.close()
+            if self.parallel_updater is not None:
+                self.parallel_updater.close()
+            self.close_scenes()
+            if self.metrics_server is not None:
+                self.metrics_server.stop()
+            if self.session is not None:
+                self.session.close()
+            pygame.quit()
@@ -4,8 +4,10 @@ from movie import Movie
 from scene import Scene
 from zoom_beater import ZoomBeater
 from flash_beater import FlashBeater
+from flash_beater_group import FlashBeaterGroup
 from beat_image_beater import BeatImageBeater
 from move_beater import MoveBeater
+from transition import CrossfadeTransition, WipeTransition, ZoomTransition
 
 
 def main():
@@ -73,6 +75,15 @@ def main():
         flash_beater = FlashBeater(x, y, radius=40, color=color, flash_color=(255, 255, 255), priority=priority)
         scene2.add_drawable(flash_beater)
     
+    # 背景に小さな円のグリッド（FlashBeaterGroupでまとめて更新・描画、最背景 priority=-1）
+    flash_grid = FlashBeaterGroup(priority=-1)
+    for row in range(15):
+        for col in range(20):
+            color = colors[(row + col) % len(colors)]
+            dim_color = tuple(c // 3 for c in color)
+            flash_grid.add(20 + col * 40, 20 + row * 40, radius=8, color=dim_color, flash_color=color)
+    scene2.add_drawable(flash_grid)
+    
     print("Scene 2: FlashBeater scene created")
     
     # === シーン3: 混合シーン (16ビート = 4小節) ===
@@ -199,10 +210,10 @@ def main():
     
     # シーンをムービーに追加
     movie.add_scene(scene4)  # 8ビート
-    movie.add_scene(scene1)  # 8ビート  
-    movie.add_scene(scene5)  # 8ビート (新しいMoveBeaterシーン)
-    movie.add_scene(scene3)  # 16ビート
-    movie.add_scene(scene2)  # 8ビート
+    movie.add_scene(scene1, transition=CrossfadeTransition(duration_beats=1))  # 8ビート  
+    movie.add_scene(scene5, transition=WipeTransition(duration_beats=1, direction="left"))  # 8ビート (新しいMoveBeaterシーン)
+    movie.add_scene(scene3, transition=ZoomTransition(duration_beats=1))  # 16ビート
+    movie.add_scene(scene2, transition=CrossfadeTransition(duration_beats=2, freeze_outgoing=True))  # 8ビート
     print(f"Total scenes: {len(movie.scenes)}")
 
     # カウントダウン付きで音楽再生開始
@@ -0,0 +1,143 @@
+"""
+オブジェクトプール - ビートごとに生成・破棄するDrawableや作業用Surfaceを再利用し、再生中の確保を減らす
+"""
+from collections import OrderedDict
+
+import pygame
+
+
+class ObjectPool:
+    """生成済みのオブジェクトを使い回すプール
+
+    acquire()は空きがあれば返却済みのオブジェクトを再初期化して返し、なければfactoryで作る。
+    再初期化はreset(obj, *args, **kwargs)（省略時はobj.reset(*args, **kwargs)）で行うため、
+    プールで使うDrawableは__init__と同じ引数を受け取るresetを実装する。
+    """
+
+    def __init__(self, factory, reset=None, capacity=64, prefill=0):
+        """
+        Args:
+            factory: オブジェクトを作る関数（acquireの引数をそのまま受け取る）
+            reset: 返却済みのオブジェクトを再初期化する関数（Noneの場合はobj.reset）
+            capacity: 保持する空きオブジェクトの上限（超えた分は破棄）
+            prefill: 事前に作っておく数（factoryを引数なしで呼ぶ）
+        """
+        self.factory = factory
+        self.reset = reset
+        self.capacity = capacity
+        self.free = [factory() for _ in range(prefill)]
+
+        # 統計情報
+        self.created = prefill
+        self.reused = 0
+        self.discarded = 0
+
+    def __len__(self):
+        return len(self.free)
+
+    def acquire(self, *args, **kwargs):
+        """オブジェクトを取得（空きがあれば再利用）"""
+        if not self.free:
+            self.created += 1
+            return self.factory(*args, **kwargs)
+        obj = self.free.pop()
+        self.reused += 1
+        if self.reset is None:
+            obj.reset(*args, **kwargs)
+        else:
+            self.reset(obj, *args, **kwargs)
+        return obj
+
+    def release(self, obj):
+        """オブジェクトを返却"""
+        if len(self.free) < self.capacity:
+            self.free.append(obj)
+        else:
+            self.discarded += 1
+
+
+class SurfacePool:
+    """作業用Surfaceをサイズとピクセルフォーマットごとに使い回すプール
+
+    返却されたSurfaceは内容を消さずに保持するため、取得した側で全体を上書きする用途
+    （transform.scaleのdest引数など）に使う。保持する空きSurfaceの合計がmax_bytesを超えたら、
+    最も長く使われていないサイズのものから破棄する。
+    """
+
+    def __init__(self, max_bytes=32 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.free_bytes = 0
+        self._free = OrderedDict()  # (サイズ, ビット数, マスク, フラグ) -> [Surface, ...]
+
+        # 統計情報
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _key(size, flags, bitsize, masks):
+        return (tuple(size), bitsize, masks, flags & pygame.SRCALPHA)
+
+    def acquire(self, size, template):
+        """templateと同じピクセルフォーマット・カラーキー・アルファのSurfaceを取得
+
+        Args:
+            size: Surfaceのサイズ
+            template: ピクセルフォーマットの基にするSurface
+        """
+        flags = template.get_flags()
+        key = self._key(size, flags, template.get_bitsize(), template.get_masks())
+        surfaces = self._free.get(key)
+        if surfaces:
+            surface = surfaces.pop()
+            self.free_bytes -= _surface_bytes(surface)
+            self._free.move_to_end(key)
+            self.hits += 1
+        else:
+            surface = pygame.Surface(size, flags & pygame.SRCALPHA, template)
+            self.misses += 1
+        colorkey = template.get_colorkey()
+        if colorkey is not None:
+            # 毎フレーム書き込む描画先なので、書き込むたびにランレングスを作り直すRLEACCELは付けない
+            surface.set_colorkey(colorkey)
+        elif surface.get_colorkey() is not None:
+            surface.set_colorkey(None)
+        surface.set_alpha(template.get_alpha())
+        return surface
+
+    def release(self, surface):
+        """Surfaceを返却"""
+        key = self._key(surface.get_size(), surface.get_flags(), surface.get_bitsize(), surface.get_masks())
+        self._free.setdefault(key, []).append(surface)
+        self._free.move_to_end(key)
+        self.free_bytes += _surface_bytes(surface)
+        while self.free_bytes > self.max_bytes and self._free:
+            oldest_key, surfaces = next(iter(self._free.items()))
+            self.free_bytes -= _surface_bytes(surfaces.pop(0))
+            if not surfaces:
+                del self._free[oldest_key]
+
+    def free_surfaces(self):
+        """保持している空きSurfaceを列挙"""
+        for surfaces in self._free.values():
+            yield from surfaces
+
+    def clear(self):
+        """空きSurfaceを全て破棄"""
+        self._free.clear()
+        self.free_bytes = 0
+
+
+def _surface_bytes(surface):
+    return surface.get_pitch() * surface.get_height()
+
+
+# 各Drawableから共有する既定の作業用Surfaceのプール
+_default_surface_pool = None
+
+
+def get_default_surface_pool():
+    """既定のSurfacePoolを取得（未作成の場合は作成）"""
+    global _default_surface_pool
+    if _default_surface_pool is None:
+        _default_surface_pool = SurfacePool()
+    return _default_surface_pool
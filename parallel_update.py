@@ -0,0 +1,69 @@
+"""
+並列update - 他のオブジェクトに触れないDrawableのupdateをスレッドプールで並列に実行する
+
+time.sleepやNumPyの演算、pygame.transformなどGILを解放する処理を含むupdateは、
+複数のスレッドで同時に進めると複数のCPUコアを使える。純粋なPythonの処理だけのupdateは
+GILのため速くならない（スレッドの受け渡しの分だけ遅くなる）ので、重いシーンでだけ使う。
+"""
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+
+def _run_batch(batch):
+    """バッチのDrawableのupdateを順に呼び、処理時間（ミリ秒）を返す"""
+    start = time.perf_counter()
+    for drawable in batch:
+        drawable.update()
+    return (time.perf_counter() - start) * 1000.0
+
+
+class ParallelUpdater:
+    """independentなDrawableをバッチに分け、常駐するスレッドプールでupdateするクラス
+
+    独立でないDrawableのupdateはワーカーの実行中にメインスレッドで呼び、全てのバッチの完了を待ってから
+    （描画の前に）戻る。各バッチの処理時間はプロファイラのupdate_batch<番号>、
+    メインスレッドが完了を待った時間はupdate_barrierに記録する。
+    """
+
+    def __init__(self, workers=None, min_drawables=2):
+        """
+        Args:
+            workers: ワーカースレッド数（Noneの場合はCPUコア数、最大8）
+            min_drawables: independentなDrawableがこれより少ないシーンは並列にしない
+        """
+        self.workers = workers or min(8, os.cpu_count() or 1)
+        self.min_drawables = min_drawables
+        self.executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="scene-update")
+        self.profiler = None
+
+    def attach(self, movie):
+        """Movieに設定"""
+        movie.parallel_updater = self
+        self.profiler = movie.profiler
+
+    def split(self, drawables):
+        """Drawableのリストをワーカー数以下のバッチに分割"""
+        count = min(self.workers, len(drawables))
+        return [drawables[index::count] for index in range(count)]
+
+    def run(self, batches, serial):
+        """バッチを並列に、serialのDrawableをメインスレッドでupdateし、全ての完了を待つ"""
+        futures = [self.executor.submit(_run_batch, batch) for batch in batches]
+        for drawable in serial:
+            drawable.update()
+
+        wait_start = time.perf_counter()
+        # 例外はresult()でメインスレッドに伝わる
+        durations = [future.result() for future in futures]
+        wait_ms = (time.perf_counter() - wait_start) * 1000.0
+
+        profiler = self.profiler
+        if profiler is not None:
+            for index, duration in enumerate(durations):
+                profiler.record(f"update_batch{index}", duration)
+            profiler.record("update_barrier", wait_ms)
+
+    def close(self):
+        """スレッドプールを停止"""
+        self.executor.shutdown(wait=True)
@@ -0,0 +1,81 @@
+"""
+プレイリスト - 複数の曲を続けて再生するためのトラック定義
+"""
+import threading
+
+
+class Track:
+    """プレイリストの1曲（音楽ファイル・テンポ・シーンリスト）"""
+    def __init__(self, music_file, bpm, build_scenes, beats_per_measure=4, name=None, length_ms=None):
+        """
+        Args:
+            music_file: 音楽ファイルのパス
+            bpm: 曲のBPM
+            build_scenes: シーンのリストを作成して返す関数（画像の読み込みもここで行う）
+            beats_per_measure: 1小節あたりのビート数
+            name: 曲名（表示用）
+            length_ms: 曲の長さ（仮想時計で曲の切り替えを判定するために使用）
+        """
+        self.music_file = music_file
+        self.bpm = bpm
+        self.build_scenes = build_scenes
+        self.beats_per_measure = beats_per_measure
+        self.name = name or music_file
+        self.length_ms = length_ms
+
+        self.scenes = None
+        self.spectrum = None
+        self.error = None
+        self._preload_thread = None
+
+    @property
+    def ready(self):
+        """シーンの準備が完了しているかどうか"""
+        return self.scenes is not None or self.error is not None
+
+    def preload(self, spectrum_analyzer=None):
+        """バックグラウンドでシーンを作成（アセットを事前に読み込む）
+
+        Args:
+            spectrum_analyzer: 指定した場合はスペクトルの解析も行う（SpectrumAnalyzer）
+        """
+        if self.ready or self._preload_thread is not None:
+            return
+        self._preload_thread = threading.Thread(
+            target=self._build, args=(spectrum_analyzer,), name=f"preload-{self.name}", daemon=True
+        )
+        self._preload_thread.start()
+
+    def wait_ready(self):
+        """シーンの準備が完了するまで待機
+
+        Returns:
+            list: シーンのリスト
+        """
+        if self._preload_thread is not None:
+            self._preload_thread.join()
+            self._preload_thread = None
+        elif not self.ready:
+            self._build()
+        if self.error is not None:
+            raise RuntimeError(f"Failed to build scenes for track '{self.name}'") from self.error
+        return self.scenes
+
+    def release(self):
+        """再生が終わったシーンを解放"""
+        if self.scenes is not None:
+            for scene in self.scenes:
+                scene.close()
+        self.scenes = None
+        self.spectrum = None
+        self.error = None
+
+    def _build(self, spectrum_analyzer=None):
+        try:
+            if spectrum_analyzer is not None:
+                self.spectrum = spectrum_analyzer.analyze(self.music_file)
+            self.scenes = list(self.build_scenes())
+            print(f"Track preloaded: {self.name} ({len(self.scenes)} scenes)")
+        except Exception as e:
+            self.error = e
+            print(f"Track preload failed: {self.name} ({e})")
@@ -0,0 +1,227 @@
+"""
+ポストプロセス - シーンの描画後に画面全体へかけるエフェクト（グロー・残像・ぼかし・フラッシュ）
+
+各エフェクトは画面サイズに合わせて作業用のSurfaceと配列を一度だけ確保し、毎フレーム同じバッファに上書きする。
+全画面の処理はSDLのブレンド付きblit（C実装）で行い、NumPyの処理は縮小したバッファに対してだけ行う
+（pixels3dはピクセルが飛び飛びのビューのため、800x600全体にNumPyの演算をかけると1回で10ms以上かかる）。
+"""
+import numpy as np
+import pygame
+
+from drawable import Drawable
+
+
+def beat_pulse(phase, sharpness=4.0):
+    """ビートの頭で1.0、ビート内の位相が進むにつれて0.0に減衰する値"""
+    return (1.0 - phase) ** sharpness
+
+
+class PostEffect:
+    """ポストプロセスのエフェクトの基底クラス"""
+    name = "effect"
+
+    def __init__(self, sharpness=4.0, optional=False):
+        """
+        Args:
+            sharpness: ビートの頭からの減衰の鋭さ（beat_pulseの指数）
+            optional: Trueの場合、品質ガバナーがoptionalな描画を省略する段階では処理しない
+        """
+        self.sharpness = sharpness
+        self.optional = optional
+
+    def allocate(self, screen):
+        """画面のサイズとフォーマットに合わせて作業用バッファを確保"""
+        pass
+
+    def apply(self, screen, phase):
+        """画面にエフェクトをかける
+
+        Args:
+            screen: シーンを描画済みのSurface（その場で書き換える）
+            phase: ビート内の位相（0.0〜1.0）
+        """
+        raise NotImplementedError
+
+
+class ColorFlash(PostEffect):
+    """ビートの頭で画面全体に色を加算する"""
+    name = "flash"
+
+    def __init__(self, color=(255, 255, 255), strength=0.5, sharpness=6.0, optional=False):
+        super().__init__(sharpness, optional)
+        self.color = color
+        self.strength = strength
+        self.solid = None
+
+    def allocate(self, screen):
+        self.solid = pygame.Surface(screen.get_size()).convert(screen)
+
+    def apply(self, screen, phase):
+        amount = self.strength * beat_pulse(phase, self.sharpness)
+        if amount < 1 / 255:
+            return
+        # ブレンド付きのfillは遅いため、単色で塗ったバッファを加算blitする
+        self.solid.fill([int(channel * amount) for channel in self.color])
+        screen.blit(self.solid, (0, 0), special_flags=pygame.BLEND_RGB_ADD)
+
+
+class MotionTrails(PostEffect):
+    """前のフレームを減衰させて重ね、動くものに残像を付ける"""
+    name = "trails"
+
+    def __init__(self, persistence=0.75, beat_persistence=0.15, sharpness=2.0, optional=True):
+        """
+        Args:
+            persistence: 前のフレームを残す割合
+            beat_persistence: ビートの頭で残す割合に加える量
+        """
+        super().__init__(sharpness, optional)
+        self.persistence = persistence
+        self.beat_persistence = beat_persistence
+        self.history = None
+        self.decay = None
+
+    def allocate(self, screen):
+        self.history = pygame.Surface(screen.get_size()).convert(screen)
+        self.history.fill((0, 0, 0))
+        self.decay = pygame.Surface(screen.get_size()).convert(screen)
+
+    def apply(self, screen, phase):
+        persistence = min(0.98, self.persistence + self.beat_persistence * beat_pulse(phase, self.sharpness))
+        level = int(255 * persistence)
+        self.decay.fill((level, level, level))
+        self.history.blit(self.decay, (0, 0), special_flags=pygame.BLEND_RGB_MULT)
+        screen.blit(self.history, (0, 0), special_flags=pygame.BLEND_RGB_MAX)
+        self.history.blit(screen, (0, 0))
+
+
+class Blur(PostEffect):
+    """縮小して拡大し直したぼかし画像を、ビートに合わせた割合で重ねる"""
+    name = "blur"
+
+    def __init__(self, downscale=4, amount=0.0, beat_amount=0.8, sharpness=4.0, optional=True):
+        """
+        Args:
+            downscale: ぼかしの強さ（縮小率の逆数）
+            amount: 常に重ねる割合
+            beat_amount: ビートの頭で重ねる割合に加える量
+        """
+        super().__init__(sharpness, optional)
+        self.downscale = downscale
+        self.amount = amount
+        self.beat_amount = beat_amount
+        self.small = None
+        self.blurred = None
+
+    def allocate(self, screen):
+        width, height = screen.get_size()
+        small_size = (max(1, width // self.downscale), max(1, height // self.downscale))
+        self.small = pygame.Surface(small_size).convert(screen)
+        self.blurred = pygame.Surface((width, height)).convert(screen)
+
+    def apply(self, screen, phase):
+        mix = min(1.0, self.amount + self.beat_amount * beat_pulse(phase, self.sharpness))
+        alpha = int(255 * mix)
+        if alpha <= 0:
+            return
+        pygame.transform.smoothscale(screen, self.small.get_size(), self.small)
+        pygame.transform.smoothscale(self.small, screen.get_size(), self.blurred)
+        self.blurred.set_alpha(alpha)
+        screen.blit(self.blurred, (0, 0))
+
+
+class Glow(PostEffect):
+    """明るい部分を抜き出してぼかし、加算して光らせる"""
+    name = "glow"
+
+    def __init__(self, threshold=160, intensity=0.6, beat_intensity=1.0, downscale=4, sharpness=3.0,
+                 optional=True):
+        """
+        Args:
+            threshold: これより明るい部分（チャンネルごと）を光らせる
+            intensity: 常に加算する強さ
+            beat_intensity: ビートの頭で強さに加える量
+            downscale: 光の計算に使うバッファの縮小率の逆数（大きいほど軽く、光が広がる）
+        """
+        super().__init__(sharpness, optional)
+        self.threshold = threshold
+        self.intensity = intensity
+        self.beat_intensity = beat_intensity
+        self.downscale = downscale
+        self.small = None
+        self.tiny = None
+        self.cutoff = None
+        self.glow = None
+        self._wide = None
+
+    def allocate(self, screen):
+        width, height = screen.get_size()
+        small_size = (max(1, width // self.downscale), max(1, height // self.downscale))
+        self.small = pygame.Surface(small_size).convert(screen)
+        self.tiny = pygame.Surface((max(1, small_size[0] // 2), max(1, small_size[1] // 2))).convert(screen)
+        self.cutoff = pygame.Surface(small_size).convert(screen)
+        self.cutoff.fill((self.threshold,) * 3)
+        self.glow = pygame.Surface((width, height)).convert(screen)
+        self._wide = np.empty((small_size[0], small_size[1], 3), dtype=np.uint16)
+
+    def apply(self, screen, phase):
+        strength = self.intensity + self.beat_intensity * beat_pulse(phase, self.sharpness)
+        if strength <= 0.0:
+            return
+        pygame.transform.smoothscale(screen, self.small.get_size(), self.small)
+        # しきい値を引いて（0で飽和）明るい部分だけを残す
+        self.small.blit(self.cutoff, (0, 0), special_flags=pygame.BLEND_RGB_SUB)
+
+        # 残った範囲（0〜255 - threshold）を0〜255に伸ばし、強さを掛ける（8ビット固定小数点）
+        headroom = max(1, 255 - self.threshold)
+        gain = min(int(256 * strength * 255 / headroom), 65535 // headroom)
+        wide = self._wide
+        pixels = pygame.surfarray.pixels3d(self.small)
+        np.multiply(pixels, np.uint16(gain), out=wide)
+        np.right_shift(wide, 8, out=wide)
+        np.minimum(wide, 255, out=wide)
+        pixels[...] = wide
+        del pixels  # Surfaceのロックを解除
+
+        # さらに半分に縮小して拡大し直し、光をにじませる
+        pygame.transform.smoothscale(self.small, self.tiny.get_size(), self.tiny)
+        pygame.transform.smoothscale(self.tiny, screen.get_size(), self.glow)
+        screen.blit(self.glow, (0, 0), special_flags=pygame.BLEND_RGB_ADD)
+
+
+class PostProcessor:
+    """エフェクトを順にかけるポストプロセスのパイプライン"""
+
+    def __init__(self, effects=()):
+        self.effects = list(effects)
+        self._size = None
+
+    def add(self, effect):
+        """エフェクトを末尾に追加"""
+        self.effects.append(effect)
+        self._size = None
+        return effect
+
+    def process(self, screen, phase, profiler=None):
+        """全てのエフェクトを順にかける（各エフェクトの処理時間をpost_<name>としてプロファイラに記録）
+
+        Args:
+            screen: シーンを描画済みのSurface
+            phase: ビート内の位相（0.0〜1.0）
+            profiler: FrameProfiler（Noneの場合は計測しない）
+        """
+        if screen.get_size() != self._size:
+            for effect in self.effects:
+                effect.allocate(screen)
+            self._size = screen.get_size()
+
+        for effect in self.effects:
+            if effect.optional and not Drawable.draw_optional:
+                continue
+            if profiler is None:
+                effect.apply(screen, phase)
+            else:
+                section = "post_" + effect.name
+                profiler.begin(section)
+                effect.apply(screen, phase)
+                profiler.end(section)
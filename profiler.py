@@ -0,0 +1,132 @@
+"""
+フレームプロファイラ - フレーム時間と処理区間ごとの時間を直近のウィンドウで記録する
+"""
+import time
+from collections import deque
+
+
+class FrameProfiler:
+    """フレーム時間と区間（update, drawなど）ごとの処理時間を記録するクラス
+
+    値はミリ秒で、直近window件だけを保持する。記録は1回あたりperf_counterの呼び出し程度のコスト。
+    直近の値とは別に、記録開始からの件数と合計（totals）を保持する（resetでは消さない）。
+    """
+
+    def __init__(self, window=300):
+        self.window = window
+        self.frame_times = deque(maxlen=window)
+        self.sections = {}  # 区間名 -> 直近の処理時間
+        self.totals = {}  # 区間名（フレーム時間はNone） -> [記録開始からの件数, 合計]
+        self.frame_count = 0
+        self._frame_start = None
+        self._section_starts = {}
+
+    def begin_frame(self):
+        """フレームの開始"""
+        now = time.perf_counter()
+        if self._frame_start is not None:
+            # 前回のフレーム開始からの間隔（待機時間を含む）をフレーム時間とする
+            elapsed = (now - self._frame_start) * 1000.0
+            self.frame_times.append(elapsed)
+            self._add_total(None, elapsed)
+        self._frame_start = now
+        self.frame_count += 1
+
+    def begin(self, name):
+        """区間の計測を開始"""
+        self._section_starts[name] = time.perf_counter()
+
+    def end(self, name):
+        """区間の計測を終了して記録
+
+        Returns:
+            float: 区間の処理時間（ミリ秒）
+        """
+        elapsed = (time.perf_counter() - self._section_starts.pop(name)) * 1000.0
+        self.record(name, elapsed)
+        return elapsed
+
+    def record(self, name, value):
+        """区間の値（ミリ秒）を記録"""
+        samples = self.sections.get(name)
+        if samples is None:
+            samples = self.sections[name] = deque(maxlen=self.window)
+        samples.append(value)
+        self._add_total(name, value)
+
+    def _add_total(self, name, value):
+        total = self.totals.get(name)
+        if total is None:
+            total = self.totals[name] = [0, 0.0]
+        total[0] += 1
+        total[1] += value
+
+    def reset(self):
+        """記録を消去"""
+        self.frame_times.clear()
+        self.sections.clear()
+        self._frame_start = None
+
+    def percentiles(self, name=None, points=(50, 90, 99)):
+        """直近の値のパーセンタイルを取得
+
+        Args:
+            name: 区間名（Noneの場合はフレーム時間）
+
+        Returns:
+            dict: パーセンタイル -> 値（記録がない場合は空）
+        """
+        samples = self.frame_times if name is None else self.sections.get(name, ())
+        return percentiles(samples, points)
+
+    def copy_windows(self):
+        """直近の値と累計のコピーを取得（描画ループの外のスレッドから呼んでもよい）
+
+        Returns:
+            tuple: (フレーム時間のタプル, {区間名: 値のタプル}, {区間名: (件数, 合計)})
+        """
+        while True:
+            try:
+                frame_times = tuple(self.frame_times)
+                sections = {name: tuple(samples) for name, samples in list(self.sections.items())}
+                totals = {name: tuple(total) for name, total in list(self.totals.items())}
+                return frame_times, sections, totals
+            except RuntimeError:
+                # コピー中に描画ループが記録した（deque・dictの変更）場合はやり直す
+                continue
+
+    def summary(self):
+        """フレーム時間と各区間の平均・パーセンタイル"""
+        result = {"frame": describe(self.frame_times)}
+        for name, samples in self.sections.items():
+            result[name] = describe(samples)
+        return result
+
+    def format(self):
+        """要約を1行ずつの文字列に整形"""
+        lines = []
+        for name, stats in self.summary().items():
+            if stats["count"]:
+                lines.append(f"{name:<16} mean {stats['mean']:7.2f} ms  p50 {stats['p50']:7.2f}  "
+                             f"p90 {stats['p90']:7.2f}  p99 {stats['p99']:7.2f}  max {stats['max']:7.2f}")
+        return "\n".join(lines)
+
+
+def percentiles(samples, points=(50, 90, 99)):
+    """値の列のパーセンタイル（最近傍法）"""
+    ordered = sorted(samples)
+    if not ordered:
+        return {}
+    last = len(ordered) - 1
+    return {point: ordered[min(last, int(round(point / 100.0 * last)))] for point in points}
+
+
+def describe(samples):
+    """値の列の件数・平均・最大・パーセンタイル"""
+    samples = tuple(samples)
+    if not samples:
+        return {"count": 0}
+    stats = {"count": len(samples), "mean": sum(samples) / len(samples), "max": max(samples)}
+    for point, value in percentiles(samples).items():
+        stats[f"p{point}"] = value
+    return stats
@@ -0,0 +1,117 @@
+"""
+品質ガバナー - フレーム時間のパーセンタイルを監視し、描画品質の段階を上げ下げする
+"""
+from itertools import islice
+
+from drawable import Drawable
+from profiler import percentiles
+
+# 品質の段階（下の段階ほど軽い。各段階はそれより上の段階の設定を含む）
+QUALITY_LEVELS = (
+    "full",             # 全ての描画
+    "fast_scaling",     # smoothscaleの代わりにscaleを使う（切り替え効果・キャンバスの拡大表示）
+    "no_optional",      # optionalなDrawableを描画しない
+    "fewer_particles",  # パーティクル（SpriteBatch・FlashBeaterGroupのメンバー）を間引いて描画
+    "skip_draws",       # 描画を1フレームおきにする（updateとビート処理は毎フレーム）
+)
+
+
+def apply_quality_level(movie, level):
+    """品質の段階の設定をDrawableとMovieに反映"""
+    Drawable.smooth_scaling = level < 1
+    Drawable.draw_optional = level < 2
+    Drawable.particle_stride = 2 if level >= 3 else 1
+    movie.draw_interval = 2 if level >= 4 else 1
+
+
+class QualityGovernor:
+    """フレーム時間の予算に収まるように品質の段階を切り替えるクラス
+
+    直近windowフレームのフレーム時間のp90が予算をdegrade_ratio倍以上超え、処理時間にも余裕がなければ1段階下げ、
+    描画1回分の処理時間（update + draw + flipのp90）が予算のupgrade_ratio倍を下回る状態が
+    upgrade_holdフレーム続いたら1段階上げる。段階を変えた後は新しい段階のフレームだけで判定する。
+    """
+
+    def __init__(self, target_fps=None, window=60, degrade_ratio=1.15, upgrade_ratio=0.6, upgrade_hold=180,
+                 max_level=len(QUALITY_LEVELS) - 1):
+        """
+        Args:
+            target_fps: 目標フレームレート（NoneではMovie.fps）
+            window: 判定に使う直近のフレーム数
+            degrade_ratio: フレーム時間のp90が予算のこの倍率を超えたら品質を下げる
+            upgrade_ratio: 処理時間のp90が予算のこの倍率を下回ったら品質を上げる
+            upgrade_hold: 品質を上げるまでに余裕が続く必要のあるフレーム数
+            max_level: 下げる段階の上限（QUALITY_LEVELSの番号）
+        """
+        self.target_fps = target_fps
+        self.window = window
+        self.degrade_ratio = degrade_ratio
+        self.upgrade_ratio = upgrade_ratio
+        self.upgrade_hold = upgrade_hold
+        self.max_level = max_level
+        self.level = 0
+        self.changes = 0
+        self._frames_at_level = 0
+        self._headroom_frames = 0
+
+    @property
+    def level_name(self):
+        return QUALITY_LEVELS[self.level]
+
+    def attach(self, movie):
+        """Movieに設定し、最高品質の設定を反映"""
+        movie.quality_governor = self
+        self.set_level(movie, 0)
+
+    def set_level(self, movie, level, reason=None):
+        """品質の段階を設定"""
+        level = max(0, min(self.max_level, level))
+        if level != self.level:
+            self.changes += 1
+            message = f"Quality level {self.level} -> {level} ({QUALITY_LEVELS[level]})"
+            print(message + (f": {reason}" if reason else ""))
+        self.level = level
+        self._frames_at_level = 0
+        self._headroom_frames = 0
+        apply_quality_level(movie, level)
+
+    def update(self, movie):
+        """フレームの終わりに呼ばれ、必要なら品質の段階を切り替える"""
+        fps = self.target_fps or movie.fps
+        if not fps:
+            return
+        self._frames_at_level += 1
+        if self._frames_at_level < self.window:
+            return
+        budget_ms = 1000.0 / fps
+        profiler = movie.profiler
+
+        # 描画を間引いていても、描画したフレームの処理時間で判定する
+        work_ms = 0.0
+        for name in ("update", "draw", "flip"):
+            value = _recent_percentile(profiler.sections.get(name, ()), self.window)
+            work_ms += value or 0.0
+
+        frame_p90 = _recent_percentile(profiler.frame_times, self.window)
+        # 処理に余裕があるのに遅れている場合（タイマーの粒度など）は品質を下げても改善しない
+        if (frame_p90 is not None and frame_p90 > budget_ms * self.degrade_ratio
+                and work_ms >= budget_ms * self.upgrade_ratio and self.level < self.max_level):
+            self.set_level(movie, self.level + 1,
+                           f"frame p90 {frame_p90:.1f} ms > budget {budget_ms:.1f} ms")
+            return
+
+        if self.level == 0:
+            return
+        if work_ms < budget_ms * self.upgrade_ratio:
+            self._headroom_frames += 1
+            if self._headroom_frames >= self.upgrade_hold:
+                self.set_level(movie, self.level - 1,
+                               f"work p90 {work_ms:.1f} ms < {self.upgrade_ratio:.0%} of budget")
+        else:
+            self._headroom_frames = 0
+
+
+def _recent_percentile(samples, count, point=90):
+    """直近count件のパーセンタイル（記録がない場合はNone）"""
+    start = max(0, len(samples) - count)
+    return percentiles(islice(samples, start, None), (point,)).get(point)
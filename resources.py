@@ -1,13 +1,28 @@
 import os
 from typing import Dict, List, Optional
 
+from surface_cache import SurfaceCache, set_default_cache
+
 class Resources:
     """リソースファイル管理クラス"""
     
-    def __init__(self, images_dir: str = "images", musics_dir: str = "musics"):
+    def __init__(self, images_dir: str = "images", musics_dir: str = "musics", cache_dir: str = ".beani_cache",
+                 premultiplied: bool = False):
+        """
+        Args:
+            images_dir: 画像ディレクトリ
+            musics_dir: 音楽ディレクトリ
+            cache_dir: デコード済み画像のキャッシュディレクトリ
+            premultiplied: 半透明の画像を乗算済みアルファに変換してBLEND_PREMULTIPLIEDで描画するかどうか
+        """
         self.images_dir = images_dir
         self.musics_dir = musics_dir
         
+        # デコード済み画像のディスクキャッシュ（各Drawableからも共有される）
+        # 読み込んだ画像はディスプレイのピクセルフォーマットに変換される
+        self.surface_cache = SurfaceCache(cache_dir, premultiplied=premultiplied)
+        set_default_cache(self.surface_cache)
+        
         # リソースの辞書
         self.images: Dict[str, Optional[str]] = {}
         self.musics: Dict[str, Optional[str]] = {}
@@ -100,6 +115,21 @@ class Resources:
         """
         return self.images.get(key)
     
+    def load_image(self, key: str, scale: float = 1.0):
+        """画像をキャッシュ経由で読み込み
+        
+        Args:
+            key: 画像ファイルのキー（拡張子なし）
+            scale: 画像のスケール
+        
+        Returns:
+            pygame.Surface: 読み込んだ画像（存在しない場合はNone）
+        """
+        path = self.images.get(key)
+        if path is None:
+            return None
+        return self.surface_cache.load(path, scale)
+    
     def get_music(self, key: str) -> Optional[str]:
         """音楽ファイルのパスを取得
         
@@ -1,33 +1,272 @@
 """
 シーンクラス - Drawableオブジェクトの集合を管理
 """
+import pygame
+from drawable import Drawable
+from spatial_hash import SpatialHash
+from tween import cancel_tweens
+
+# レイヤーの種類
+LAYER_DYNAMIC = "dynamic"          # 毎フレーム描画
+LAYER_STATIC = "static"            # 一度描画したら変化しない
+LAYER_BEAT_STATIC = "beat_static"  # ビートのタイミングでのみ変化する
 
 
 class Scene:
     """シーンクラス"""
-    def __init__(self, name="Unnamed Scene", duration_beats=None):
+    def __init__(self, name="Unnamed Scene", duration_beats=None, spatial_cell_size=128, cull_margin=16):
+        """
+        Args:
+            name: シーン名
+            duration_beats: シーンの再生時間（ビート数）
+            spatial_cell_size: 空間ハッシュのセルサイズ（Noneで空間ハッシュとカリングを無効化）
+            cull_margin: カリング時に画面の外側に含める余白（補間描画のずれを吸収）
+        """
         self.drawables = []
         self.name = name
         self.duration_beats = duration_beats  # シーンの再生時間（ビート数）
         self.start_beat = None  # シーン開始時のビート番号
+        self.transition = None  # このシーンに切り替わるときの効果
+        
+        # 列指向のコンポーネントストア（任意）と、それを一括処理するシステム
+        self.components = None
+        self.systems = []
+        
+        # rectを持つDrawableの空間ハッシュ（画面外のカリングと近傍検索用）
+        self.spatial_index = SpatialHash(spatial_cell_size) if spatial_cell_size else None
+        self.cull_margin = cull_margin
+        self._indexed_drawables = []
+        
+        # update/on_spectrumを実装しているDrawable（それ以外には呼ばない）
+        self._update_drawables = []
+        self._spectrum_drawables = []
+        
+        # 並列updateのバッチ分け（(バッチのリスト, メインスレッドでupdateするリスト)、Drawableの増減で作り直す）
+        self._parallel_plan = None
+        
+        # acquire()でプールから取得したDrawable -> 返却先のプール
+        self._pools = {}
+        
+        # レイヤーキャッシュ（priorityごとのレイヤー）
+        self.layer_modes = {}  # priority -> レイヤーの種類（未指定はLAYER_DYNAMIC）
+        self._draw_plan = None  # [(キャッシュ番号 or None, [drawable, ...]), ...]
+        self._layer_caches = []  # キャッシュ済みレイヤーを合成したSurface
+        self._layer_valid = []
+        self._layer_bounds = []  # キャッシュ内の描画済み領域
+        self._layer_culled = []  # キャッシュの描画時に省略したDrawable（変わったら再描画）
+        self._beat_cache_indices = []  # ビートで無効化するキャッシュ番号
     
     def add_drawable(self, drawable):
         """Drawableオブジェクトを追加"""
         self.drawables.append(drawable)
+        self._draw_plan = None
+        self._parallel_plan = None
+        if type(drawable).update is not Drawable.update:
+            self._update_drawables.append(drawable)
+        if type(drawable).on_spectrum is not Drawable.on_spectrum:
+            self._spectrum_drawables.append(drawable)
+        if self.spatial_index is not None and getattr(drawable, 'rect', None) is not None:
+            self._indexed_drawables.append(drawable)
+            self.spatial_index.insert(drawable, drawable.rect)
+    
+    def remove_drawable(self, drawable):
+        """Drawableオブジェクトを削除"""
+        self.drawables.remove(drawable)
+        self._draw_plan = None
+        self._parallel_plan = None
+        for drawables in (self._update_drawables, self._spectrum_drawables):
+            if drawable in drawables:
+                drawables.remove(drawable)
+        if drawable in self._indexed_drawables:
+            self._indexed_drawables.remove(drawable)
+            self.spatial_index.remove(drawable)
+    
+    def acquire(self, pool, *args, **kwargs):
+        """プール（ObjectPool）からDrawableを取得してシーンに追加
+        
+        ビートごとに出して消す演出（パーティクルなど）に使い、消すときはrelease()でプールに返す。
+        
+        Returns:
+            Drawable: 追加したDrawable
+        """
+        drawable = pool.acquire(*args, **kwargs)
+        self.add_drawable(drawable)
+        self._pools[drawable] = pool
+        return drawable
+    
+    def release(self, drawable):
+        """acquire()で追加したDrawableをシーンから削除し、実行中のトゥイーンを止めてプールに返す"""
+        self.remove_drawable(drawable)
+        cancel_tweens(drawable)
+        self._pools.pop(drawable).release(drawable)
+    
+    def _update_spatial_index(self):
+        """移動したDrawableの空間ハッシュを更新"""
+        if self.spatial_index is None:
+            return
+        spatial_index = self.spatial_index
+        for drawable in self._indexed_drawables:
+            spatial_index.update(drawable, drawable.rect)
+    
+    def query_rect(self, rect):
+        """矩形と重なるDrawableの集合を取得"""
+        return self.spatial_index.query_rect(rect)
+    
+    def query_radius(self, x, y, radius):
+        """円と重なるDrawableの集合を取得"""
+        return self.spatial_index.query_radius(x, y, radius)
+    
+    def _get_culled(self, screen):
+        """画面と重ならないため描画を省略するDrawableの集合を取得"""
+        if not self._indexed_drawables:
+            return ()
+        viewport = screen.get_rect().inflate(self.cull_margin * 2, self.cull_margin * 2)
+        visible = self.spatial_index.query_rect(viewport)
+        if len(visible) == len(self._indexed_drawables):
+            return ()
+        return set(self._indexed_drawables).difference(visible)
+    
+    def add_system(self, system):
+        """updateのたびにcomponentsに対して呼ばれるシステム（関数）を追加"""
+        self.systems.append(system)
+    
+    def set_layer_mode(self, priority, mode):
+        """priorityのレイヤーの種類を設定
+        
+        LAYER_STATIC/LAYER_BEAT_STATICのレイヤーはSurfaceにまとめて描画してキャッシュし、
+        無効化されたときだけ再描画する。LAYER_BEAT_STATICはon_beatのたびに無効化される。
+        """
+        self.layer_modes[priority] = mode
+        self._draw_plan = None
     
-    def update(self):
-        """全てのDrawableオブジェクトを更新"""
+    def invalidate_layers(self):
+        """キャッシュ済みレイヤーを無効化（次の描画で再描画）"""
+        self._layer_valid = [False] * len(self._layer_caches)
+    
+    def _build_draw_plan(self):
+        """priority順の描画計画を作成（連続するキャッシュ対象レイヤーは1枚にまとめる）"""
+        plan = []
+        beat_indices = []
+        cache_count = 0
+        for drawable in sorted(self.drawables, key=lambda drawable: drawable.priority):
+            mode = self.layer_modes.get(drawable.priority, LAYER_DYNAMIC)
+            cached = mode != LAYER_DYNAMIC
+            if not plan or (plan[-1][0] is not None) != cached:
+                plan.append((cache_count if cached else None, []))
+                if cached:
+                    cache_count += 1
+            plan[-1][1].append(drawable)
+            if mode == LAYER_BEAT_STATIC and plan[-1][0] not in beat_indices:
+                beat_indices.append(plan[-1][0])
+        
+        self._draw_plan = plan
+        self._beat_cache_indices = beat_indices
+        # キャッシュ用Surfaceは最初の描画時に確保
+        self._layer_caches = [None] * cache_count
+        self._layer_valid = [False] * cache_count
+        self._layer_bounds = [None] * cache_count
+        self._layer_culled = [frozenset()] * cache_count
+    
+    def save_state(self):
+        """全てのDrawableオブジェクトの現在の状態を保存（固定ステップ時の補間用）"""
         for drawable in self.drawables:
-            drawable.update()
+            drawable.save_state()
+    
+    def update(self, parallel_updater=None):
+        """updateを実装しているDrawableオブジェクトを更新（トゥイーンだけで動くものは呼ばない）
+        
+        Args:
+            parallel_updater: 指定するとindependentなDrawableのupdateをスレッドプールで並列に実行
+                （全て終わってから戻る）
+        """
+        if parallel_updater is None:
+            for drawable in self._update_drawables:
+                drawable.update()
+        else:
+            if self._parallel_plan is None or self._parallel_plan[0] is not parallel_updater:
+                self._parallel_plan = self._build_parallel_plan(parallel_updater)
+            _, batches, serial = self._parallel_plan
+            parallel_updater.run(batches, serial)
+        for system in self.systems:
+            system(self.components)
+        self._update_spatial_index()
+    
+    def _build_parallel_plan(self, parallel_updater):
+        """independentなDrawableをバッチに分ける（少ない場合は全てメインスレッドでupdate）"""
+        independent = [drawable for drawable in self._update_drawables if drawable.independent]
+        if len(independent) < parallel_updater.min_drawables:
+            return parallel_updater, [], list(self._update_drawables)
+        serial = [drawable for drawable in self._update_drawables if not drawable.independent]
+        return parallel_updater, parallel_updater.split(independent), serial
     
     def on_beat(self, beat, measure):
         """全てのDrawableオブジェクトにビート通知"""
         for drawable in self.drawables:
             drawable.on_beat(beat, measure)
+        for index in self._beat_cache_indices:
+            self._layer_valid[index] = False
+        self._update_spatial_index()
+    
+    def on_spectrum(self, bands):
+        """on_spectrumを実装しているDrawableに帯域エネルギーを通知"""
+        for drawable in self._spectrum_drawables:
+            drawable.on_spectrum(bands)
+    
+    def restore_state(self, beat, phase, ticks_per_beat):
+        """全てのDrawableオブジェクトの状態をシーン内のビート位置から復元（シーク用）"""
+        for drawable in self.drawables:
+            drawable.restore_state(beat, phase, ticks_per_beat)
+        self.invalidate_layers()
+        self._update_spatial_index()
+    
+    def close(self):
+        """全てのDrawableオブジェクトのリソースを解放（トラックの再生終了・Movieの終了時）"""
+        for drawable in self.drawables:
+            drawable.close()
+        self._layer_caches = [None] * len(self._layer_caches)
+        self._layer_valid = [False] * len(self._layer_valid)
     
     def draw(self, screen):
-        """全てのDrawableオブジェクトを優先順位順に描画"""
-        # priority順にソート（小さい値から先に描画）
-        sorted_drawables = sorted(self.drawables, key=lambda drawable: drawable.priority)
-        for drawable in sorted_drawables:
-            drawable.draw(screen)
+        """全てのDrawableオブジェクトを優先順位順に描画（画面外のもの、品質設定で省略するものは除く）"""
+        culled = self._get_culled(screen) if self.spatial_index is not None else ()
+        if not Drawable.draw_optional:
+            # 負荷が高いときはoptionalなDrawableも省略
+            culled = set(culled).union(drawable for drawable in self.drawables if drawable.optional)
+        
+        if not self.layer_modes:
+            # priority順にソート（小さい値から先に描画）
+            sorted_drawables = sorted(self.drawables, key=lambda drawable: drawable.priority)
+            for drawable in sorted_drawables:
+                if drawable not in culled:
+                    drawable.draw(screen)
+            return
+        
+        if self._draw_plan is None:
+            self._build_draw_plan()
+        
+        for cache_index, drawables in self._draw_plan:
+            if cache_index is None:
+                for drawable in drawables:
+                    if drawable not in culled:
+                        drawable.draw(screen)
+                continue
+            
+            cache = self._layer_caches[cache_index]
+            if cache is None or cache.get_size() != screen.get_size():
+                cache = pygame.Surface(screen.get_size(), pygame.SRCALPHA)
+                self._layer_caches[cache_index] = cache
+                self._layer_valid[cache_index] = False
+            # 画面外に出た・画面内に入ったDrawableがあれば、キャッシュに焼き込んだ内容が変わるため再描画
+            layer_culled = frozenset(culled.intersection(drawables)) if culled else frozenset()
+            if not self._layer_valid[cache_index] or layer_culled != self._layer_culled[cache_index]:
+                # 無効化されたときだけレイヤーを再描画
+                cache.fill((0, 0, 0, 0))
+                for drawable in drawables:
+                    if drawable not in culled:
+                        drawable.draw(cache)
+                self._layer_valid[cache_index] = True
+                self._layer_culled[cache_index] = layer_culled
+                # 透明でない領域だけを転送する
+                self._layer_bounds[cache_index] = cache.get_bounding_rect()
+            bounds = self._layer_bounds[cache_index]
+            screen.blit(cache, bounds.topleft, bounds)
@@ -0,0 +1,274 @@
+"""
+シーングラフ - 親子関係を持つノードのローカル変換（位置・スケール・回転）からワールド変換を計算してキャッシュする
+"""
+import math
+
+import pygame
+
+from drawable import Drawable
+from surface_cache import blit_flags
+
+
+class Node(Drawable):
+    """親ノードからの相対的な位置・スケール・回転を持つノード
+
+    x, yは親ノードの座標系での位置。変換の変更はset_transform()/move()で行い、
+    変更したノードとその子孫だけが次のupdateでワールド変換を計算し直す。
+    """
+    __slots__ = ('scale', 'rotation', 'parent', 'children', 'graph', 'depth',
+                 'world_x', 'world_y', 'world_scale', 'world_rotation', '_dirty')
+
+    def __init__(self, x=0.0, y=0.0, scale=1.0, rotation=0.0, priority=0):
+        """
+        Args:
+            x, y: 親ノードの座標系での位置
+            scale: 親ノードに対するスケール
+            rotation: 親ノードに対する回転（度、反時計回り）
+            priority: 描画優先順位（SceneGraphをシーンに追加するときのみ使用）
+        """
+        super().__init__(x, y, priority)
+        self.scale = scale
+        self.rotation = rotation
+        self.parent = None
+        self.children = []
+        self.graph = None
+        self.depth = 0
+
+        # キャッシュしたワールド変換
+        self.world_x = float(x)
+        self.world_y = float(y)
+        self.world_scale = scale
+        self.world_rotation = rotation
+        self._dirty = True
+
+    def add_child(self, node):
+        """子ノードを追加
+
+        Returns:
+            Node: 追加したノード
+        """
+        if node.parent is not None:
+            node.parent.children.remove(node)
+        node.parent = self
+        self.children.append(node)
+        node._attach(self.graph, self.depth + 1)
+        return node
+
+    def remove_child(self, node):
+        """子ノードを削除"""
+        self.children.remove(node)
+        node.parent = None
+        if self.graph is not None:
+            self.graph._structure_changed = True
+        node._attach(None, 0)
+
+    def _attach(self, graph, depth):
+        """部分木のグラフと深さを設定"""
+        self.graph = graph
+        self.depth = depth
+        self._dirty = False
+        self.mark_dirty()
+        if graph is not None:
+            graph._structure_changed = True
+        for child in self.children:
+            child._attach(graph, depth + 1)
+
+    def set_transform(self, x=None, y=None, scale=None, rotation=None):
+        """ローカル変換を設定（指定した値だけ変更）"""
+        if x is not None:
+            self.x = x
+        if y is not None:
+            self.y = y
+        if scale is not None:
+            self.scale = scale
+        if rotation is not None:
+            self.rotation = rotation
+        self.mark_dirty()
+
+    def move(self, dx, dy):
+        """ローカル位置を移動"""
+        self.x += dx
+        self.y += dy
+        self.mark_dirty()
+
+    def mark_dirty(self):
+        """ワールド変換の再計算が必要なノードとしてグラフに登録"""
+        if self._dirty:
+            return
+        self._dirty = True
+        if self.graph is not None:
+            self.graph._dirty_nodes.append(self)
+
+    def _update_world(self):
+        """このノードと子孫のワールド変換を計算し直す"""
+        parent = self.parent
+        if parent is None:
+            self.world_x = float(self.x)
+            self.world_y = float(self.y)
+            self.world_scale = self.scale
+            self.world_rotation = self.rotation
+        else:
+            # 親の回転とスケールをローカル位置に適用（画面のy軸は下向きなので反時計回りは-sin）
+            angle = math.radians(parent.world_rotation)
+            cos, sin = math.cos(angle), math.sin(angle)
+            scale = parent.world_scale
+            self.world_x = parent.world_x + (self.x * cos + self.y * sin) * scale
+            self.world_y = parent.world_y + (-self.x * sin + self.y * cos) * scale
+            self.world_scale = scale * self.scale
+            self.world_rotation = parent.world_rotation + self.rotation
+        self._dirty = False
+        self.on_world_changed()
+        for child in self.children:
+            child._update_world()
+
+    def on_world_changed(self):
+        """ワールド変換が変わったときに呼ばれる処理"""
+        pass
+
+    def draw_node(self, screen):
+        """ワールド変換で描画する処理（SpriteNode以外の描画するノードが実装）"""
+        pass
+
+    def iter_subtree(self):
+        """このノードと子孫を深さ優先の順に列挙"""
+        yield self
+        for child in self.children:
+            yield from child.iter_subtree()
+
+
+class SpriteNode(Node):
+    """画像をワールド変換で描画するノード
+
+    スケールと回転を量子化して変換済みの画像をキャッシュし、SceneGraphがまとめてblitsで描画する。
+    """
+    __slots__ = ('image', 'scale_step', 'rotation_step', '_images', '_entry')
+
+    # ノードごとにキャッシュする変換済み画像の数の上限
+    MAX_CACHED_IMAGES = 64
+
+    def __init__(self, image, x=0.0, y=0.0, scale=1.0, rotation=0.0, scale_step=0.02, rotation_step=1.0):
+        """
+        Args:
+            image: 描画する画像（中心がノードの位置）
+            scale_step, rotation_step: 変換済み画像をキャッシュするときの量子化の幅
+        """
+        super().__init__(x, y, scale, rotation)
+        self.image = image
+        self.scale_step = scale_step
+        self.rotation_step = rotation_step
+        self._images = {}  # (量子化したスケール, 回転) -> 変換済み画像
+        self._entry = None  # SceneGraphのblit列の要素 [画像, 左上座標, None, special_flags]
+
+    def on_world_changed(self):
+        if self._entry is not None:
+            self._update_entry()
+
+    def _update_entry(self):
+        """blit列の要素を現在のワールド変換の画像と位置に書き換え"""
+        image = self._transformed_image()
+        entry = self._entry
+        entry[0] = image
+        entry[1] = (int(self.world_x - image.get_width() / 2), int(self.world_y - image.get_height() / 2))
+        # 変換済み画像は元の画像のアルファの形式（乗算済みかどうか）を引き継ぐ
+        entry[3] = blit_flags(self.image)
+
+    def _transformed_image(self):
+        """ワールドのスケールと回転を適用した画像（キャッシュ済みならそれを返す）"""
+        scale_key = round(self.world_scale / self.scale_step)
+        rotation_key = round((self.world_rotation % 360.0) / self.rotation_step) % round(360 / self.rotation_step)
+        if rotation_key == 0 and scale_key == round(1.0 / self.scale_step):
+            return self.image
+        key = (scale_key, rotation_key)
+        image = self._images.get(key)
+        if image is None:
+            if len(self._images) >= self.MAX_CACHED_IMAGES:
+                self._images.clear()
+            scale = max(scale_key, 1) * self.scale_step
+            rotation = rotation_key * self.rotation_step
+            if rotation_key == 0:
+                size = (max(1, int(self.image.get_width() * scale)), max(1, int(self.image.get_height() * scale)))
+                scaler = pygame.transform.smoothscale if Drawable.smooth_scaling else pygame.transform.scale
+                image = scaler(self.image, size)
+            else:
+                image = pygame.transform.rotozoom(self.image, rotation, scale)
+            self._images[key] = image
+        return image
+
+
+class SceneGraph(Node):
+    """ノードの木の根（シーンに追加するDrawable）
+
+    updateの最初に変更されたノードの部分木だけワールド変換を計算し直し、
+    描画はSpriteNodeのblit列（変更されたノードの要素だけ書き換わる）をまとめてblitsする。
+    update/on_beatを実装しているノードにだけそれぞれを呼ぶ。
+    """
+    __slots__ = ('_dirty_nodes', '_structure_changed', '_blit_sequence', '_draw_nodes',
+                 '_update_nodes', '_beat_nodes')
+
+    def __init__(self, x=0.0, y=0.0, scale=1.0, rotation=0.0, priority=0):
+        self._dirty_nodes = []
+        self._structure_changed = True
+        self._blit_sequence = []
+        self._draw_nodes = []  # draw_nodeを実装しているノード
+        self._update_nodes = []
+        self._beat_nodes = []
+        super().__init__(x, y, scale, rotation, priority)
+        self.graph = self
+        self._dirty_nodes.append(self)
+
+    def _rebuild(self):
+        """木の構造が変わったときに描画順と通知先を作り直す"""
+        sequence = []
+        draw_nodes = []
+        update_nodes = []
+        beat_nodes = []
+        for node in self.iter_subtree():
+            if node is self:
+                continue
+            node_type = type(node)
+            if isinstance(node, SpriteNode):
+                node._entry = [None, None, None, 0]
+                node._update_entry()
+                sequence.append(node._entry)
+            elif node_type.draw_node is not Node.draw_node:
+                draw_nodes.append(node)
+            if node_type.update is not Drawable.update:
+                update_nodes.append(node)
+            if node_type.on_beat is not Drawable.on_beat:
+                beat_nodes.append(node)
+        self._blit_sequence = sequence
+        self._draw_nodes = draw_nodes
+        self._update_nodes = update_nodes
+        self._beat_nodes = beat_nodes
+        self._structure_changed = False
+
+    def update_transforms(self):
+        """変更されたノードの部分木のワールド変換を計算し直す"""
+        dirty_nodes = self._dirty_nodes
+        if dirty_nodes:
+            # 親を先に計算すれば、子孫の変更はその部分木の計算でまとめて反映される
+            dirty_nodes.sort(key=lambda node: node.depth)
+            for node in dirty_nodes:
+                if node._dirty and node.graph is self:
+                    node._update_world()
+            dirty_nodes.clear()
+        if self._structure_changed:
+            self._rebuild()
+
+    def update(self):
+        for node in self._update_nodes:
+            node.update()
+        self.update_transforms()
+
+    def on_beat(self, beat, measure):
+        for node in self._beat_nodes:
+            node.on_beat(beat, measure)
+        self.update_transforms()
+
+    def draw(self, screen):
+        if self._dirty_nodes or self._structure_changed:
+            self.update_transforms()
+        screen.blits(self._blit_sequence, doreturn=False)
+        # draw_nodeを実装したノードはSpriteNodeの後に描画
+        for node in self._draw_nodes:
+            node.draw_node(screen)
@@ -0,0 +1,358 @@
+"""
+セッショントレース - 再生中の入力・時計の読み取り値・ビート・フレーム時間をバイナリで記録し、
+ヘッドレスで同じ時計の値を使って再生してフレーム時間を比較する
+
+使い方:
+    python session_trace.py record show.bntr movie1    # movie1.main()を記録しながら実行
+    python session_trace.py replay show.bntr movie1    # 現在のコードでヘッドレス再生して比較
+"""
+import importlib
+import os
+import struct
+import sys
+import time
+
+import pygame
+
+from profiler import describe
+from time_source import TimeSource
+
+TRACE_MAGIC = b"BNTR"
+TRACE_VERSION = 1
+
+# magic, version, fps, bpm
+HEADER = struct.Struct("<4sHHd")
+
+# レコードの種類（先頭1バイト）
+REC_CLOCK = 1  # 時計の読み取り値: 種類, 値
+REC_KEY = 2  # キー入力: キーコード
+REC_BEAT = 3  # on_beatを呼んだビート: ビート番号, シーン番号
+REC_FRAME = 4  # フレームの終わり: フレーム時間, update, draw, flip（ミリ秒）
+
+RECORDS = {
+    REC_CLOCK: struct.Struct("<BBd"),
+    REC_KEY: struct.Struct("<Bi"),
+    REC_BEAT: struct.Struct("<Bih"),
+    REC_FRAME: struct.Struct("<Bffff"),
+}
+
+# 時計の読み取り値の種類
+CLOCK_TICKS = 0
+CLOCK_BUSY = 1
+CLOCK_POS = 2
+CLOCK_TRACKS = 3  # 曲の切り替え回数（プレイリスト）
+
+# コマンドラインから起動したときにMovieが使うセッション
+_pending_session = None
+
+
+def set_pending_session(session):
+    """次に作成されるMovieで使うセッションを設定"""
+    global _pending_session
+    _pending_session = session
+
+
+def take_pending_session():
+    """設定されたセッションを取り出す（一度だけ）"""
+    global _pending_session
+    session = _pending_session
+    _pending_session = None
+    return session
+
+
+class RecordingClock(TimeSource):
+    """時間ソースの読み取り値を記録しながら委譲する時間ソース"""
+
+    def __init__(self, inner, recorder):
+        self.inner = inner
+        self.recorder = recorder
+        self.uses_audio = inner.uses_audio
+
+    @property
+    def music_tracks_started(self):
+        value = self.inner.music_tracks_started
+        self.recorder.write(REC_CLOCK, CLOCK_TRACKS, value)
+        return value
+
+    def get_ticks(self):
+        value = self.inner.get_ticks()
+        self.recorder.write(REC_CLOCK, CLOCK_TICKS, value)
+        return value
+
+    def tick(self, fps):
+        result = self.inner.tick(fps)
+        self.recorder.end_frame()
+        return result
+
+    def music_load(self, music_file, length_ms=None):
+        self.inner.music_load(music_file, length_ms)
+
+    def music_play(self, start_ms=0):
+        self.inner.music_play(start_ms)
+
+    def music_queue(self, music_file, length_ms=None):
+        self.inner.music_queue(music_file, length_ms)
+
+    def music_stop(self):
+        self.inner.music_stop()
+
+    def music_get_busy(self):
+        value = self.inner.music_get_busy()
+        self.recorder.write(REC_CLOCK, CLOCK_BUSY, float(value))
+        return value
+
+    def music_get_pos(self):
+        value = self.inner.music_get_pos()
+        self.recorder.write(REC_CLOCK, CLOCK_POS, value)
+        return value
+
+
+class SessionRecorder:
+    """Movieの再生を記録するクラス"""
+
+    def __init__(self, path):
+        self.path = path
+        self.file = None
+        self.movie = None
+        self.frame_count = 0
+        self._last_tick = None
+
+    def wrap_time_source(self, time_source):
+        """Movieの時間ソースを記録用の時間ソースで包む"""
+        return RecordingClock(time_source, self)
+
+    def attach(self, movie):
+        """Movieの初期化後に呼ばれ、ファイルを開いてヘッダを書き込む"""
+        self.movie = movie
+        self.file = open(self.path, "wb")
+        self.file.write(HEADER.pack(TRACE_MAGIC, TRACE_VERSION, movie.fps, movie.bpm))
+        print(f"Recording session trace to {self.path}")
+
+    def write(self, record_type, *values):
+        if self.file is not None:
+            self.file.write(RECORDS[record_type].pack(record_type, *values))
+
+    def record_key(self, key):
+        self.write(REC_KEY, key)
+
+    def record_beat(self, beat, scene_index):
+        self.write(REC_BEAT, beat, scene_index)
+
+    def end_frame(self):
+        """フレームの終わり（時間ソースのtick後）にフレーム時間を記録"""
+        now = time.perf_counter()
+        frame_ms = (now - self._last_tick) * 1000.0 if self._last_tick is not None else 0.0
+        self._last_tick = now
+        update_ms, draw_ms, flip_ms = _last_sections(self.movie.profiler)
+        self.write(REC_FRAME, frame_ms, update_ms, draw_ms, flip_ms)
+        self.frame_count += 1
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+            print(f"Session trace saved: {self.path} ({self.frame_count} frames)")
+
+
+def _last_sections(profiler):
+    """直近のフレームのupdate/draw/flipの時間"""
+    values = []
+    for name in ("update", "draw", "flip"):
+        samples = profiler.sections.get(name)
+        values.append(samples[-1] if samples else 0.0)
+    return values
+
+
+class TraceFrame:
+    """トレースの1フレーム分のレコード"""
+    __slots__ = ('clock', 'keys', 'beats', 'frame_ms', 'update_ms', 'draw_ms', 'flip_ms')
+
+    def __init__(self):
+        self.clock = ([], [], [], [])  # 種類ごとの読み取り値（読み取った順）
+        self.keys = []
+        self.beats = []
+        self.frame_ms = self.update_ms = self.draw_ms = self.flip_ms = 0.0
+
+    @property
+    def work_ms(self):
+        """待機を除いた処理時間"""
+        return self.update_ms + self.draw_ms + self.flip_ms
+
+
+def read_trace(path):
+    """トレースファイルを読み込み
+
+    Returns:
+        (fps, bpm, フレームのリスト)
+    """
+    with open(path, "rb") as f:
+        data = f.read()
+    magic, version, fps, bpm = HEADER.unpack_from(data, 0)
+    if magic != TRACE_MAGIC or version != TRACE_VERSION:
+        raise ValueError(f"Not a session trace: {path}")
+
+    frames = []
+    frame = TraceFrame()
+    offset = HEADER.size
+    while offset < len(data):
+        record_type = data[offset]
+        record = RECORDS[record_type]
+        values = record.unpack_from(data, offset)[1:]
+        offset += record.size
+        if record_type == REC_CLOCK:
+            frame.clock[values[0]].append(values[1])
+        elif record_type == REC_KEY:
+            frame.keys.append(values[0])
+        elif record_type == REC_BEAT:
+            frame.beats.append(values)
+        else:
+            frame.frame_ms, frame.update_ms, frame.draw_ms, frame.flip_ms = values
+            frames.append(frame)
+            frame = TraceFrame()
+    return fps, bpm, frames
+
+
+class ReplayClock(TimeSource):
+    """記録された時計の読み取り値をフレームごとに同じ順で返す時間ソース
+
+    コードの変更で読み取り回数が変わった場合は、そのフレームの最後の値を返し続ける。
+    """
+
+    def __init__(self, replay):
+        self.replay = replay
+        self.frame_index = 0
+        self._cursors = [0, 0, 0, 0]
+        self._last_values = [0.0, 0.0, -1.0, 0.0]
+
+    def _read(self, kind):
+        frames = self.replay.frames
+        if self.frame_index < len(frames):
+            values = frames[self.frame_index].clock[kind]
+            cursor = self._cursors[kind]
+            if cursor < len(values):
+                self._cursors[kind] = cursor + 1
+                self._last_values[kind] = values[cursor]
+        return self._last_values[kind]
+
+    @property
+    def music_tracks_started(self):
+        return int(self._read(CLOCK_TRACKS))
+
+    def get_ticks(self):
+        return int(self._read(CLOCK_TICKS))
+
+    def tick(self, fps):
+        # 待機せずに次のフレームへ
+        self.replay.end_frame(self.frame_index)
+        self.frame_index += 1
+        self._cursors = [0, 0, 0, 0]
+        self.replay.begin_frame(self.frame_index)
+        return 0
+
+    def music_play(self, start_ms=0):
+        pass
+
+    def music_queue(self, music_file, length_ms=None):
+        pass
+
+    def music_stop(self):
+        pass
+
+    def music_get_busy(self):
+        return bool(self._read(CLOCK_BUSY))
+
+    def music_get_pos(self):
+        return self._read(CLOCK_POS)
+
+
+class SessionReplay:
+    """トレースを現在のコードで再生し、フレーム時間を比較するクラス"""
+
+    def __init__(self, path):
+        self.path = path
+        self.fps, self.bpm, self.frames = read_trace(path)
+        self.movie = None
+        self.replay_work_ms = []
+        self.replay_beats = []
+
+    def wrap_time_source(self, time_source):
+        """記録された値を返す時間ソースに差し替え（音声は使わない）"""
+        return ReplayClock(self)
+
+    def attach(self, movie):
+        self.movie = movie
+        print(f"Replaying session trace {self.path} ({len(self.frames)} frames)")
+        self.begin_frame(0)
+
+    def begin_frame(self, index):
+        """記録されたキー入力をイベントキューに入れる（最後のフレームの後は終了イベント）"""
+        if index >= len(self.frames):
+            pygame.event.post(pygame.event.Event(pygame.QUIT))
+            return
+        for key in self.frames[index].keys:
+            pygame.event.post(pygame.event.Event(pygame.KEYDOWN, key=key, mod=0, unicode="", scancode=0))
+
+    def end_frame(self, index):
+        self.replay_work_ms.append(sum(_last_sections(self.movie.profiler)))
+
+    def record_key(self, key):
+        pass
+
+    def record_beat(self, beat, scene_index):
+        self.replay_beats.append((len(self.replay_work_ms), beat, scene_index))
+
+    def close(self):
+        self.print_report()
+
+    def print_report(self, worst=10):
+        """記録時と再生時のフレーム時間を並べて表示"""
+        count = min(len(self.frames), len(self.replay_work_ms))
+        recorded = [frame.work_ms for frame in self.frames[:count]]
+        replayed = self.replay_work_ms[:count]
+        budget_ms = 1000.0 / self.fps if self.fps else None
+
+        print(f"\nSession replay: {self.path} ({count} frames, work time = update + draw + flip)")
+        print(f"{'':<10}{'recorded':>12}{'replay':>12}")
+        recorded_stats = describe(recorded)
+        replayed_stats = describe(replayed)
+        for key in ("mean", "p50", "p90", "p99", "max"):
+            if key in recorded_stats and key in replayed_stats:
+                print(f"{key:<10}{recorded_stats[key]:>9.2f} ms{replayed_stats[key]:>9.2f} ms")
+        if budget_ms:
+            over_recorded = sum(1 for frame in self.frames[:count] if frame.frame_ms > budget_ms * 1.5)
+            over_replay = sum(1 for value in replayed if value > budget_ms)
+            print(f"Stutters (recorded frame > {budget_ms * 1.5:.1f} ms): {over_recorded}, "
+                  f"replay frames over budget ({budget_ms:.1f} ms): {over_replay}")
+
+        print(f"Worst {worst} recorded frames:")
+        print(f"  {'frame':>6} {'recorded frame':>15} {'recorded work':>14} {'replay work':>12} {'delta':>9}")
+        order = sorted(range(count), key=lambda i: -self.frames[i].frame_ms)[:worst]
+        for i in sorted(order):
+            frame = self.frames[i]
+            print(f"  {i:>6} {frame.frame_ms:>12.2f} ms {frame.work_ms:>11.2f} ms "
+                  f"{replayed[i]:>9.2f} ms {replayed[i] - frame.work_ms:>+6.2f} ms")
+
+        recorded_beats = [(index, beat, scene) for index, frame in enumerate(self.frames) for beat, scene in frame.beats]
+        mismatches = sum(1 for a, b in zip(recorded_beats, self.replay_beats) if a != b)
+        mismatches += abs(len(recorded_beats) - len(self.replay_beats))
+        print(f"Beats: {len(recorded_beats)} recorded, {len(self.replay_beats)} replayed, {mismatches} mismatches")
+
+
+def main(argv):
+    if len(argv) != 4 or argv[1] not in ("record", "replay"):
+        print("Usage: python session_trace.py record|replay <trace file> <movie module>")
+        return 1
+    mode, path, module_name = argv[1:]
+    if mode == "replay":
+        # ヘッドレスで実行
+        os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+        os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+        set_pending_session(SessionReplay(path))
+    else:
+        set_pending_session(SessionRecorder(path))
+    importlib.import_module(module_name).main()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
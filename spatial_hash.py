@@ -0,0 +1,123 @@
+"""
+空間ハッシュ - 均一グリッドで矩形を管理し、範囲内のオブジェクトを高速に検索する
+"""
+import pygame
+
+
+class SpatialHash:
+    """均一グリッドによる空間ハッシュ
+
+    オブジェクトは矩形が重なる全てのセルに登録される。幅や高さが0の矩形は1ピクセルとして扱う。
+    update()はセルの範囲が変わったときだけ登録し直すため、移動が小さければほぼコストがかからない。
+    """
+    def __init__(self, cell_size=128):
+        self.cell_size = cell_size
+        self.cells = {}  # (セルx, セルy) -> オブジェクトの集合
+        self._entries = {}  # オブジェクト -> (矩形, セル範囲)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, obj):
+        return obj in self._entries
+
+    def _cell_range(self, rect):
+        """矩形が重なるセルの範囲 (x0, y0, x1, y1) を取得"""
+        size = self.cell_size
+        x0 = rect.left // size
+        y0 = rect.top // size
+        return (x0, y0, max(x0, (rect.right - 1) // size), max(y0, (rect.bottom - 1) // size))
+
+    def insert(self, obj, rect):
+        """オブジェクトを登録"""
+        if obj in self._entries:
+            self.update(obj, rect)
+            return
+        cell_range = self._cell_range(rect)
+        self._entries[obj] = (rect, cell_range)
+        self._add_to_cells(obj, cell_range)
+
+    def update(self, obj, rect):
+        """オブジェクトの矩形を更新（セルの範囲が変わったときだけ登録し直す）"""
+        entry = self._entries.get(obj)
+        if entry is None:
+            self.insert(obj, rect)
+            return
+        # 毎フレーム全オブジェクトに対して呼ばれるためセル範囲の計算をインライン化
+        size = self.cell_size
+        x, y, width, height = rect
+        x0 = x // size
+        y0 = y // size
+        cell_range = (x0, y0, max(x0, (x + width - 1) // size), max(y0, (y + height - 1) // size))
+        if cell_range != entry[1]:
+            self._remove_from_cells(obj, entry[1])
+            self._add_to_cells(obj, cell_range)
+        elif entry[0] is rect:
+            return
+        self._entries[obj] = (rect, cell_range)
+
+    def remove(self, obj):
+        """オブジェクトの登録を解除"""
+        entry = self._entries.pop(obj, None)
+        if entry is not None:
+            self._remove_from_cells(obj, entry[1])
+
+    def query_rect(self, rect):
+        """矩形と重なるオブジェクトの集合を取得"""
+        found = set()
+        x0, y0, x1, y1 = self._cell_range(rect)
+        cells = self.cells
+        for cell_x in range(x0, x1 + 1):
+            for cell_y in range(y0, y1 + 1):
+                objs = cells.get((cell_x, cell_y))
+                if objs:
+                    found.update(objs)
+        entries = self._entries
+        return {obj for obj in found if _overlaps(entries[obj][0], rect)}
+
+    def query_radius(self, x, y, radius):
+        """中心(x, y)・半径radiusの円と重なるオブジェクトの集合を取得"""
+        size = int(radius * 2) + 1
+        candidates = self.query_rect(pygame.Rect(int(x - radius), int(y - radius), size, size))
+        entries = self._entries
+        radius_sq = radius * radius
+        found = set()
+        for obj in candidates:
+            rect = entries[obj][0]
+            # 矩形内で円の中心に最も近い点までの距離で判定
+            nearest_x = min(max(x, rect.left), rect.right)
+            nearest_y = min(max(y, rect.top), rect.bottom)
+            dx = x - nearest_x
+            dy = y - nearest_y
+            if dx * dx + dy * dy <= radius_sq:
+                found.add(obj)
+        return found
+
+    def _add_to_cells(self, obj, cell_range):
+        x0, y0, x1, y1 = cell_range
+        cells = self.cells
+        for cell_x in range(x0, x1 + 1):
+            for cell_y in range(y0, y1 + 1):
+                objs = cells.get((cell_x, cell_y))
+                if objs is None:
+                    cells[(cell_x, cell_y)] = {obj}
+                else:
+                    objs.add(obj)
+
+    def _remove_from_cells(self, obj, cell_range):
+        x0, y0, x1, y1 = cell_range
+        cells = self.cells
+        for cell_x in range(x0, x1 + 1):
+            for cell_y in range(y0, y1 + 1):
+                objs = cells.get((cell_x, cell_y))
+                if objs is not None:
+                    objs.discard(obj)
+                    if not objs:
+                        del cells[(cell_x, cell_y)]
+
+
+def _overlaps(rect, other):
+    """矩形の重なり判定（colliderectは幅や高さが0の矩形を常に重ならないとするため、1ピクセルとして扱う）"""
+    if rect.width and rect.height:
+        return rect.colliderect(other)
+    return pygame.Rect(rect.x, rect.y, max(rect.width, 1), max(rect.height, 1)).colliderect(other)
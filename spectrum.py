@@ -0,0 +1,173 @@
+"""
+スペクトル解析 - 音楽を一度だけデコードしてフレームごとの帯域エネルギーを事前計算する
+
+結果は音声ファイルのハッシュをキーにした .npy ファイルとして保存し、
+再生時はメモリマップした配列から現在の再生位置の行を参照するだけにする。
+"""
+import hashlib
+import os
+import threading
+
+import numpy as np
+import pygame
+
+SPECTRUM_VERSION = 2
+
+
+class Spectrum:
+    """事前計算済みの帯域エネルギー（行: 解析フレーム, 列: 帯域, 値: 0.0〜1.0）"""
+
+    def __init__(self, bands, frame_rate):
+        self.bands = bands
+        self.frame_rate = frame_rate
+
+    def __len__(self):
+        return len(self.bands)
+
+    @property
+    def n_bands(self):
+        return self.bands.shape[1]
+
+    def bands_at(self, ms):
+        """再生位置（ミリ秒）の帯域エネルギーを取得（配列のビュー）"""
+        index = int(ms * self.frame_rate / 1000.0)
+        if index < 0:
+            index = 0
+        elif index >= len(self.bands):
+            index = len(self.bands) - 1
+        return self.bands[index]
+
+
+class SpectrumAnalyzer:
+    """音楽ファイルを対数間隔の帯域エネルギーに変換し、ディスクにキャッシュするクラス
+
+    曲全体の最大値を1.0、そこからdynamic_range_db下を0.0としたデシベル値に正規化する。
+    （帯域ごとに正規化すると、ほぼ無音の帯域までノイズで振り切れてしまうため）
+    """
+
+    def __init__(self, n_bands=32, frame_rate=60, fft_size=2048, min_freq=40.0, max_freq=16000.0,
+                 dynamic_range_db=60.0, cache_dir=".beani_cache", chunk_frames=256):
+        """
+        Args:
+            n_bands: 帯域数（8〜64程度）
+            frame_rate: 1秒あたりの解析フレーム数
+            fft_size: FFTの窓の長さ（サンプル数）
+            min_freq, max_freq: 帯域の下限・上限の周波数
+            dynamic_range_db: 正規化するダイナミックレンジ
+            cache_dir: キャッシュディレクトリ（Noneでキャッシュしない）
+            chunk_frames: 一度にFFTする解析フレーム数（メモリ使用量の上限）
+        """
+        self.n_bands = n_bands
+        self.frame_rate = frame_rate
+        self.fft_size = fft_size
+        self.min_freq = min_freq
+        self.max_freq = max_freq
+        self.dynamic_range_db = dynamic_range_db
+        self.cache_dir = cache_dir
+        self.chunk_frames = chunk_frames
+
+    def analyze(self, music_file):
+        """音楽ファイルを解析（キャッシュがあればメモリマップで読み込むだけ）
+
+        Returns:
+            Spectrum: 解析結果（デコードできない場合はNone）
+        """
+        cache_path = None
+        if self.cache_dir is not None:
+            cache_path = self._cache_path(music_file)
+            if os.path.exists(cache_path):
+                try:
+                    return Spectrum(np.load(cache_path, mmap_mode="r"), self.frame_rate)
+                except (OSError, ValueError):
+                    print(f"Spectrum cache is broken, re-analyzing: {cache_path}")
+
+        try:
+            samples, sample_rate = self._decode(music_file)
+        except pygame.error as e:
+            print(f"Spectrum analysis failed: {music_file} ({e})")
+            return None
+
+        if cache_path is None:
+            bands = self._compute(samples, sample_rate, np.empty)
+            return Spectrum(bands, self.frame_rate)
+
+        os.makedirs(self.cache_dir, exist_ok=True)
+        tmp_path = f"{cache_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+
+        def allocate(shape, dtype):
+            return np.lib.format.open_memmap(tmp_path, mode="w+", dtype=dtype, shape=shape)
+
+        bands = self._compute(samples, sample_rate, allocate)
+        bands.flush()
+        del bands
+        os.replace(tmp_path, cache_path)
+        print(f"Spectrum analyzed: {music_file} -> {cache_path}")
+        return Spectrum(np.load(cache_path, mmap_mode="r"), self.frame_rate)
+
+    def _cache_path(self, music_file):
+        """音声データと解析パラメータのハッシュからキャッシュファイルのパスを作成"""
+        digest = hashlib.sha1()
+        with open(music_file, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                digest.update(block)
+        params = (SPECTRUM_VERSION, self.n_bands, self.frame_rate, self.fft_size,
+                  self.min_freq, self.max_freq, self.dynamic_range_db)
+        digest.update(repr(params).encode())
+        return os.path.join(self.cache_dir, f"spectrum_{digest.hexdigest()[:24]}.npy")
+
+    def _decode(self, music_file):
+        """音楽ファイルをモノラルのfloat32配列にデコード"""
+        if pygame.mixer.get_init() is None:
+            pygame.mixer.init()
+        sample_rate, _, channels = pygame.mixer.get_init()
+        samples = pygame.sndarray.array(pygame.mixer.Sound(music_file))
+        if channels > 1:
+            samples = samples.mean(axis=1, dtype=np.float32)
+        return samples.astype(np.float32), sample_rate
+
+    def _band_weights(self, sample_rate):
+        """FFTの周波数ビン -> 帯域の平均を取る重み行列 (ビン数, 帯域数) を作成"""
+        freqs = np.fft.rfftfreq(self.fft_size, 1.0 / sample_rate)
+        max_freq = min(self.max_freq, sample_rate / 2)
+        edges = np.geomspace(self.min_freq, max_freq, self.n_bands + 1)
+        band_of_bin = np.searchsorted(edges, freqs, side="right") - 1
+
+        weights = np.zeros((len(freqs), self.n_bands), dtype=np.float32)
+        for band in range(self.n_bands):
+            bins = np.flatnonzero(band_of_bin == band)
+            if not len(bins):
+                # 低域の狭い帯域にビンがない場合は中心に最も近いビンを使う
+                center = np.sqrt(edges[band] * edges[band + 1])
+                bins = [int(np.argmin(np.abs(freqs - center)))]
+            weights[bins, band] = 1.0 / len(bins)
+        return weights
+
+    def _compute(self, samples, sample_rate, allocate):
+        """帯域エネルギーを計算してallocate(shape, dtype)で確保した配列に書き込む"""
+        hop = sample_rate / self.frame_rate
+        n_frames = max(1, int(len(samples) / hop))
+        fft_size = self.fft_size
+
+        # 各解析フレームの窓の中心が再生位置に来るように前後を0で埋める
+        padded = np.zeros(len(samples) + fft_size * 2, dtype=np.float32)
+        padded[fft_size // 2:fft_size // 2 + len(samples)] = samples
+        window = np.hanning(fft_size).astype(np.float32)
+        weights = self._band_weights(sample_rate)
+        offsets = np.arange(fft_size)
+
+        bands = allocate((n_frames, self.n_bands), np.float32)
+        for start in range(0, n_frames, self.chunk_frames):
+            stop = min(start + self.chunk_frames, n_frames)
+            positions = (np.arange(start, stop) * hop).astype(np.int64)
+            frames = padded[positions[:, None] + offsets] * window
+            power = np.abs(np.fft.rfft(frames, axis=1)) ** 2
+            bands[start:stop] = 10.0 * np.log10(power @ weights + 1e-10)
+
+        # 曲全体の最大値からdynamic_range_dbの範囲を0.0〜1.0に正規化
+        top = float(bands.max())
+        for start in range(0, n_frames, self.chunk_frames):
+            chunk = bands[start:start + self.chunk_frames]
+            chunk -= top - self.dynamic_range_db
+            chunk /= self.dynamic_range_db
+            np.clip(chunk, 0.0, 1.0, out=chunk)
+        return bands
@@ -0,0 +1,49 @@
+"""
+音楽のスペクトルに合わせて伸び縮みする棒グラフ
+"""
+import numpy as np
+import pygame
+from drawable import Drawable
+
+
+class SpectrumBars(Drawable):
+    """帯域エネルギーを棒グラフで表示するオブジェクト（Movieのspectrum_bandsを有効にして使う）"""
+    __slots__ = ('width', 'height', 'color', 'bar_gap', 'decay', 'levels')
+
+    def __init__(self, x, y, width=400, height=150, color=(0, 200, 255), bar_gap=2, decay=0.85, priority=0):
+        """
+        Args:
+            x, y: 棒グラフの左下の座標
+            width, height: 棒グラフ全体の大きさ
+            bar_gap: 棒の間隔
+            decay: 1フレームあたりの減衰率（音が小さくなったときに棒がゆっくり下がる）
+        """
+        super().__init__(x, y, priority)
+        self.width = width
+        self.height = height
+        self.color = color
+        self.bar_gap = bar_gap
+        self.decay = decay
+        self.levels = None
+
+    def on_spectrum(self, bands):
+        """帯域エネルギーを受け取り、減衰させた前回の値との大きい方を表示する"""
+        if self.levels is None or len(self.levels) != len(bands):
+            self.levels = np.zeros(len(bands), dtype=np.float32)
+        self.levels *= self.decay
+        np.maximum(self.levels, bands, out=self.levels)
+
+    def draw(self, screen):
+        """棒グラフを描画"""
+        if self.levels is None:
+            return
+        count = len(self.levels)
+        bar_width = max(1, self.width // count - self.bar_gap)
+        step = self.width / count
+        heights = (self.levels * self.height).astype(np.int32).tolist()
+        left = int(self.x)
+        bottom = int(self.y)
+        for i, bar_height in enumerate(heights):
+            if bar_height > 0:
+                pygame.draw.rect(screen, self.color,
+                                 (left + int(i * step), bottom - bar_height, bar_width, bar_height))
@@ -0,0 +1,327 @@
+"""
+デコード済みサーフェスのディスクキャッシュ
+
+PNGをデコード・スケールした結果を生ピクセル＋小さなヘッダとして保存し、
+次回起動時はmmapしたバッファから pygame.image.frombuffer で直接Surfaceを作る。
+ディスプレイが存在する場合は、さらにディスプレイのピクセルフォーマットに変換してから返す。
+"""
+import hashlib
+import mmap
+import os
+import struct
+import threading
+import weakref
+
+import numpy as np
+import pygame
+
+CACHE_MAGIC = b"BNSC"
+CACHE_VERSION = 1
+
+# magic, version, width, height, pixel format, source mtime(ns), source size, scale
+HEADER = struct.Struct("<4sHII8sqqd")
+# ピクセルデータの先頭を64バイト境界に揃える
+HEADER_SIZE = 64
+
+# 完全に透明か不透明かの2値のアルファを持つ画像に使うカラーキーの候補（画像内で使われていない色を選ぶ）
+COLORKEY_CANDIDATES = ((255, 0, 255), (0, 255, 255), (1, 2, 3), (254, 1, 253))
+
+
+class SurfaceCache:
+    """デコード・スケール済みサーフェスをディスクに保存し、mmapで再利用するクラス
+
+    同じ(パス, スケール)の組み合わせには同じSurfaceを返すため、
+    返されたSurfaceに直接描画してはいけない。
+
+    normalize=Trueの場合はディスプレイのフォーマットに変換し、blit時の毎回のフォーマット変換を避ける。
+    - 全ピクセルが不透明な画像: convert()（アルファなし）
+    - アルファが0か255だけの画像: convert()＋カラーキー（RLEACCEL）
+    - 半透明を含む画像: convert_alpha()（premultiplied=Trueの場合は乗算済みアルファに変換）
+    ディスプレイ作成前に読み込んだ画像は変換できないため、警告を表示して保持しない（ディスプレイ作成後に読み込み直す）。
+    """
+
+    def __init__(self, cache_dir=".beani_cache", enabled=True, normalize=True, premultiplied=False):
+        """
+        Args:
+            cache_dir: キャッシュディレクトリ
+            enabled: ディスクキャッシュを使うかどうか
+            normalize: ディスプレイのピクセルフォーマットに変換するかどうか
+            premultiplied: 半透明の画像を乗算済みアルファにするかどうか（blit_flags()のフラグで描画する）
+        """
+        self.cache_dir = cache_dir
+        self.enabled = enabled
+        self.normalize = normalize
+        self.premultiplied = premultiplied
+
+        # (絶対パス, スケール) -> Surface
+        self._surfaces = {}
+        # 乗算済みアルファに変換したSurface（blit_flagsでBLEND_PREMULTIPLIEDを返す対象）
+        self._premultiplied = weakref.WeakSet()
+        self._warned_no_display = False
+        # frombufferで作ったSurfaceが参照するmmapを保持
+        self._maps = {}
+
+        # 統計情報
+        self.hits = 0
+        self.misses = 0
+
+    def load(self, path, scale=1.0):
+        """画像を読み込み、スケール済みのSurfaceを返す
+
+        Args:
+            path: 画像ファイルのパス
+            scale: 画像のスケール
+
+        Returns:
+            pygame.Surface: 読み込んだ画像
+        """
+        key = (os.path.abspath(path), float(scale))
+        surface = self._surfaces.get(key)
+        if surface is not None:
+            return surface
+
+        stat = os.stat(path)
+        pixel_format = self._pixel_format()
+        blob_path = self._blob_path(key, pixel_format)
+
+        surface = None
+        if self.enabled:
+            surface = self._read_blob(blob_path, stat, key[1], pixel_format)
+
+        if surface is None:
+            self.misses += 1
+            surface = self._decode(path, key[1])
+            if self.enabled:
+                self._write_blob(blob_path, surface, stat, key[1], pixel_format)
+        else:
+            self.hits += 1
+
+        if self.normalize:
+            if not _display_ready():
+                # 未変換のSurfaceは毎回のblitでフォーマット変換されるため、保持せずにディスプレイ作成後の読み込みで変換する
+                if not self._warned_no_display:
+                    self._warned_no_display = True
+                    print(f"WARNING: Image loaded before the display was created is not normalized: {path} "
+                          f"(create the Movie before loading images)")
+                return surface
+            surface = self._normalize(surface)
+            # 変換後はmmapしたピクセルを参照しないため解放
+            self._release_map(blob_path)
+
+        self._surfaces[key] = surface
+        return surface
+
+    def decode(self, path, scale=1.0):
+        """メモリに保持せずに画像を読み込む（連番画像のストリーミング用）
+
+        ディスクキャッシュは使うが、返すSurfaceはmmapを参照しない独立したコピーで、
+        呼び出し側が参照を手放せば解放される。別スレッドから呼んでもよい。
+        """
+        key = (os.path.abspath(path), float(scale))
+        stat = os.stat(path)
+        pixel_format = self._pixel_format()
+        blob_path = self._blob_path(key, pixel_format)
+
+        surface = None
+        if self.enabled:
+            surface = self._read_blob(blob_path, stat, key[1], pixel_format, keep_map=False)
+        if surface is None:
+            surface = self._decode(path, key[1])
+            if self.enabled:
+                self._write_blob(blob_path, surface, stat, key[1], pixel_format)
+
+        if self.normalize and _display_ready():
+            surface = self._normalize(surface)
+        return surface
+
+    def blit_flags(self, surface):
+        """Surfaceをblitするときのspecial_flags（このキャッシュが乗算済みアルファに変換した画像はBLEND_PREMULTIPLIED）"""
+        if surface in self._premultiplied:
+            return pygame.BLEND_PREMULTIPLIED
+        return 0
+
+    def _normalize(self, surface):
+        """ディスプレイのピクセルフォーマットに変換（アルファの使われ方に応じて変換方法を選ぶ）"""
+        if not surface.get_flags() & pygame.SRCALPHA and surface.get_colorkey() is None:
+            return surface.convert()
+
+        alpha = pygame.surfarray.array_alpha(surface)
+        if alpha.min() == 255:
+            # 全ピクセルが不透明ならアルファを捨てる
+            return surface.convert()
+
+        if np.all((alpha == 0) | (alpha == 255)):
+            colorkey = self._find_colorkey(surface, alpha)
+            if colorkey is not None:
+                opaque = surface.convert()
+                pixels = pygame.surfarray.pixels3d(opaque)
+                pixels[alpha == 0] = colorkey
+                del pixels  # Surfaceのロックを解除
+                # 透明部分をランレングス圧縮してblitを高速化
+                opaque.set_colorkey(colorkey, pygame.RLEACCEL)
+                return opaque
+
+        converted = surface.convert_alpha()
+        if self.premultiplied:
+            converted = converted.premul_alpha()
+            self._premultiplied.add(converted)
+        return converted
+
+    def _find_colorkey(self, surface, alpha):
+        """不透明部分で使われていないカラーキーを探す（見つからない場合はNone）"""
+        rgb = pygame.surfarray.array3d(surface)[alpha == 255]
+        for candidate in COLORKEY_CANDIDATES:
+            if not np.any(np.all(rgb == candidate, axis=1)):
+                return candidate
+        return None
+
+    def _release_map(self, blob_path):
+        mapped = self._maps.pop(blob_path, None)
+        if mapped is not None:
+            try:
+                mapped.close()
+            except BufferError:
+                # まだSurfaceから参照されている場合はGCに任せる
+                pass
+
+    def items(self):
+        """読み込み済みの((絶対パス, スケール), Surface)のリストを取得"""
+        return list(self._surfaces.items())
+
+    def clear_memory(self):
+        """メモリ上のSurfaceとmmapを解放"""
+        self._surfaces.clear()
+        for mapped in self._maps.values():
+            try:
+                mapped.close()
+            except BufferError:
+                # まだSurfaceから参照されている場合はGCに任せる
+                pass
+        self._maps.clear()
+
+    def _decode(self, path, scale):
+        """PNGをデコードしてスケール"""
+        image = pygame.image.load(path)
+        if scale != 1.0:
+            image = pygame.transform.scale(
+                image,
+                (int(image.get_width() * scale),
+                 int(image.get_height() * scale))
+            )
+        return image
+
+    def _pixel_format(self):
+        """保存するピクセルフォーマットを決定
+
+        ディスプレイが存在する場合はそのバイト順に合わせ、
+        blit時のフォーマット変換を避ける。
+        """
+        display = pygame.display.get_surface() if pygame.display.get_init() else None
+        if display is not None and display.get_bitsize() == 32 and display.get_masks()[0] == 0xff0000:
+            return "BGRA"
+        return "RGBA"
+
+    def _blob_path(self, key, pixel_format):
+        """キャッシュファイルのパスを取得"""
+        digest = hashlib.sha1(f"{key[0]}|{key[1]!r}|{pixel_format}".encode("utf-8")).hexdigest()
+        return os.path.join(self.cache_dir, digest + ".surf")
+
+    def _read_blob(self, blob_path, stat, scale, pixel_format, keep_map=True):
+        """キャッシュファイルをmmapしてSurfaceを作成
+
+        Args:
+            keep_map: Falseの場合はmmapから切り離したコピーを返し、mmapはすぐに閉じる
+
+        Returns:
+            pygame.Surface: キャッシュが有効な場合はSurface、無効な場合はNone
+        """
+        try:
+            with open(blob_path, "rb") as f:
+                mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_COPY)
+        except (OSError, ValueError):
+            return None
+
+        if len(mapped) < HEADER_SIZE:
+            mapped.close()
+            return None
+
+        magic, version, width, height, fmt, mtime_ns, size, cached_scale = HEADER.unpack_from(mapped, 0)
+        fmt = fmt.rstrip(b"\0").decode("ascii", "replace")
+        valid = (
+            magic == CACHE_MAGIC
+            and version == CACHE_VERSION
+            and fmt == pixel_format
+            and mtime_ns == stat.st_mtime_ns
+            and size == stat.st_size
+            and cached_scale == scale
+            and len(mapped) == HEADER_SIZE + width * height * 4
+        )
+        if not valid:
+            mapped.close()
+            return None
+
+        pixels = memoryview(mapped)[HEADER_SIZE:]
+        surface = pygame.image.frombuffer(pixels, (width, height), pixel_format)
+        if not keep_map:
+            surface = surface.copy()
+            del pixels
+            mapped.close()
+            return surface
+        self._maps[blob_path] = mapped
+        return surface
+
+    def _write_blob(self, blob_path, surface, stat, scale, pixel_format):
+        """Surfaceの生ピクセルをキャッシュファイルに書き込み"""
+        width, height = surface.get_size()
+        header = HEADER.pack(
+            CACHE_MAGIC, CACHE_VERSION, width, height,
+            pixel_format.encode("ascii"), stat.st_mtime_ns, stat.st_size, scale
+        )
+        # バックグラウンドでの事前読み込みと同時に書き込んでも衝突しないように一時ファイル名を分ける
+        tmp_path = f"{blob_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            with open(tmp_path, "wb") as f:
+                f.write(header.ljust(HEADER_SIZE, b"\0"))
+                f.write(pygame.image.tobytes(surface, pixel_format))
+            os.replace(tmp_path, blob_path)
+        except OSError as e:
+            # キャッシュは補助的なものなので失敗しても続行
+            print(f"Surface cache write failed: {blob_path} ({e})")
+
+
+# Resourcesが作成したキャッシュを各Drawableから共有する
+_default_cache = None
+
+
+def set_default_cache(cache):
+    """既定のSurfaceCacheを設定"""
+    global _default_cache
+    _default_cache = cache
+
+
+def get_default_cache():
+    """既定のSurfaceCacheを取得（未設定の場合は作成）"""
+    global _default_cache
+    if _default_cache is None:
+        _default_cache = SurfaceCache()
+    return _default_cache
+
+
+def load_image(path, scale=1.0):
+    """既定のキャッシュを使って画像を読み込み"""
+    return get_default_cache().load(path, scale)
+
+
+def decode_image(path, scale=1.0):
+    """既定のキャッシュの設定で、メモリに保持せずに画像を読み込み"""
+    return get_default_cache().decode(path, scale)
+
+
+def blit_flags(surface):
+    """既定のキャッシュの設定でSurfaceをblitするときのspecial_flags"""
+    return get_default_cache().blit_flags(surface)
+
+
+def _display_ready():
+    return pygame.display.get_init() and pygame.display.get_surface() is not None
@@ -0,0 +1,59 @@
+"""
+ComponentStoreの行の詰め込み（末尾との入れ替えによる削除・容量の拡張）のテスト
+"""
+import numpy as np
+
+from component_store import ComponentStore, velocity_system
+
+
+def _check_invariants(store, expected):
+    """全てのエンティティIDが自分の行を指し、行が先頭count件に詰まっていることを確認"""
+    assert len(store) == len(expected)
+    rows = sorted(store.row(entity) for entity in expected)
+    assert rows == list(range(len(expected)))
+    for entity, x in expected.items():
+        assert store.x[store.row(entity)] == x
+
+
+def test_add_uses_defaults():
+    store = ComponentStore()
+    entity = store.add(x=3.0)
+    row = store.row(entity)
+    assert store.scale[row] == 1.0
+    assert tuple(store.color[row]) == (255, 255, 255)
+    assert store.y[row] == 0.0
+
+
+def test_swap_remove_keeps_rows_packed():
+    store = ComponentStore(capacity=4)
+    expected = {store.add(x=float(i), y=float(i)): float(i) for i in range(10)}
+    assert store.capacity >= 10
+
+    for entity in (0, 9, 4, 5):
+        store.remove(entity)
+        del expected[entity]
+        _check_invariants(store, expected)
+
+    entity = store.add(x=42.0)
+    expected[entity] = 42.0
+    _check_invariants(store, expected)
+
+
+def test_remove_last_row():
+    store = ComponentStore()
+    first = store.add(x=1.0)
+    last = store.add(x=2.0)
+    store.remove(last)
+    _check_invariants(store, {first: 1.0})
+
+
+def test_added_column_and_system():
+    store = ComponentStore()
+    store.add_column("vx", np.float32)
+    store.add_column("vy", np.float32)
+    a = store.add(x=1.0, y=2.0, vx=0.5, vy=-1.0)
+    b = store.add(x=10.0, vx=1.0)
+    velocity_system(store)
+    assert (store.x[store.row(a)], store.y[store.row(a)]) == (1.5, 1.0)
+    assert store.x[store.row(b)] == 11.0
+    assert len(store.view("x")) == 2
@@ -0,0 +1,55 @@
+"""
+セッショントレースの書き込み（SessionRecorder）と読み込み（read_trace）の往復のテスト
+"""
+from types import SimpleNamespace
+
+import pytest
+
+from profiler import FrameProfiler
+from session_trace import CLOCK_BUSY, CLOCK_POS, CLOCK_TICKS, SessionRecorder, read_trace
+from time_source import ManualClock
+
+
+def _record(path, frames):
+    profiler = FrameProfiler()
+    movie = SimpleNamespace(fps=30, bpm=128.5, profiler=profiler)
+    recorder = SessionRecorder(str(path))
+    clock = recorder.wrap_time_source(ManualClock(music_length_ms=10_000))
+    recorder.attach(movie)
+    clock.music_play()
+    for frame in range(frames):
+        clock.get_ticks()
+        clock.music_get_busy()
+        clock.music_get_pos()
+        if frame == 1:
+            recorder.record_key(32)
+        if frame % 2 == 0:
+            recorder.record_beat(frame // 2, 1)
+        profiler.record("update", 1.0 + frame)
+        profiler.record("draw", 2.0)
+        profiler.record("flip", 0.5)
+        clock.tick(movie.fps)
+    recorder.close()
+
+
+def test_round_trip(tmp_path):
+    path = tmp_path / "session.bntr"
+    _record(path, 4)
+
+    fps, bpm, frames = read_trace(str(path))
+    assert (fps, bpm) == (30, 128.5)
+    assert len(frames) == 4
+    assert [frame.clock[CLOCK_TICKS] for frame in frames] == [[0.0], [33.0], [66.0], [100.0]]
+    assert [frame.clock[CLOCK_BUSY] for frame in frames] == [[1.0]] * 4
+    assert frames[2].clock[CLOCK_POS] == [66.0]
+    assert [frame.keys for frame in frames] == [[], [32], [], []]
+    assert [frame.beats for frame in frames] == [[(0, 1)], [], [(1, 1)], []]
+    assert [frame.update_ms for frame in frames] == [1.0, 2.0, 3.0, 4.0]
+    assert frames[3].work_ms == pytest.approx(4.0 + 2.0 + 0.5)
+
+
+def test_rejects_other_files(tmp_path):
+    path = tmp_path / "not_a_trace.bntr"
+    path.write_bytes(b"PNG?" + bytes(16))
+    with pytest.raises(ValueError):
+        read_trace(str(path))
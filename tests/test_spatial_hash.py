@@ -0,0 +1,66 @@
+"""
+SpatialHashの登録・移動・検索のテスト
+"""
+import pygame
+
+from spatial_hash import SpatialHash
+
+
+def _brute_force(rects, query):
+    found = set()
+    for name, rect in rects.items():
+        if rect.width and rect.height:
+            if rect.colliderect(query):
+                found.add(name)
+        elif pygame.Rect(rect.x, rect.y, max(rect.width, 1), max(rect.height, 1)).colliderect(query):
+            found.add(name)
+    return found
+
+
+def test_query_rect_matches_brute_force():
+    index = SpatialHash(cell_size=32)
+    rects = {}
+    for i in range(40):
+        rect = pygame.Rect((i * 37) % 300 - 20, (i * 53) % 250 - 20, 5 + (i * 7) % 60, 5 + (i * 11) % 45)
+        rects[i] = rect
+        index.insert(i, rect)
+    for query in (pygame.Rect(0, 0, 100, 100), pygame.Rect(150, 40, 10, 200), pygame.Rect(-50, -50, 20, 20)):
+        assert index.query_rect(query) == _brute_force(rects, query)
+
+
+def test_update_moves_between_cells():
+    index = SpatialHash(cell_size=32)
+    rect = pygame.Rect(0, 0, 10, 10)
+    index.insert("a", rect)
+    index.update("a", pygame.Rect(200, 200, 10, 10))
+    assert index.query_rect(pygame.Rect(0, 0, 50, 50)) == set()
+    assert index.query_rect(pygame.Rect(190, 190, 30, 30)) == {"a"}
+    # 古いセルに登録が残っていない
+    assert (0, 0) not in index.cells
+
+
+def test_remove_clears_cells():
+    index = SpatialHash(cell_size=16)
+    index.insert("a", pygame.Rect(0, 0, 40, 40))
+    index.remove("a")
+    assert "a" not in index
+    assert len(index) == 0
+    assert index.cells == {}
+
+
+def test_zero_size_rect_is_found():
+    index = SpatialHash(cell_size=32)
+    index.insert("point", pygame.Rect(40, 40, 0, 0))
+    index.insert("line", pygame.Rect(64, 10, 0, 30))
+    assert index.query_rect(pygame.Rect(0, 0, 100, 100)) == {"point", "line"}
+    assert index.query_rect(pygame.Rect(0, 0, 20, 20)) == set()
+    index.update("point", pygame.Rect(5, 5, 0, 0))
+    assert index.query_rect(pygame.Rect(0, 0, 20, 20)) == {"point"}
+
+
+def test_query_radius():
+    index = SpatialHash(cell_size=32)
+    index.insert("near", pygame.Rect(10, 10, 4, 4))
+    index.insert("corner", pygame.Rect(20, 20, 4, 4))
+    assert index.query_radius(0, 0, 15) == {"near"}
+    assert index.query_radius(0, 0, 30) == {"near", "corner"}
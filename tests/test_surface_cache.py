@@ -0,0 +1,81 @@
+"""
+SurfaceCacheのディスクキャッシュ（ブロブの書き込み・読み込み・無効化）のテスト
+"""
+import os
+
+import pygame
+import pytest
+
+from surface_cache import HEADER_SIZE, SurfaceCache
+
+
+@pytest.fixture
+def image_path(tmp_path):
+    surface = pygame.Surface((6, 4), pygame.SRCALPHA)
+    for x in range(6):
+        for y in range(4):
+            surface.set_at((x, y), (x * 40, y * 60, 200, 255 - x * 30))
+    path = tmp_path / "image.png"
+    pygame.image.save(surface, str(path))
+    return str(path)
+
+
+def _pixels(surface):
+    return [tuple(surface.get_at((x, y))) for y in range(surface.get_height()) for x in range(surface.get_width())]
+
+
+def test_blob_round_trip(tmp_path, image_path):
+    cache_dir = str(tmp_path / "cache")
+    first = SurfaceCache(cache_dir, normalize=False)
+    decoded = first.load(image_path)
+    assert (first.hits, first.misses) == (0, 1)
+    blobs = os.listdir(cache_dir)
+    assert len(blobs) == 1
+    assert os.path.getsize(os.path.join(cache_dir, blobs[0])) == HEADER_SIZE + 6 * 4 * 4
+
+    second = SurfaceCache(cache_dir, normalize=False)
+    cached = second.load(image_path)
+    assert (second.hits, second.misses) == (1, 0)
+    assert cached.get_size() == (6, 4)
+    assert _pixels(cached) == _pixels(decoded)
+    second.clear_memory()
+
+
+def test_same_key_returns_same_surface(tmp_path, image_path):
+    cache = SurfaceCache(str(tmp_path / "cache"), normalize=False)
+    assert cache.load(image_path) is cache.load(image_path)
+    assert cache.load(image_path, 0.5).get_size() == (3, 2)
+    cache.clear_memory()
+
+
+def test_blob_invalidated_when_source_changes(tmp_path, image_path):
+    cache_dir = str(tmp_path / "cache")
+    SurfaceCache(cache_dir, normalize=False).load(image_path)
+
+    stat = os.stat(image_path)
+    os.utime(image_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+    cache = SurfaceCache(cache_dir, normalize=False)
+    cache.load(image_path)
+    assert (cache.hits, cache.misses) == (0, 1)
+
+
+def test_corrupt_blob_is_ignored(tmp_path, image_path):
+    cache_dir = str(tmp_path / "cache")
+    SurfaceCache(cache_dir, normalize=False).load(image_path)
+    blob = os.path.join(cache_dir, os.listdir(cache_dir)[0])
+    with open(blob, "r+b") as f:
+        f.write(b"XXXX")
+
+    cache = SurfaceCache(cache_dir, normalize=False)
+    surface = cache.load(image_path)
+    assert (cache.hits, cache.misses) == (0, 1)
+    assert surface.get_size() == (6, 4)
+
+
+def test_decode_does_not_keep_surfaces(tmp_path, image_path):
+    cache = SurfaceCache(str(tmp_path / "cache"), normalize=False)
+    first = cache.decode(image_path)
+    second = cache.decode(image_path)
+    assert first is not second
+    assert _pixels(first) == _pixels(second)
+    assert cache.items() == []
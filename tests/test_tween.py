@@ -0,0 +1,79 @@
+"""
+TweenEngineの進行・置き換え・削除（cancel）のテスト
+"""
+from types import SimpleNamespace
+
+import pytest
+
+from tween import TweenEngine
+
+
+def test_linear_and_easing_values():
+    engine = TweenEngine()
+    obj = SimpleNamespace()
+    engine.tween(obj, "x", 0.0, 100.0, duration_ms=100)
+    engine.tween(obj, "y", 0.0, 100.0, duration_ms=100, easing="ease_in")
+    assert (obj.x, obj.y) == (0.0, 0.0)
+    engine.step(50)
+    assert obj.x == pytest.approx(50.0)
+    assert obj.y == pytest.approx(25.0)
+    engine.step(200)
+    assert (obj.x, obj.y) == (100.0, 100.0)
+    assert len(engine) == 0
+
+
+def test_beats_and_int_tuples():
+    engine = TweenEngine(beat_interval_ms=400.0)
+    obj = SimpleNamespace()
+    engine.tween(obj, "color", (0, 0, 0), (255, 100, 10), beats=0.5, as_int=True)
+    engine.step(100)
+    assert obj.color == (128, 50, 5)
+    engine.step(200)
+    assert obj.color == (255, 100, 10)
+
+
+def test_new_tween_replaces_same_attribute():
+    engine = TweenEngine()
+    obj = SimpleNamespace()
+    engine.tween(obj, "x", 0.0, 10.0, duration_ms=100)
+    engine.step(50)
+    engine.tween(obj, "x", 100.0, 200.0, duration_ms=100)
+    assert len(engine) == 1
+    engine.step(100)
+    assert obj.x == pytest.approx(150.0)
+
+
+def test_on_complete_and_after():
+    engine = TweenEngine()
+    obj = SimpleNamespace()
+    calls = []
+    engine.tween(obj, "x", 0.0, 1.0, duration_ms=100, on_complete=lambda: calls.append("tween"))
+    engine.after(obj, lambda: calls.append("timer"), duration_ms=300)
+    assert engine.is_active(obj, "x") and engine.is_active(obj)
+    engine.step(150)
+    assert calls == ["tween"]
+    engine.step(300)
+    assert calls == ["tween", "timer"]
+    assert len(engine) == 0
+
+
+def test_cancel_keeps_other_rows():
+    engine = TweenEngine(capacity=2)
+    objs = [SimpleNamespace() for _ in range(5)]
+    calls = []
+    for index, obj in enumerate(objs):
+        engine.tween(obj, "x", 0.0, float(index), duration_ms=100,
+                     on_complete=lambda index=index: calls.append(index))
+        engine.tween(obj, "y", 0.0, 1.0, duration_ms=100)
+
+    engine.cancel(objs[1])
+    engine.cancel(objs[3], "x")
+    assert len(engine) == 7
+    assert not engine.is_active(objs[1], "x") and not engine.is_active(objs[1], "y")
+    assert engine.is_active(objs[3], "y")
+
+    engine.step(100)
+    assert sorted(calls) == [0, 2, 4]
+    assert [obj.x for obj in objs] == [0.0, 0.0, 2.0, 0.0, 4.0]
+    assert objs[3].y == 1.0
+    assert len(engine) == 0
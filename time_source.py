@@ -0,0 +1,216 @@
+"""
+時間ソース - Movie と Countdown が参照する時計と音楽再生位置を差し替え可能にする
+"""
+import pygame
+
+
+class TimeSource:
+    """時間ソースの基底クラス
+
+    経過時間（ミリ秒）、フレームの待機、音楽の再生制御と再生位置を提供する。
+    """
+    # pygame.mixer を初期化する必要があるかどうか
+    uses_audio = False
+    # キューに入れた曲が再生され始めた回数（曲の切り替え検出用）
+    music_tracks_started = 0
+
+    def get_ticks(self):
+        """経過時間を取得（ミリ秒）"""
+        raise NotImplementedError
+
+    def tick(self, fps):
+        """フレームレートに合わせて待機
+
+        Returns:
+            int: 前回のtickからの経過時間（ミリ秒）
+        """
+        raise NotImplementedError
+
+    def music_load(self, music_file, length_ms=None):
+        """音楽ファイルを読み込み
+        
+        Args:
+            music_file: 音楽ファイルのパス
+            length_ms: 曲の長さ（仮想時計が曲の終わりとキューの曲への切り替えを判定するために使用）
+        """
+        pass
+
+    def music_play(self, start_ms=0):
+        """音楽を再生"""
+        raise NotImplementedError
+
+    def music_queue(self, music_file, length_ms=None):
+        """現在の曲が終わったら続けて再生する曲をキューに入れる
+        
+        キューの曲が再生され始めると再生位置は0に戻り、music_tracks_startedが増える。
+        """
+        raise NotImplementedError
+    
+    def music_stop(self):
+        """音楽を停止"""
+        raise NotImplementedError
+
+    def music_get_busy(self):
+        """音楽が再生中かどうか"""
+        raise NotImplementedError
+
+    def music_get_pos(self):
+        """音楽の再生位置を取得（ミリ秒、再生していない場合は-1）"""
+        raise NotImplementedError
+
+
+class RealtimeClock(TimeSource):
+    """実時間とpygame.mixer.musicの再生位置を使う時間ソース"""
+    uses_audio = True
+
+    def __init__(self):
+        self.clock = pygame.time.Clock()
+        self.music_offset_ms = 0  # 途中から再生した場合の開始位置
+        self.music_queued = False
+        self.last_music_pos = -1
+
+    def get_ticks(self):
+        return pygame.time.get_ticks()
+
+    def tick(self, fps):
+        return self.clock.tick(fps)
+
+    def music_load(self, music_file, length_ms=None):
+        pygame.mixer.music.load(music_file)
+
+    def music_play(self, start_ms=0):
+        self.music_offset_ms = start_ms
+        self.music_queued = False
+        self.last_music_pos = -1
+        pygame.mixer.music.play(start=start_ms / 1000.0)
+    
+    def music_queue(self, music_file, length_ms=None):
+        pygame.mixer.music.queue(music_file)
+        self.music_queued = True
+
+    def music_stop(self):
+        pygame.mixer.music.stop()
+
+    def music_get_busy(self):
+        return pygame.mixer.music.get_busy()
+
+    def music_get_pos(self):
+        music_pos = pygame.mixer.music.get_pos()
+        if music_pos == -1:
+            return -1
+        if self.music_queued and music_pos < self.last_music_pos:
+            # キューの曲に切り替わるとget_posは0から数え直される
+            self.music_queued = False
+            self.music_offset_ms = 0
+            self.music_tracks_started += 1
+        self.last_music_pos = music_pos
+        # get_posは再生開始からの時間なので開始位置を加算
+        return music_pos + self.music_offset_ms
+
+
+class VirtualClock(TimeSource):
+    """音声デバイスを使わない時間ソースの基底クラス
+
+    音楽は実際には再生せず、再生開始からの経過時間を再生位置として返す。
+    """
+
+    def __init__(self, music_length_ms=None):
+        self.music_length_ms = music_length_ms  # Noneの場合は停止するまで再生中
+        self.music_start_ticks = None
+        self.music_offset_ms = 0
+        self.queued_length_ms = None
+        self.music_queued = False
+
+    def music_play(self, start_ms=0):
+        self.music_start_ticks = self.get_ticks()
+        self.music_offset_ms = start_ms
+        self.music_queued = False
+
+    def music_load(self, music_file, length_ms=None):
+        # 長さを指定しない場合はコンストラクタのmusic_length_msのまま
+        if length_ms is not None:
+            self.music_length_ms = length_ms
+    
+    def music_queue(self, music_file, length_ms=None):
+        self.queued_length_ms = length_ms
+        self.music_queued = True
+
+    def music_stop(self):
+        self.music_start_ticks = None
+
+    def music_get_busy(self):
+        if self.music_start_ticks is None:
+            return False
+        if self.music_length_ms is not None and self._music_elapsed() >= self.music_length_ms:
+            if self.music_queued:
+                # 曲の終わりちょうどから次の曲を開始（隙間なし）
+                self.music_start_ticks += self.music_length_ms - self.music_offset_ms
+                self.music_offset_ms = 0
+                self.music_length_ms = self.queued_length_ms
+                self.music_queued = False
+                self.music_tracks_started += 1
+                return True
+            self.music_start_ticks = None
+            return False
+        return True
+
+    def music_get_pos(self):
+        if not self.music_get_busy():
+            return -1
+        return self._music_elapsed()
+
+    def _music_elapsed(self):
+        return self.get_ticks() - self.music_start_ticks + self.music_offset_ms
+
+
+class ManualClock(VirtualClock):
+    """手動で進める仮想時計
+
+    auto_step=Trueの場合はtick()ごとに1フレーム分の時間を進めるため、
+    待機なしで実時間より速くムービーを再生できる。fps=0（上限なし）のフレームはstep_msずつ進める。
+    """
+
+    def __init__(self, start_ms=0, auto_step=True, music_length_ms=None, step_ms=1000.0 / 60):
+        """
+        Args:
+            start_ms: 開始時刻
+            auto_step: tick()ごとに時間を進めるかどうか
+            music_length_ms: 曲の長さ（Noneの場合は終わらない）
+            step_ms: fps=0でtick()したときに進める時間（固定ステップの場合は1000 / sim_rateなど）
+        """
+        super().__init__(music_length_ms)
+        self.now_ms = start_ms
+        self.auto_step = auto_step
+        self.step_ms = step_ms
+
+    def get_ticks(self):
+        return int(self.now_ms)
+
+    def advance(self, ms):
+        """時間を進める"""
+        self.now_ms += ms
+
+    def tick(self, fps):
+        if not self.auto_step:
+            return 0
+        # 上限なしの場合も時間を進めないと、ムービーが同じ時刻のまま終わらない
+        frame_ms = 1000.0 / fps if fps else self.step_ms
+        self.advance(frame_ms)
+        return int(frame_ms)
+
+
+class ScaledClock(VirtualClock):
+    """実時間を指定倍率で進める仮想時計（例: scale=4.0で4倍速）"""
+
+    def __init__(self, scale=4.0, music_length_ms=None):
+        super().__init__(music_length_ms)
+        self.scale = scale
+        self.clock = pygame.time.Clock()
+        self.base_ticks = pygame.time.get_ticks()
+
+    def get_ticks(self):
+        return int((pygame.time.get_ticks() - self.base_ticks) * self.scale)
+
+    def tick(self, fps):
+        # 仮想時間1秒あたりのフレーム数を保つため、実時間ではscale倍の頻度で回す
+        return int(self.clock.tick(fps * self.scale) * self.scale)
@@ -0,0 +1,93 @@
+"""
+シーン切り替え効果 - オフスクリーンに描画した前後のシーンを合成する
+"""
+import pygame
+from drawable import Drawable
+
+
+class TransitionBuffers:
+    """切り替え効果用のオフスクリーンSurface
+
+    一度だけ確保し、切り替えのたびに再利用する。
+    """
+    def __init__(self, size):
+        self.size = size
+        # 表示フォーマットに合わせた不透明Surface（blitを高速化）
+        self.outgoing = pygame.Surface(size).convert()
+        self.incoming = pygame.Surface(size).convert()
+        self.scratch = pygame.Surface(size).convert()
+
+
+class Transition:
+    """シーン切り替え効果の基底クラス"""
+    def __init__(self, duration_beats=1, freeze_outgoing=False):
+        """
+        Args:
+            duration_beats: 切り替えにかけるビート数
+            freeze_outgoing: Trueの場合、前のシーンは切り替え開始時の1フレームを使い続ける
+        """
+        self.duration_beats = duration_beats
+        self.freeze_outgoing = freeze_outgoing
+
+    def render(self, screen, buffers, progress):
+        """前後のシーンを合成して描画
+
+        Args:
+            screen: 描画先
+            buffers: TransitionBuffers（outgoing/incomingに各シーンが描画済み）
+            progress: 切り替えの進行度（0.0〜1.0）
+        """
+        raise NotImplementedError
+
+
+class CrossfadeTransition(Transition):
+    """前のシーンから次のシーンへクロスフェード"""
+    def render(self, screen, buffers, progress):
+        screen.blit(buffers.outgoing, (0, 0))
+        buffers.incoming.set_alpha(int(255 * progress))
+        screen.blit(buffers.incoming, (0, 0))
+        buffers.incoming.set_alpha(None)
+
+
+class WipeTransition(Transition):
+    """次のシーンが画面端から拭き取るように現れる"""
+    def __init__(self, duration_beats=1, freeze_outgoing=False, direction="left"):
+        """
+        Args:
+            direction: 次のシーンが現れ始める側（"left", "right", "top", "bottom"）
+        """
+        super().__init__(duration_beats, freeze_outgoing)
+        self.direction = direction
+
+    def render(self, screen, buffers, progress):
+        width, height = buffers.size
+        if self.direction in ("left", "right"):
+            edge = int(width * progress)
+            x = 0 if self.direction == "left" else width - edge
+            area = pygame.Rect(x, 0, edge, height)
+        else:
+            edge = int(height * progress)
+            y = 0 if self.direction == "top" else height - edge
+            area = pygame.Rect(0, y, width, edge)
+        screen.blit(buffers.outgoing, (0, 0))
+        screen.blit(buffers.incoming, area.topleft, area)
+
+
+class ZoomTransition(Transition):
+    """次のシーンが画面中央から拡大しながら現れる"""
+    def __init__(self, duration_beats=1, freeze_outgoing=True, start_scale=0.1):
+        super().__init__(duration_beats, freeze_outgoing)
+        self.start_scale = start_scale
+
+    def render(self, screen, buffers, progress):
+        width, height = buffers.size
+        scale = self.start_scale + (1.0 - self.start_scale) * progress
+        size = (max(1, int(width * scale)), max(1, int(height * scale)))
+
+        screen.blit(buffers.outgoing, (0, 0))
+        # 確保済みのSurfaceの一部に縮小して新たな確保を避ける
+        target = buffers.scratch.subsurface((0, 0) + size)
+        scaler = pygame.transform.smoothscale if Drawable.smooth_scaling else pygame.transform.scale
+        scaler(buffers.incoming, size, target)
+        target.set_alpha(int(255 * progress))
+        screen.blit(target, target.get_rect(center=(width // 2, height // 2)))
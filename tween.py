@@ -0,0 +1,195 @@
+"""
+トゥイーンエンジン - 属性のアニメーション（開始値から終了値への補間）をNumPy配列でまとめて進める
+"""
+import numpy as np
+
+# イージング関数（0.0〜1.0の配列を受け取り、同じ形状の配列を返す）
+EASINGS = {
+    "linear": lambda t: t,
+    "ease_in": lambda t: t * t,
+    "ease_out": lambda t: t * (2.0 - t),
+    "ease_in_out": lambda t: t * t * (3.0 - 2.0 * t),
+    "ease_out_cubic": lambda t: 1.0 - (1.0 - t) ** 3,
+}
+EASING_NAMES = tuple(EASINGS)
+EASING_IDS = {name: index for index, name in enumerate(EASING_NAMES)}
+
+# 1つのトゥイーンで補間できる値の要素数（色のRGBAまで）
+MAX_COMPONENTS = 4
+
+
+class TweenEngine:
+    """実行中のトゥイーンを列指向の配列で保持し、1回のstepで全て進めるクラス
+
+    開始値・変化量・開始時刻・長さ・イージングを配列で保持し、進行度とイージングを一括で計算する。
+    終わったトゥイーンは末尾との入れ替えで削除するため、実行中のトゥイーンがなければstepは何もしない。
+    同じオブジェクトの同じ属性に新しいトゥイーンを開始すると、前のトゥイーンを置き換える。
+    """
+
+    def __init__(self, capacity=64, beat_interval_ms=500.0):
+        self.count = 0
+        self.capacity = capacity
+        self.beat_interval_ms = beat_interval_ms  # ビート単位の長さの換算用（Movie.set_tempoで更新）
+        self.now_ms = 0.0  # 最後にstepした時刻
+
+        self.start_values = np.zeros((capacity, MAX_COMPONENTS))
+        self.deltas = np.zeros((capacity, MAX_COMPONENTS))
+        self.start_times = np.zeros(capacity)
+        self.durations = np.ones(capacity)
+        self.easings = np.zeros(capacity, dtype=np.int8)
+
+        # 行ごとの書き込み先 (オブジェクト, 属性名, 要素数, 整数にするかどうか, 完了時の関数)
+        self._targets = []
+        self._row_of_key = {}  # (id(オブジェクト), 属性名) -> 行番号
+
+    def __len__(self):
+        return self.count
+
+    def tween(self, obj, attr, start, end, duration_ms=None, beats=None, easing="linear", as_int=False,
+              on_complete=None):
+        """トゥイーンを開始し、属性に開始値を設定
+
+        Args:
+            obj, attr: 書き込み先のオブジェクトと属性名（attrがNoneの場合は値を書き込まないタイマー）
+            start, end: 開始値と終了値（数値、または要素数4までのタプル）
+            duration_ms: 長さ（ミリ秒）
+            beats: 長さ（ビート数、duration_msの代わりに指定）
+            easing: イージングの名前（EASINGSのキー）
+            as_int: Trueの場合は値を整数に丸めて書き込む（色など）
+            on_complete: 終了時に呼ぶ関数（引数なし）
+        """
+        if duration_ms is None:
+            duration_ms = (beats or 0.0) * self.beat_interval_ms
+        start_tuple = tuple(start) if isinstance(start, (tuple, list)) else (start,)
+        end_tuple = tuple(end) if isinstance(end, (tuple, list)) else (end,)
+        size = len(start_tuple) if attr is not None else 0
+
+        key = (id(obj), attr)
+        row = self._row_of_key.get(key)
+        if row is None:
+            if self.count == self.capacity:
+                self._grow()
+            row = self.count
+            self.count += 1
+            self._row_of_key[key] = row
+            self._targets.append(None)
+
+        self.start_values[row] = 0.0
+        self.deltas[row] = 0.0
+        self.start_values[row, :size] = start_tuple[:size]
+        self.deltas[row, :size] = [b - a for a, b in zip(start_tuple[:size], end_tuple[:size])]
+        self.start_times[row] = self.now_ms
+        self.durations[row] = max(duration_ms, 1e-6)
+        self.easings[row] = EASING_IDS[easing]
+        self._targets[row] = (obj, attr, size, as_int, on_complete)
+        if attr is not None:
+            self._write(obj, attr, size, as_int, start_tuple)
+
+    def after(self, obj, on_complete, duration_ms=None, beats=None):
+        """一定時間後に関数を呼ぶ（同じオブジェクトの前のタイマーは置き換える）"""
+        self.tween(obj, None, 0.0, 0.0, duration_ms, beats, on_complete=on_complete)
+
+    def cancel(self, obj, attr=None):
+        """オブジェクトのトゥイーン（attrを指定した場合はその属性のみ）を終了時の処理なしで削除"""
+        for row in range(self.count - 1, -1, -1):
+            target_obj, target_attr = self._targets[row][:2]
+            if target_obj is obj and (attr is None or target_attr == attr):
+                self._remove(row)
+
+    def is_active(self, obj, attr=None):
+        """オブジェクトの属性（Noneの場合はタイマー）のトゥイーンが実行中かどうか"""
+        return (id(obj), attr) in self._row_of_key
+
+    def step(self, now_ms):
+        """全てのトゥイーンを時刻now_msまで進めて属性に書き込み、終わったものを削除"""
+        self.now_ms = now_ms
+        count = self.count
+        if not count:
+            return
+
+        progress = (now_ms - self.start_times[:count]) / self.durations[:count]
+        np.clip(progress, 0.0, 1.0, out=progress)
+        eased = np.empty(count)
+        easings = self.easings[:count]
+        for easing_id in np.unique(easings).tolist():
+            mask = easings == easing_id
+            eased[mask] = EASINGS[EASING_NAMES[easing_id]](progress[mask])
+        values = (self.start_values[:count] + self.deltas[:count] * eased[:, None]).tolist()
+
+        targets = self._targets
+        for row in range(count):
+            obj, attr, size, as_int, _ = targets[row]
+            if attr is not None:
+                self._write(obj, attr, size, as_int, values[row])
+
+        finished = np.flatnonzero(progress >= 1.0).tolist()
+        if finished:
+            callbacks = [targets[row][4] for row in finished]
+            # 後ろの行から削除すると、入れ替えで移動するのは未処理の行だけになる
+            for row in reversed(finished):
+                self._remove(row)
+            for callback in callbacks:
+                if callback is not None:
+                    callback()
+
+    def clear(self):
+        """全てのトゥイーンを削除"""
+        self.count = 0
+        self._targets.clear()
+        self._row_of_key.clear()
+
+    @staticmethod
+    def _write(obj, attr, size, as_int, values):
+        if as_int:
+            values = [int(round(value)) for value in values[:size]]
+        setattr(obj, attr, values[0] if size == 1 else tuple(values[:size]))
+
+    def _remove(self, row):
+        """行を削除（末尾の行で穴を埋める）"""
+        target = self._targets[row]
+        del self._row_of_key[(id(target[0]), target[1])]
+        last = self.count - 1
+        if row != last:
+            for column in (self.start_values, self.deltas, self.start_times, self.durations, self.easings):
+                column[row] = column[last]
+            moved = self._targets[last]
+            self._targets[row] = moved
+            self._row_of_key[(id(moved[0]), moved[1])] = row
+        self._targets.pop()
+        self.count = last
+
+    def _grow(self):
+        """容量を2倍に拡張"""
+        self.capacity *= 2
+        for name in ("start_values", "deltas", "start_times", "durations", "easings"):
+            column = getattr(self, name)
+            grown = np.zeros((self.capacity,) + column.shape[1:], dtype=column.dtype)
+            grown[:self.count] = column[:self.count]
+            setattr(self, name, grown)
+
+
+# Movieが毎フレーム進める既定のエンジン（各Drawableから共有する）
+_default_engine = None
+
+
+def get_default_engine():
+    """既定のTweenEngineを取得（未作成の場合は作成）"""
+    global _default_engine
+    if _default_engine is None:
+        _default_engine = TweenEngine()
+    return _default_engine
+
+
+def tween(obj, attr, start, end, duration_ms=None, beats=None, easing="linear", as_int=False, on_complete=None):
+    """既定のエンジンでトゥイーンを開始"""
+    get_default_engine().tween(obj, attr, start, end, duration_ms, beats, easing, as_int, on_complete)
+
+
+def after(obj, on_complete, duration_ms=None, beats=None):
+    """既定のエンジンで一定時間後に関数を呼ぶ"""
+    get_default_engine().after(obj, on_complete, duration_ms, beats)
+
+
+def cancel_tweens(obj, attr=None):
+    """既定のエンジンでオブジェクトのトゥイーンを削除"""
+    get_default_engine().cancel(obj, attr)
@@ -0,0 +1,72 @@
+"""
+UDPビート送信 - ExternalBeatClockの動作確認用に、DJ機器の代わりにビートをUDPで送る
+
+使い方: python udp_beat_sender.py [--bpm 128] [--port 9000] [--jitter 5] [--osc]
+"""
+import argparse
+import random
+import socket
+import struct
+import sys
+import time
+
+
+def osc_message(address, *args):
+    """OSCのメッセージを作成（引数はintとfloatのみ）"""
+    def pad(data):
+        return data + b"\0" * (4 - len(data) % 4)
+
+    type_tags = "," + "".join("i" if isinstance(arg, int) else "f" for arg in args)
+    body = b"".join(struct.pack(">i" if isinstance(arg, int) else ">f", arg) for arg in args)
+    return pad(address.encode("ascii")) + pad(type_tags.encode("ascii")) + body
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(description="Send beat messages over UDP")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9000)
+    parser.add_argument("--bpm", type=float, default=128.0)
+    parser.add_argument("--beats", type=int, default=0, help="number of beats to send (0: until Ctrl+C)")
+    parser.add_argument("--jitter", type=float, default=0.0, help="random send delay in ms (network jitter)")
+    parser.add_argument("--drop", type=float, default=0.0, help="probability of dropping a beat")
+    parser.add_argument("--no-tempo", action="store_true", help="do not send the tempo with each beat")
+    parser.add_argument("--osc", action="store_true", help="send OSC instead of text messages")
+    args = parser.parse_args(argv[1:])
+
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    address = (args.host, args.port)
+
+    def send(name, *values):
+        if args.osc:
+            data = osc_message("/" + name, *values)
+        else:
+            data = " ".join([name] + [str(value) for value in values]).encode("ascii")
+        sock.sendto(data, address)
+
+    interval = 60.0 / args.bpm
+    print(f"Sending beats to udp {args.host}:{args.port} at {args.bpm} BPM ({'OSC' if args.osc else 'text'})")
+    send("start")
+    start = time.perf_counter()
+    beat = 0
+    try:
+        while not args.beats or beat < args.beats:
+            # ビートの時刻まで待ち、揺らぎ分だけ遅らせて送る
+            target = start + beat * interval + random.uniform(0.0, args.jitter) / 1000.0
+            delay = target - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            if random.random() >= args.drop:
+                if args.no_tempo:
+                    send("beat", beat)
+                else:
+                    send("beat", beat, float(args.bpm))
+            beat += 1
+    except KeyboardInterrupt:
+        pass
+    send("stop")
+    print(f"Sent {beat} beats")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
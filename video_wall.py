@@ -0,0 +1,251 @@
+"""
+ビデオウォール - 複数の描画プロセスを共有メモリのビート時計で同期させる
+
+マスタープロセスが音楽を再生し、音楽の開始時刻を共有メモリに公開する。
+各描画プロセス（フォロワー）はそれぞれのウィンドウ領域とシーンリストを持ち、
+共有された開始時刻とシステム共通の単調時計から再生位置を計算するため、
+全プロセスが同じビートを同じ時刻に処理する。
+"""
+import multiprocessing
+import os
+import struct
+import time
+from multiprocessing import shared_memory
+
+import pygame
+
+from movie import Movie
+from time_source import TimeSource
+
+# シーケンス番号（奇数の間は書き込み中）, 音楽の開始時刻(ns), 再生中フラグ, 終了フラグ
+CLOCK_LAYOUT = struct.Struct("<QqII")
+
+
+def monotonic_ns():
+    """プロセス間で共通の単調時計（Linux/macOSはCLOCK_MONOTONIC、WindowsはQPC）"""
+    return time.perf_counter_ns()
+
+
+class BeatClockPublisher:
+    """音楽の開始時刻を共有メモリに公開するクラス（マスター側）
+
+    書き込みはシーケンスロックで行い、読み込み側はロックを取らずに一貫した値を読める。
+    """
+
+    def __init__(self, name=None):
+        self.shm = shared_memory.SharedMemory(name=name, create=True, size=CLOCK_LAYOUT.size)
+        self.name = self.shm.name
+        self.sequence = 0
+        self.start_ns = 0
+        self.playing = False
+        self.shutdown = False
+        self._write()
+
+    def publish(self, start_ns=None, playing=None, shutdown=None):
+        """値を更新して公開"""
+        if start_ns is not None:
+            self.start_ns = start_ns
+        if playing is not None:
+            self.playing = playing
+        if shutdown is not None:
+            self.shutdown = shutdown
+        self._write()
+
+    def _write(self):
+        buf = self.shm.buf
+        # 奇数にしてから本体を書き込み、偶数に戻す
+        self.sequence += 1
+        struct.pack_into("<Q", buf, 0, self.sequence)
+        CLOCK_LAYOUT.pack_into(buf, 0, self.sequence, self.start_ns, int(self.playing), int(self.shutdown))
+        self.sequence += 1
+        struct.pack_into("<Q", buf, 0, self.sequence)
+
+    def close(self):
+        """共有メモリを解放"""
+        self.shm.close()
+        self.shm.unlink()
+
+
+class SharedBeatClock(TimeSource):
+    """マスターが公開した開始時刻から再生位置を計算する時間ソース（フォロワー側）
+
+    音楽の再生制御はマスターが行うため、music_play()などは何もしない。
+    """
+
+    def __init__(self, name):
+        self.shm = shared_memory.SharedMemory(name=name)
+        self.clock = pygame.time.Clock()
+        self._state = (0, False, False)
+
+    def read(self):
+        """共有メモリから(開始時刻, 再生中, 終了)を読み込み"""
+        buf = self.shm.buf
+        for _ in range(100):
+            sequence, start_ns, playing, shutdown = CLOCK_LAYOUT.unpack_from(buf, 0)
+            if sequence % 2 == 0 and struct.unpack_from("<Q", buf, 0)[0] == sequence:
+                self._state = (start_ns, bool(playing), bool(shutdown))
+                break
+        # 書き込み中が続く場合は前回の値を使う
+        return self._state
+
+    def get_ticks(self):
+        return pygame.time.get_ticks()
+
+    def tick(self, fps):
+        if self.read()[2]:
+            # マスターが終了したらウィンドウを閉じたときと同じようにループを抜ける
+            pygame.event.post(pygame.event.Event(pygame.QUIT))
+        return self.clock.tick(fps)
+
+    def music_play(self, start_ms=0):
+        pass
+
+    def music_queue(self, music_file, length_ms=None):
+        pass
+
+    def music_stop(self):
+        pass
+
+    def music_get_busy(self):
+        return self.read()[1]
+
+    def music_get_pos(self):
+        start_ns, playing, _ = self.read()
+        if not playing:
+            return -1
+        return (monotonic_ns() - start_ns) / 1_000_000
+
+    def wait_for_start(self, timeout=None):
+        """マスターが再生を開始するまで待機
+
+        Returns:
+            bool: 再生が開始された場合はTrue
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            _, playing, shutdown = self.read()
+            if playing:
+                return True
+            if shutdown or (deadline is not None and time.monotonic() > deadline):
+                return False
+            time.sleep(0.001)
+
+    def close(self):
+        self.shm.close()
+
+
+class WallPanel:
+    """ビデオウォールの1画面（描画プロセス1つ分）"""
+
+    def __init__(self, build_scenes, region, fps=30, display_flags=pygame.NOFRAME):
+        """
+        Args:
+            build_scenes: シーンのリストを作成して返す関数（別プロセスで呼ぶため、モジュールの関数にする）
+            region: デスクトップ座標でのウィンドウ領域 (x, y, width, height)。別ディスプレイは座標で指定
+            fps: 描画の上限フレームレート
+            display_flags: pygame.display.set_modeのフラグ
+        """
+        self.build_scenes = build_scenes
+        self.region = region
+        self.fps = fps
+        self.display_flags = display_flags
+
+
+def _run_panel(clock_name, panel, index, bpm, beats_per_measure):
+    """描画プロセスのエントリポイント"""
+    x, y, width, height = panel.region
+    # pygameの初期化前にウィンドウの位置を指定
+    os.environ["SDL_VIDEO_WINDOW_POS"] = f"{x},{y}"
+
+    clock = SharedBeatClock(clock_name)
+    movie = Movie(width=width, height=height, fps=panel.fps, bpm=bpm, beats_per_measure=beats_per_measure,
+                  time_source=clock, display_flags=panel.display_flags)
+    pygame.display.set_caption(f"beani - Video Wall panel {index + 1}")
+    for scene in panel.build_scenes():
+        movie.add_scene(scene)
+
+    print(f"Panel {index + 1}: waiting for master clock")
+    if clock.wait_for_start():
+        movie.play_music()
+        movie.run()
+    else:
+        pygame.quit()
+    clock.close()
+
+
+class VideoWall:
+    """マスタープロセス（音楽再生と時計の公開）と複数の描画プロセスを管理するクラス"""
+
+    def __init__(self, music_file, bpm, panels, beats_per_measure=4, publish_interval=0.001,
+                 resync_threshold_ms=20.0):
+        """
+        Args:
+            music_file: 音楽ファイルのパス
+            bpm: 曲のBPM
+            panels: WallPanelのリスト
+            publish_interval: 音楽の再生位置を確認する間隔（秒）
+            resync_threshold_ms: 音楽の再生位置とのずれがこれを超えたら開始時刻を合わせ直す
+        """
+        self.music_file = music_file
+        self.bpm = bpm
+        self.panels = panels
+        self.beats_per_measure = beats_per_measure
+        self.publish_interval = publish_interval
+        self.resync_threshold_ms = resync_threshold_ms
+
+    def run(self, start_delay=2.0):
+        """描画プロセスを起動し、音楽を再生しながら時計を公開
+
+        Args:
+            start_delay: 描画プロセスの準備（シーン作成）を待つ時間（秒）
+        """
+        publisher = BeatClockPublisher()
+        # pygameはforkと相性が悪いため、描画プロセスはspawnで起動
+        context = multiprocessing.get_context("spawn")
+        processes = [
+            context.Process(target=_run_panel, name=f"panel-{index + 1}",
+                            args=(publisher.name, panel, index, self.bpm, self.beats_per_measure))
+            for index, panel in enumerate(self.panels)
+        ]
+        try:
+            for process in processes:
+                process.start()
+            print(f"Video wall: {len(processes)} panels started")
+
+            pygame.mixer.init()
+            pygame.mixer.music.load(self.music_file)
+            time.sleep(start_delay)
+            self._play(publisher, processes)
+        finally:
+            publisher.publish(playing=False, shutdown=True)
+            for process in processes:
+                process.join(timeout=5)
+                if process.is_alive():
+                    process.terminate()
+            publisher.close()
+            pygame.mixer.quit()
+        print("Video wall finished")
+
+    def _play(self, publisher, processes):
+        """音楽を再生し、開始時刻を公開し続ける
+
+        pygame.mixer.music.get_posは音声バッファ単位でしか進まないため、
+        開始時刻を少しずつ補正して滑らかな時計にする。
+        """
+        pygame.mixer.music.play()
+        start_ns = monotonic_ns()
+        publisher.publish(start_ns=start_ns, playing=True)
+        print("Video wall: music started")
+
+        while pygame.mixer.music.get_busy() and any(process.is_alive() for process in processes):
+            music_pos = pygame.mixer.music.get_pos()
+            if music_pos != -1:
+                now = monotonic_ns()
+                error_ms = (now - start_ns) / 1_000_000 - music_pos
+                if abs(error_ms) > self.resync_threshold_ms:
+                    start_ns = now - int(music_pos * 1_000_000)
+                else:
+                    # 音声バッファの粒度によるジッタを平均化するため、ずれの一部だけ補正
+                    start_ns += int(error_ms * 1_000_000 * 0.01)
+                publisher.publish(start_ns=start_ns)
+            time.sleep(self.publish_interval)
@@ -3,58 +3,66 @@
 """
 import pygame
 from drawable import Drawable
+from object_pool import get_default_surface_pool
+from surface_cache import load_image, blit_flags
+from tween import tween, cancel_tweens
 
 
 class ZoomBeater(Drawable):
     """ビートに合わせて画像を拡大/縮小するオブジェクト"""
+    __slots__ = ('original_image', 'scale', 'zoom_scale', 'current_scale', 'zoom_beats',
+                 'heavy_processing', 'image', 'image_scale', 'rect')
+    
+    # updateは何も変更しない（重い処理のシミュレーションのみ）
+    independent = True
+    
     def __init__(self, x, y, image_path, scale=1.0, zoom_scale=1.5, heavy_processing=False, priority=0):
         super().__init__(x, y, priority)
-        self.original_image = pygame.image.load(image_path)
+        self.original_image = load_image(image_path)
         self.scale = scale
         self.zoom_scale = zoom_scale
         self.current_scale = scale
-        self.zoom_frame = 0
-        self.zoom_duration = 3  # 3フレームで元のサイズに戻る
+        self.zoom_beats = 0.2  # 0.2ビートで元のサイズに戻る
         self.heavy_processing = heavy_processing  # 重い処理のシミュレーション
         
         # 初期画像の準備
-        self.image = pygame.transform.scale(
-            self.original_image, 
-            (int(self.original_image.get_width() * self.scale),
-             int(self.original_image.get_height() * self.scale))
-        )
-        self.rect = self.image.get_rect(center=(x, y))
+        self.image = None
+        self.image_scale = None  # imageを作成したときのスケール
+        self.rect = None
+        self._rescale_image()
+    
+    def _rescale_image(self):
+        """現在のスケールで画像を作成（Surfaceはプールから取得し、前の画像はプールに返す）"""
+        size = (int(self.original_image.get_width() * self.current_scale),
+                int(self.original_image.get_height() * self.current_scale))
+        pool = get_default_surface_pool()
+        if self.image is not None:
+            pool.release(self.image)
+        self.image = pool.acquire(size, self.original_image)
+        pygame.transform.scale(self.original_image, size, self.image)
+        self.image_scale = self.current_scale
+        self.rect = self.image.get_rect(center=(self.x, self.y))
+    
+    def on_beat(self, beat, measure):
+        """ビートのタイミングで拡大開始（拡大したスケールから元のスケールにトゥイーン）"""
+        tween(self, 'current_scale', self.zoom_scale, self.scale, beats=self.zoom_beats, easing="ease_out")
+        self._rescale_image()
+    
+    def restore_state(self, beat, phase, ticks_per_beat):
+        """ビートの先頭では前のビートのズームは終わっているため通常サイズに戻す"""
+        cancel_tweens(self)
+        self.current_scale = self.scale
+        self._rescale_image()
     
     def update(self):
-        """フレームごとの更新処理"""
+        """フレームごとの更新処理（スケールはトゥイーンで変わるため、重い処理のシミュレーションのみ）"""
         # 重い処理のシミュレーション（デバッグ用）
         if self.heavy_processing:
             import time
             time.sleep(0.01)  # 10msの遅延をシミュレート
-        
-        if self.zoom_frame > 0:
-            # ズーム中の処理：3フレームで元のサイズに戻る
-            progress = 1.0 - (self.zoom_frame / self.zoom_duration)
-            self.current_scale = self.scale + (self.zoom_scale - self.scale) * progress
-            self.zoom_frame -= 1
-            
-            # 画像のスケール更新
-            new_width = int(self.original_image.get_width() * self.current_scale)
-            new_height = int(self.original_image.get_height() * self.current_scale)
-            self.image = pygame.transform.scale(self.original_image, (new_width, new_height))
-            self.rect = self.image.get_rect(center=(self.x, self.y))
-    
-    def on_beat(self, beat, measure):
-        """ビートのタイミングで拡大開始"""
-        self.zoom_frame = self.zoom_duration
-        self.current_scale = self.zoom_scale
-        
-        # 即座に拡大画像を作成
-        new_width = int(self.original_image.get_width() * self.current_scale)
-        new_height = int(self.original_image.get_height() * self.current_scale)
-        self.image = pygame.transform.scale(self.original_image, (new_width, new_height))
-        self.rect = self.image.get_rect(center=(self.x, self.y))
     
     def draw(self, screen):
-        """画像を描画"""
-        screen.blit(self.image, self.rect)
+        """画像を描画（トゥイーンでスケールが変わっていれば画像を作り直す）"""
+        if self.current_scale != self.image_scale:
+            self._rescale_image()
+        screen.blit(self.image, self.rect, special_flags=blit_flags(self.original_image))